@@ -0,0 +1,62 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time TLObject.read() and write() on a few representative types.
+
+Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.codec
+"""
+
+import timeit
+from io import BytesIO
+
+from pyrogram import raw
+from pyrogram.raw.core import TLObject
+
+NUMBER = 100000
+REPEAT = 5
+
+OBJECTS = {
+    "PeerUser": raw.types.PeerUser(user_id=2 ** 40 + 5),
+    "InputPeerChannel": raw.types.InputPeerChannel(channel_id=123456789, access_hash=-2 ** 62),
+    "MessageRange": raw.types.MessageRange(min_id=1, max_id=100),
+    "upload.File": raw.types.upload.File(type=raw.types.storage.FilePartial(), mtime=123, bytes=b"x" * 16),
+    "UpdateUserStatus": raw.types.UpdateUserStatus(user_id=7, status=raw.types.UserStatusOffline(was_online=99)),
+    "Message": raw.types.Message(
+        id=5, peer_id=raw.types.PeerUser(user_id=1), date=3, message="hi", out=True, views=4, forwards=9
+    )
+}
+
+
+def best(func) -> float:
+    """Best time per call out of REPEAT runs, in nanoseconds."""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e9
+
+
+def main():
+    print(f"{'':18} {'read':>10} {'write':>10}  (ns, best of {REPEAT} x {NUMBER})")
+
+    for name, obj in OBJECTS.items():
+        data = obj.write()
+
+        print(f"{name:18} {best(lambda: TLObject.read(BytesIO(data))):10.0f} {best(obj.write):10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time the command filter on filters holding a few and many commands.
+
+Each filter is checked against text carrying one of its commands with quoted arguments, text carrying an unknown
+command and text carrying no command at all. Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.commands
+"""
+
+import asyncio
+import time
+
+from pyrogram import filters
+
+# Number of commands held by a filter -> number of checks timed
+FILTERS = {10: 20000, 1000: 2000}
+
+
+class Client:
+    class User:
+        username = "username"
+
+    me = User()
+
+
+class Message:
+    def __init__(self, text: str):
+        self.text = text
+        self.caption = None
+        self.command = None
+
+
+async def main():
+    client = Client()
+
+    for size, count in FILTERS.items():
+        command = filters.command([f"cmd{i}" for i in range(size)])
+
+        for text in (f"/cmd{size - 1} a 'b c'", "/start", "hello world"):
+            start = time.perf_counter()
+
+            for _ in range(count):
+                await command(client, Message(text))
+
+            elapsed = (time.perf_counter() - start) / count * 1e6
+
+            print(f"{size} commands, {text!r}: {elapsed:.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
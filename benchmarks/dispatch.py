@@ -0,0 +1,94 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time dispatching updates to the only handler able to receive them, among many others.
+
+500 handlers of various types are spread over 50 groups, followed by a UserStatusHandler in a later group that gets
+all the user status updates. Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.dispatch
+"""
+
+import asyncio
+import time
+
+from pyrogram import enums, handlers, raw
+from pyrogram.dispatcher import Dispatcher
+
+UPDATES = 20000
+
+HANDLERS = [
+    handlers.MessageHandler,
+    handlers.CallbackQueryHandler,
+    handlers.InlineQueryHandler,
+    handlers.EditedMessageHandler,
+    handlers.PollHandler
+]
+
+
+class Client:
+    workers = 1
+    shard_updates = False
+    no_updates = False
+    skip_unhandled_updates = False
+    updates_queue_size = 0
+    updates_queue_policy = enums.UpdatesQueuePolicy.BLOCK
+    executor = None
+
+
+async def main():
+    client = Client()
+    dispatcher = Dispatcher(client)
+    done = asyncio.Event()
+    handled = 0
+
+    async def callback(*args):
+        pass
+
+    async def on_status(*args):
+        nonlocal handled
+        handled += 1
+
+        if handled == UPDATES:
+            done.set()
+
+    await dispatcher.start()
+
+    for i in range(500):
+        dispatcher.add_handler(HANDLERS[i % len(HANDLERS)](callback), i % 50)
+
+    dispatcher.add_handler(handlers.UserStatusHandler(on_status), 100)
+
+    # Handlers are added by a task of their own
+    await asyncio.sleep(0.1)
+
+    update = raw.types.UpdateUserStatus(user_id=1, status=raw.types.UserStatusOnline(expires=0))
+    start = time.perf_counter()
+
+    for _ in range(UPDATES):
+        dispatcher.put_update((update, {}, {}))
+
+    await done.wait()
+
+    print(f"{(time.perf_counter() - start) / UPDATES * 1e6:.1f} us per update")
+
+    await dispatcher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time checking messages against handler filter trees.
+
+Two trees are checked against 10000 synthetic messages: one made only of async filters, and one mixing synchronous
+custom filters, which run in the executor, with async ones. Run from the repository root, once the API has been
+compiled:
+
+    python -m benchmarks.filters
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pyrogram import enums, filters
+from pyrogram.handlers import MessageHandler
+from pyrogram.types import Chat, Message, User
+
+MESSAGES = 10000
+
+
+class Client:
+    def __init__(self):
+        self.loop = asyncio.get_event_loop()
+        self.executor = ThreadPoolExecutor(4)
+
+
+def long_text(_, __, message: Message) -> bool:
+    return len(message.text or "") > 3
+
+
+def no_caption(_, __, message: Message) -> bool:
+    return not message.caption
+
+
+def message(i: int) -> Message:
+    return Message(
+        id=i,
+        text=f"hello world {i}" if i % 3 else None,
+        outgoing=i % 5 == 0,
+        chat=Chat(id=i, type=enums.ChatType.PRIVATE if i % 2 else enums.ChatType.GROUP),
+        from_user=User(id=i, is_bot=i % 7 == 0)
+    )
+
+
+TREES = {
+    "async tree": (
+        filters.text & filters.incoming & ~filters.bot & (filters.private | filters.group)
+        & ~filters.forwarded & (filters.reply | filters.text) & filters.regex("world")
+    ),
+    "mixed tree": (
+        filters.text & filters.create(long_text) & filters.create(no_caption)
+        & ~filters.bot & (filters.private | filters.group)
+    )
+}
+
+
+async def main():
+    client = Client()
+    messages = [message(i) for i in range(MESSAGES)]
+
+    for name, tree in TREES.items():
+        handler = MessageHandler(None, tree)
+        matched = 0
+        start = time.perf_counter()
+
+        for m in messages:
+            matched += bool(await handler.check(client, m))
+
+        elapsed = (time.perf_counter() - start) / MESSAGES * 1e6
+
+        print(f"{name}: {elapsed:.1f} us per message ({matched} matched)")
+
+    client.executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
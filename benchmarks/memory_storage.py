@@ -0,0 +1,76 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time the MemoryStorage operations used the most: opening it, storing peers and looking them up.
+
+Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.memory_storage
+"""
+
+import asyncio
+import time
+
+from pyrogram.storage import MemoryStorage
+
+OPENS = 200
+PEERS = 10000
+BATCH_SIZE = 100
+LOOKUPS = 100000
+
+
+async def main():
+    start = time.perf_counter()
+
+    for _ in range(OPENS):
+        storage = MemoryStorage("benchmark")
+        await storage.open()
+        await storage.close()
+
+    print(f"open + close: {(time.perf_counter() - start) / OPENS * 1e6:.0f} us")
+
+    storage = MemoryStorage("benchmark")
+    await storage.open()
+
+    peers = [(i, i * 7, "user", f"user{i}", None) for i in range(1, PEERS + 1)]
+    start = time.perf_counter()
+
+    for i in range(0, PEERS, BATCH_SIZE):
+        await storage.update_peers(peers[i:i + BATCH_SIZE])
+
+    print(f"update_peers, {PEERS} in {BATCH_SIZE}-peer batches: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+
+    for i in range(LOOKUPS):
+        await storage.get_peer_by_id(1 + i % PEERS)
+
+    print(f"get_peer_by_id: {(time.perf_counter() - start) / LOOKUPS * 1e6:.2f} us")
+
+    start = time.perf_counter()
+
+    for i in range(LOOKUPS):
+        await storage.get_peer_by_username(f"user{1 + i % PEERS}")
+
+    print(f"get_peer_by_username: {(time.perf_counter() - start) / LOOKUPS * 1e6:.2f} us")
+
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
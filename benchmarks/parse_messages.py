@@ -0,0 +1,94 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time parsing pages of channel messages where every message is a reply.
+
+The replied messages are fetched through a stub, which parses a page of its own, as the client would. Run from the
+repository root, once the API has been compiled:
+
+    python -m benchmarks.parse_messages
+"""
+
+import asyncio
+import time
+
+from pyrogram import raw, utils
+from pyrogram.client import Cache
+
+PAGES = (100, 200)
+NUMBER = 200
+
+CHANNEL = raw.types.Channel(
+    id=1, title="channel", photo=raw.types.ChatPhotoEmpty(), date=0, access_hash=1, restriction_reason=[]
+)
+USER = raw.types.User(id=7, access_hash=1, first_name="user", restriction_reason=[])
+
+
+def page(size: int, first_id: int) -> "raw.types.messages.ChannelMessages":
+    return raw.types.messages.ChannelMessages(
+        pts=0,
+        count=size,
+        chats=[CHANNEL],
+        users=[USER],
+        topics=[],
+        messages=[
+            raw.types.Message(
+                id=first_id + i,
+                peer_id=raw.types.PeerChannel(channel_id=1),
+                from_id=raw.types.PeerUser(user_id=7),
+                date=0,
+                message="hello",
+                entities=[],
+                reply_to=raw.types.MessageReplyHeader(reply_to_msg_id=first_id + i - 1) if i else None
+            )
+            for i in range(size)
+        ]
+    )
+
+
+class Client:
+    lazy_replies = False
+
+    def __init__(self):
+        self.message_cache = Cache(10000)
+
+    async def resolve_peer(self, chat_id):
+        return raw.types.InputPeerChannel(channel_id=1, access_hash=1)
+
+    async def get_messages(self, chat_id, reply_to_message_ids, replies):
+        return await utils.parse_messages(self, page(len(list(reply_to_message_ids)), 100000), replies=0)
+
+
+async def main():
+    for size in PAGES:
+        client = Client()
+        messages = page(size, 1)
+
+        # Warm up
+        await utils.parse_messages(client, messages)
+
+        start = time.perf_counter()
+
+        for _ in range(NUMBER):
+            await utils.parse_messages(client, messages)
+
+        print(f"{size} messages: {(time.perf_counter() - start) / NUMBER * 1000:.2f} ms per page")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
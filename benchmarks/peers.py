@@ -0,0 +1,89 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time storing the peers met while receiving dialogs and updates in a FileStorage.
+
+100 GetDialogs pages of 100 users and 100 channels each are replayed, followed by 20000 updates carrying 2 users and
+1 channel picked at random among those already seen. Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.peers
+"""
+
+import asyncio
+import random
+import tempfile
+import time
+
+import pyrogram
+from pyrogram import raw
+
+PAGES = 100
+PAGE_SIZE = 100
+UPDATES = 20000
+
+
+def user(i: int) -> "raw.types.User":
+    return raw.types.User(
+        id=i, access_hash=i * 7, first_name="user", username=f"user{i}" if i % 2 else None, restriction_reason=[]
+    )
+
+
+def channel(i: int) -> "raw.types.Channel":
+    return raw.types.Channel(
+        id=i, title="channel", photo=raw.types.ChatPhotoEmpty(), date=0, access_hash=i, broadcast=True,
+        restriction_reason=[]
+    )
+
+
+async def main():
+    random.seed(1)
+    peers = PAGES * PAGE_SIZE
+
+    batches = [
+        ([user(i) for i in range(first, first + PAGE_SIZE)], [channel(i) for i in range(first, first + PAGE_SIZE)])
+        for first in range(1, peers + 1, PAGE_SIZE)
+    ]
+    batches += [
+        ([user(random.randint(1, peers)), user(random.randint(1, peers))], [channel(random.randint(1, peers))])
+        for _ in range(UPDATES)
+    ]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        client = pyrogram.Client("benchmark", api_id=1, api_hash="x", workdir=workdir)
+        await client.storage.open()
+
+        worst = 0
+        start = time.perf_counter()
+
+        for users, chats in batches:
+            batch_start = time.perf_counter()
+
+            await client.fetch_peers(users)
+            await client.fetch_peers(chats)
+
+            worst = max(worst, time.perf_counter() - batch_start)
+
+        await client.storage.save()
+
+        print(f"total {(time.perf_counter() - start) * 1000:.0f} ms, worst batch {worst * 1000:.2f} ms")
+
+        await client.storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time receiving a 1 MiB upload.File frame through TCPAbridged.recv() and mtproto.unpack().
+
+The frame is fed in 16 KiB chunks. The AES-IGE cipher is replaced by a plain copy, so that only the framing, copying
+and decoding costs are measured. Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.receive
+"""
+
+import asyncio
+import os
+import time
+import tracemalloc
+from hashlib import sha256
+
+from pyrogram import raw
+from pyrogram.connection.transport import TCPAbridged
+from pyrogram.crypto import aes, mtproto
+from pyrogram.raw.core import Long, Message, TLObject
+
+ROUNDS = 50
+CHUNK_SIZE = 16 * 1024
+
+AUTH_KEY = os.urandom(256)
+AUTH_KEY_ID = sha256(AUTH_KEY).digest()[-8:]
+SESSION_ID = os.urandom(8)
+
+
+def server_pack(body: TLObject) -> bytes:
+    """Pack a message as the server would, minus the encryption."""
+    message = Message(body, 0x1000000000000001, 1, len(body))
+
+    data = Long(0) + SESSION_ID + message.write()
+    data += os.urandom(-(len(data) + 12) % 16 + 12)
+    msg_key = sha256(AUTH_KEY[96:128] + data).digest()[8:24]
+
+    return AUTH_KEY_ID + msg_key + data
+
+
+async def receive(frame: bytes) -> Message:
+    transport = TCPAbridged(False, None)
+    transport.reader = asyncio.StreamReader(limit=2 ** 30)
+
+    async def feed():
+        for i in range(0, len(frame), CHUNK_SIZE):
+            transport.reader.feed_data(frame[i:i + CHUNK_SIZE])
+            await asyncio.sleep(0)
+
+    feeder = asyncio.ensure_future(feed())
+    packet = await transport.recv()
+    await feeder
+
+    return mtproto.unpack(packet, SESSION_ID, AUTH_KEY, AUTH_KEY_ID)
+
+
+async def main():
+    aes.ige256_decrypt = lambda data, key, iv: bytes(data)
+
+    body = raw.types.upload.File(type=raw.types.storage.FileUnknown(), mtime=0, bytes=os.urandom(1024 * 1024))
+    packet = server_pack(body)
+    frame = b"\x7f" + (len(packet) // 4).to_bytes(3, "little") + packet
+
+    await receive(frame)
+
+    start = time.process_time()
+
+    for _ in range(ROUNDS):
+        await receive(frame)
+
+    cpu = (time.process_time() - start) / ROUNDS * 1000
+
+    tracemalloc.start()
+    await receive(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"CPU per MiB: {cpu:.2f} ms, peak traced memory: {peak / 2 ** 20:.2f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
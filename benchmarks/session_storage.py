@@ -0,0 +1,65 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time the session accessors of a FileStorage, called directly and from deep in a stack of coroutines.
+
+Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.session_storage
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from pyrogram.storage import FileStorage
+
+# Number of coroutine frames the accessors are called from
+DEPTHS = (0, 50)
+NUMBER = 2000
+
+
+async def nested(depth: int, func):
+    if depth:
+        return await nested(depth - 1, func)
+
+    return await func()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = FileStorage("benchmark", Path(workdir))
+        await storage.open()
+
+        await storage.dc_id(2)
+        await storage.auth_key(b"x" * 256)
+
+        for depth in DEPTHS:
+            start = time.perf_counter()
+
+            for _ in range(NUMBER):
+                await nested(depth, storage.dc_id)
+
+            print(f"dc_id() at stack depth {depth}: {(time.perf_counter() - start) / NUMBER * 1e6:.1f} us")
+
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure how long a FileStorage busy ingesting peers holds up the event loop.
+
+200k new peers are stored in batches of 200 and flushed every 50 batches, while a ticker sleeping 1 ms at a time
+records how late it wakes up. Run from the repository root, once the API has been compiled:
+
+    python -m benchmarks.storage_lag
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from pyrogram.storage import FileStorage
+
+BATCHES = 1000
+BATCH_SIZE = 200
+FLUSH_EVERY = 50
+TICK = 0.001
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = FileStorage("benchmark", Path(workdir))
+        await storage.open()
+
+        lags = []
+        stop = asyncio.Event()
+        tick = asyncio.ensure_future(ticker(lags, stop))
+        start = time.perf_counter()
+
+        for batch in range(BATCHES):
+            first = batch * BATCH_SIZE
+
+            await storage.update_peers([(first + i, i, "user", f"user{first + i}", None) for i in range(BATCH_SIZE)])
+
+            if batch % FLUSH_EVERY == FLUSH_EVERY - 1:
+                await storage.flush_peers()
+
+            await asyncio.sleep(0)
+
+        await storage.save()
+        total = time.perf_counter() - start
+
+        stop.set()
+        await tick
+
+        lags.sort()
+
+        print(
+            f"{BATCHES * BATCH_SIZE} peers stored in {total * 1000:.0f} ms; "
+            f"loop lag p50 {lags[len(lags) // 2] * 1000:.2f} ms, max {lags[-1] * 1000:.1f} ms"
+        )
+
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time decoding pages of channel messages, which are made for the most part of nested vectors.
+
+Each message carries 10 entities and a 2x3 inline keyboard, and comes with one user. Run from the repository root,
+once the API has been compiled:
+
+    python -m benchmarks.vectors
+"""
+
+import timeit
+from io import BytesIO
+
+from pyrogram import raw
+from pyrogram.raw.core import TLObject
+
+PAGES = (100, 200)
+NUMBER = 50
+REPEAT = 5
+
+
+def message(i: int) -> "raw.types.Message":
+    return raw.types.Message(
+        id=i,
+        peer_id=raw.types.PeerChannel(channel_id=1),
+        date=1700000000 + i,
+        message="hello **world** " * 20,
+        from_id=raw.types.PeerUser(user_id=1000 + i),
+        entities=[raw.types.MessageEntityBold(offset=j * 16, length=5) for j in range(10)],
+        reply_markup=raw.types.ReplyInlineMarkup(rows=[
+            raw.types.KeyboardButtonRow(buttons=[
+                raw.types.KeyboardButtonCallback(text=f"b{k}", data=b"x" * 8) for k in range(3)
+            ])
+            for _ in range(2)
+        ])
+    )
+
+
+def user(i: int) -> "raw.types.User":
+    return raw.types.User(id=1000 + i, access_hash=i, first_name="User", username=f"user{i}")
+
+
+def page(size: int) -> bytes:
+    return raw.types.messages.ChannelMessages(
+        pts=1,
+        count=size,
+        messages=[message(i) for i in range(size)],
+        topics=[],
+        chats=[],
+        users=[user(i) for i in range(size)]
+    ).write()
+
+
+def main():
+    for size in PAGES:
+        data = page(size)
+        elapsed = min(timeit.repeat(lambda: TLObject.read(BytesIO(data)), number=NUMBER, repeat=REPEAT)) / NUMBER
+
+        print(f"{size}-message page ({len(data) // 1024} KiB): {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
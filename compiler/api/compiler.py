@@ -20,9 +20,10 @@ import json
 import os
 import re
 import shutil
+import struct
 from functools import partial
 from pathlib import Path
-from typing import NamedTuple, List, Tuple
+from typing import NamedTuple, List, Tuple, Dict
 
 # from autoflake import fix_code
 # from black import format_str, FileMode
@@ -42,6 +43,9 @@ INT_RE = re.compile(r"int(\d+)")
 
 CORE_TYPES = ["int", "long", "int128", "int256", "double", "bytes", "string", "Bool", "true"]
 
+# Core types having a fixed size, mapped to their struct format
+FIXED_SIZE_TYPES = {"int": "i", "long": "q", "double": "d"}
+
 WARNING = """
 # # # # # # # # # # # # # # # # # # # # # # # #
 #               !!! WARNING !!!               #
@@ -160,6 +164,42 @@ def remove_whitespaces(source: str) -> str:
     return "\n".join(lines)
 
 
+def get_struct(formats: str, structs: Dict[str, str]) -> str:
+    """Get the name of the module level struct packing the given formats, registering it if needed"""
+    name = f"_STRUCT_{formats.upper()}"
+    structs[name] = formats
+
+    return name
+
+
+def read_fixed_fields(fields: List[Tuple[str, str]], structs: Dict[str, str]) -> str:
+    """Read consecutive fixed size fields with a single struct unpack. The list is emptied"""
+    if not fields:
+        return ""
+
+    formats = "".join(i[1] for i in fields)
+    name = get_struct(formats, structs)
+    size = struct.calcsize(f"<{formats}")
+    names = ", ".join(i[0] for i in fields)
+    index = "[0]" if len(fields) == 1 else ""
+    fields.clear()
+
+    return f"\n        {names} = {name}.unpack(b.read({size})){index}\n        "
+
+
+def write_fixed_fields(fields: List[Tuple[str, str]], structs: Dict[str, str]) -> str:
+    """Write consecutive fixed size fields with a single struct pack. The list is emptied"""
+    if not fields:
+        return ""
+
+    formats = "".join(i[1] for i in fields)
+    name = get_struct(formats, structs)
+    values = ", ".join(i[0] for i in fields)
+    fields.clear()
+
+    return f"\n        b.write({name}.pack({values}))\n        "
+
+
 def get_docstring_arg_type(t: str):
     if t in CORE_TYPES:
         if t == "long":
@@ -447,10 +487,38 @@ def start(format: bool = False):
 
         write_types = read_types = "" if c.has_flags else "# No flags\n        "
 
+        # Runs of consecutive fixed size fields are read and written at once through precompiled structs
+        structs = {}
+        read_fields = []
+        write_fields = []
+        # True flags take no room in the stream: they are read after the run their flags field is part of
+        read_true_flags = ""
+
         for arg_name, arg_type in c.args:
             flag = FLAGS_RE_2.match(arg_type)
+            is_flags = re.match(r"flags\d?", arg_name) and arg_type == "#"
+
+            if flag and flag.group(3) == "true":
+                number, index, _ = flag.groups()
+
+                read_true_flags += "\n        "
+                read_true_flags += f"{arg_name} = True if flags{number} & (1 << {index}) else False"
 
-            if re.match(r"flags\d?", arg_name) and arg_type == "#":
+                continue
+
+            if is_flags or arg_type in FIXED_SIZE_TYPES:
+                read_fields.append((arg_name, FIXED_SIZE_TYPES.get(arg_type, "i")))
+            else:
+                read_types += read_fixed_fields(read_fields, structs) + read_true_flags
+                read_true_flags = ""
+
+            if arg_type in FIXED_SIZE_TYPES:
+                write_fields.append((f"self.{arg_name}", FIXED_SIZE_TYPES[arg_type]))
+                continue
+
+            write_types += write_fixed_fields(write_fields, structs)
+
+            if is_flags:
                 write_flags = []
 
                 for i in c.args:
@@ -468,21 +536,29 @@ def start(format: bool = False):
 
                 write_flags = "\n        ".join([
                     f"{arg_name} = 0",
-                    "\n        ".join(write_flags),
-                    f"b.write(Int({arg_name}))\n        "
+                    "\n        ".join(write_flags)
                 ])
 
-                write_types += write_flags
-                read_types += f"\n        {arg_name} = Int.read(b)\n        "
+                write_types += "\n        " + write_flags + "\n        "
+                write_fields.append((arg_name, "i"))
 
                 continue
 
             if flag:
                 number, index, flag_type = flag.groups()
 
-                if flag_type == "true":
+                if flag_type in FIXED_SIZE_TYPES:
+                    name = get_struct(FIXED_SIZE_TYPES[flag_type], structs)
+                    size = struct.calcsize(f"<{FIXED_SIZE_TYPES[flag_type]}")
+
+                    write_types += "\n        "
+                    write_types += f"if self.{arg_name} is not None:\n            "
+                    write_types += f"b.write({name}.pack(self.{arg_name}))\n        "
+
                     read_types += "\n        "
-                    read_types += f"{arg_name} = True if flags{number} & (1 << {index}) else False"
+                    read_types += (
+                        f"{arg_name} = {name}.unpack(b.read({size}))[0] if flags{number} & (1 << {index}) else None"
+                    )
                 elif flag_type in CORE_TYPES:
                     write_types += "\n        "
                     write_types += f"if self.{arg_name} is not None:\n            "
@@ -493,20 +569,23 @@ def start(format: bool = False):
                 elif "vector" in flag_type.lower():
                     sub_type = arg_type.split("<")[1][:-1]
 
+                    # Same condition as the flag: empty vectors are left out, as they are read back
                     write_types += "\n        "
-                    write_types += f"if self.{arg_name} is not None:\n            "
-                    write_types += "b.write(Vector(self.{}{}))\n        ".format(
-                        arg_name, f", {sub_type.title()}" if sub_type in CORE_TYPES else ""
+                    write_types += f"if self.{arg_name}:\n            "
+                    write_types += (
+                        f"b.write(Vector(self.{arg_name}, {sub_type.title()}))\n        "
+                        if sub_type in CORE_TYPES
+                        else f"Vector.write_into(b, self.{arg_name})\n        "
                     )
 
                     read_types += "\n        "
-                    read_types += "{} = TLObject.read(b{}) if flags{} & (1 << {}) else []\n        ".format(
-                        arg_name, f", {sub_type.title()}" if sub_type in CORE_TYPES else "", number, index
+                    read_types += "{} = TLObject.read(b, {}) if flags{} & (1 << {}) else []\n        ".format(
+                        arg_name, sub_type.title() if sub_type in CORE_TYPES else "TLObject", number, index
                     )
                 else:
                     write_types += "\n        "
                     write_types += f"if self.{arg_name} is not None:\n            "
-                    write_types += f"b.write(self.{arg_name}.write())\n        "
+                    write_types += f"self.{arg_name}.write_into(b)\n        "
 
                     read_types += "\n        "
                     read_types += f"{arg_name} = TLObject.read(b) if flags{number} & (1 << {index}) else None\n        "
@@ -521,27 +600,35 @@ def start(format: bool = False):
                     sub_type = arg_type.split("<")[1][:-1]
 
                     write_types += "\n        "
-                    write_types += "b.write(Vector(self.{}{}))\n        ".format(
-                        arg_name, f", {sub_type.title()}" if sub_type in CORE_TYPES else ""
+                    write_types += (
+                        f"b.write(Vector(self.{arg_name}, {sub_type.title()}))\n        "
+                        if sub_type in CORE_TYPES
+                        else f"Vector.write_into(b, self.{arg_name})\n        "
                     )
 
                     read_types += "\n        "
-                    read_types += "{} = TLObject.read(b{})\n        ".format(
-                        arg_name, f", {sub_type.title()}" if sub_type in CORE_TYPES else ""
+                    read_types += "{} = TLObject.read(b, {})\n        ".format(
+                        arg_name, sub_type.title() if sub_type in CORE_TYPES else "TLObject"
                     )
                 else:
                     write_types += "\n        "
-                    write_types += f"b.write(self.{arg_name}.write())\n        "
+                    write_types += f"self.{arg_name}.write_into(b)\n        "
 
                     read_types += "\n        "
                     read_types += f"{arg_name} = TLObject.read(b)\n        "
 
+        read_types += read_fixed_fields(read_fields, structs) + read_true_flags
+        write_types += write_fixed_fields(write_fields, structs)
+
         slots = ", ".join([f'"{i[0]}"' for i in sorted_args])
         return_arguments = ", ".join([f"{i[0]}={i[0]}" for i in sorted_args])
 
         compiled_combinator = combinator_tmpl.format(
             notice=notice,
             warning=WARNING,
+            structs="".join(f'\n{name} = Struct("<{formats}")' for name, formats in sorted(structs.items())) + (
+                "\n" if structs else ""
+            ),
             name=c.name,
             docstring=docstring,
             slots=slots,
@@ -329,6 +329,7 @@ def pyrogram_api():
         Advanced
             invoke
             resolve_peer
+            resolve_peers
             save_file
         """
     )
@@ -558,6 +559,7 @@ def pyrogram_api():
             Message.reply_video_note
             Message.reply_voice
             Message.get_media_group
+            Message.get_reply_to_message
             Message.react
         """,
         chat="""
@@ -17,6 +17,7 @@
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import contextlib
 import functools
 import inspect
 import logging
@@ -25,6 +26,8 @@ import platform
 import re
 import shutil
 import sys
+import time
+from collections import deque, OrderedDict, defaultdict
 from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from hashlib import sha256
@@ -32,7 +35,7 @@ from importlib import import_module
 from io import StringIO, BytesIO
 from mimetypes import MimeTypes
 from pathlib import Path
-from typing import Union, List, Optional, Callable, AsyncGenerator
+from typing import Union, List, Optional, Callable, AsyncGenerator, Tuple
 
 import pyrogram
 from pyrogram import __version__, __license__
@@ -42,21 +45,24 @@ from pyrogram import utils
 from pyrogram.crypto import aes
 from pyrogram.errors import CDNFileHashMismatch
 from pyrogram.errors import (
-    SessionPasswordNeeded,
+    SessionPasswordNeeded, AuthBytesInvalid,
     VolumeLocNotFound, ChannelPrivate,
     BadRequest
 )
 from pyrogram.handlers.handler import Handler
 from pyrogram.methods import Methods
 from pyrogram.session import Auth, Session
-from pyrogram.storage import FileStorage, MemoryStorage
+from pyrogram.storage import FileStorage, MemoryStorage, Storage
+from pyrogram.storage.sqlite_storage import get_input_peer
 from pyrogram.types import User, TermsOfService
 from pyrogram.utils import ainput
 from .dispatcher import Dispatcher
 from .file_id import FileId, FileType, ThumbnailSource
 from .mime_types import mime_types
 from .parser import Parser
+from .reply_resolver import ReplyResolver
 from .session.internals import MsgId
+from .updates_state import UpdatesState
 
 log = logging.getLogger(__name__)
 
@@ -177,6 +183,40 @@ class Client(Methods):
             Set the maximum amount of concurrent transmissions (uploads & downloads).
             A value that is too high may result in network related issues.
             Defaults to 1.
+
+        skip_unhandled_updates (``bool``, *optional*):
+            Pass True to discard, without even decoding them, incoming updates that none of the registered handlers is
+            able to receive. Only updates sent on their own, such as user status changes and typing notifications,
+            can be skipped this way, and only if they don't carry a pts or qts, which is needed to keep the updates state in
+            sync. Has no effect as long as a raw update handler is registered.
+            Defaults to False (all updates are decoded).
+
+        shard_updates (``bool``, *optional*):
+            Pass True to give each of the *workers* an updates queue of its own and route the updates of a chat always
+            to the same worker. Updates of the same chat are then handled one at a time and in order, and a busy chat
+            is only able to hold up its own worker. The number of shards is the number of *workers*.
+            Defaults to False (all workers share a single queue).
+
+        updates_queue_size (``int``, *optional*):
+            Maximum number of updates waiting to be handled, per queue. When the limit is reached, the
+            *updates_queue_policy* applies. Bounded queues also coalesce idempotent high-frequency updates, such as user
+            status changes: only the latest of those queued for the same user is handled.
+            Defaults to 0 (unbounded).
+
+        updates_queue_policy (:obj:`~pyrogram.enums.UpdatesQueuePolicy`, *optional*):
+            What to do with incoming updates when the updates queue is full.
+            Defaults to :obj:`~pyrogram.enums.UpdatesQueuePolicy.BLOCK`.
+
+        low_priority_updates (Tuple of ``type``, *optional*):
+            Raw update types dropped when the updates queue is full and *updates_queue_policy* is
+            :obj:`~pyrogram.enums.UpdatesQueuePolicy.DROP_LOW_PRIORITY`, e.g. ``(raw.types.UpdateUserStatus,)``.
+            Defaults to user status changes and typing actions.
+
+        lazy_replies (``bool``, *optional*):
+            Pass True to not fetch, while parsing incoming messages, the messages they reply to: *reply_to_message* is
+            only filled in when the replied message is already known. Use
+            :meth:`~pyrogram.types.Message.get_reply_to_message` to fetch it when needed.
+            Defaults to False (replied messages are fetched, in batches, before the handlers run).
     """
 
     APP_VERSION = f"Pyrogram {__version__}"
@@ -196,6 +236,12 @@ class Client(Methods):
 
     MAX_CONCURRENT_TRANSMISSIONS = 1
 
+    # Maximum amount of file chunks being requested concurrently while downloading a single file
+    DOWNLOAD_WINDOW_SIZE = 4
+
+    # Amount of seconds after which an unused media session is stopped and evicted from the pool
+    MEDIA_SESSION_IDLE_TIMEOUT = 5 * 60
+
     mimetypes = MimeTypes()
     mimetypes.readfp(StringIO(mime_types))
 
@@ -225,7 +271,13 @@ class Client(Methods):
         takeout: bool = None,
         sleep_threshold: int = Session.SLEEP_THRESHOLD,
         hide_password: bool = False,
-        max_concurrent_transmissions: int = MAX_CONCURRENT_TRANSMISSIONS
+        max_concurrent_transmissions: int = MAX_CONCURRENT_TRANSMISSIONS,
+        skip_unhandled_updates: bool = False,
+        shard_updates: bool = False,
+        updates_queue_size: int = 0,
+        updates_queue_policy: "enums.UpdatesQueuePolicy" = enums.UpdatesQueuePolicy.BLOCK,
+        low_priority_updates: Tuple[type, ...] = Dispatcher.LOW_PRIORITY_UPDATES,
+        lazy_replies: bool = False
     ):
         super().__init__()
 
@@ -254,6 +306,12 @@ class Client(Methods):
         self.sleep_threshold = sleep_threshold
         self.hide_password = hide_password
         self.max_concurrent_transmissions = max_concurrent_transmissions
+        self.skip_unhandled_updates = skip_unhandled_updates
+        self.shard_updates = shard_updates
+        self.updates_queue_size = updates_queue_size
+        self.updates_queue_policy = updates_queue_policy
+        self.low_priority_updates = tuple(low_priority_updates)
+        self.lazy_replies = lazy_replies
 
         self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="Handler")
 
@@ -265,6 +323,8 @@ class Client(Methods):
             self.storage = FileStorage(self.name, self.workdir)
 
         self.dispatcher = Dispatcher(self)
+        self.updates_state = UpdatesState(self)
+        self.reply_resolver = ReplyResolver(self)
 
         self.rnd_id = MsgId
 
@@ -273,7 +333,8 @@ class Client(Methods):
         self.session = None
 
         self.media_sessions = {}
-        self.media_sessions_lock = asyncio.Lock()
+        # One lock per pool key, so that setting up a session for a DC doesn't hold up the others
+        self.media_sessions_locks = defaultdict(asyncio.Lock)
 
         self.save_file_semaphore = asyncio.Semaphore(self.max_concurrent_transmissions)
         self.get_file_semaphore = asyncio.Semaphore(self.max_concurrent_transmissions)
@@ -288,6 +349,7 @@ class Client(Methods):
         self.me: Optional[User] = None
 
         self.message_cache = Cache(10000)
+        self.peers_cache = PeerCache(10000)
 
         # Sometimes, for some reason, the server will stop sending updates and will only respond to pings.
         # This watchdog will invoke updates.GetState in order to wake up the server and enable it sending updates again
@@ -326,7 +388,7 @@ class Client(Methods):
                 break
 
             if datetime.now() - self.last_update_time > timedelta(seconds=self.UPDATES_WATCHDOG_INTERVAL):
-                await self.invoke(raw.functions.updates.GetState())
+                await self.updates_state.check_state(await self.invoke(raw.functions.updates.GetState()))
 
     async def authorize(self) -> User:
         if self.bot_token:
@@ -529,6 +591,7 @@ class Client(Methods):
             parsed_peers.append((peer_id, access_hash, peer_type, username, phone_number))
 
         await self.storage.update_peers(parsed_peers)
+        self.peers_cache.update(parsed_peers)
 
         return is_min
 
@@ -544,73 +607,70 @@ class Client(Methods):
             users = {u.id: u for u in updates.users}
             chats = {c.id: c for c in updates.chats}
 
-            for update in updates.updates:
-                channel_id = getattr(
-                    getattr(
-                        getattr(
-                            update, "message", None
-                        ), "peer_id", None
-                    ), "channel_id", None
-                ) or getattr(update, "channel_id", None)
-
-                pts = getattr(update, "pts", None)
-                pts_count = getattr(update, "pts_count", None)
-
-                if isinstance(update, raw.types.UpdateChannelTooLong):
-                    log.info(update)
-
-                if isinstance(update, raw.types.UpdateNewChannelMessage) and is_min:
-                    message = update.message
-
-                    if not isinstance(message, raw.types.MessageEmpty):
-                        try:
-                            diff = await self.invoke(
-                                raw.functions.updates.GetChannelDifference(
-                                    channel=await self.resolve_peer(utils.get_channel_id(channel_id)),
-                                    filter=raw.types.ChannelMessagesFilter(
-                                        ranges=[raw.types.MessageRange(
-                                            min_id=update.message.id,
-                                            max_id=update.message.id
-                                        )]
-                                    ),
-                                    pts=pts - pts_count,
-                                    limit=pts
-                                )
-                            )
-                        except ChannelPrivate:
-                            pass
-                        else:
-                            if not isinstance(diff, raw.types.updates.ChannelDifferenceEmpty):
-                                users.update({u.id: u for u in diff.users})
-                                chats.update({c.id: c for c in diff.chats})
-
-                self.dispatcher.updates_queue.put_nowait((update, users, chats))
+            await self.updates_state.process_updates(
+                self.updates_state.check_seq(updates, (updates, users, chats, is_min))
+            )
         elif isinstance(updates, (raw.types.UpdateShortMessage, raw.types.UpdateShortChatMessage)):
+            await self.updates_state.process(updates)
+        elif isinstance(updates, raw.types.UpdateShort):
+            await self.updates_state.process(updates.update)
+        elif isinstance(updates, raw.types.UpdatesTooLong):
+            log.info(updates)
+            self.updates_state.request_difference()
+
+        await self.updates_state.save(force=False)
+
+    async def dispatch_update(self, update, users: dict, chats: dict, is_min: bool = False):
+        if isinstance(update, raw.types.UpdateNewChannelMessage) and is_min:
+            message = update.message
+
+            if not isinstance(message, raw.types.MessageEmpty):
+                try:
+                    diff = await self.invoke(
+                        raw.functions.updates.GetChannelDifference(
+                            channel=await self.resolve_peer(utils.get_channel_id(message.peer_id.channel_id)),
+                            filter=raw.types.ChannelMessagesFilter(
+                                ranges=[raw.types.MessageRange(
+                                    min_id=update.message.id,
+                                    max_id=update.message.id
+                                )]
+                            ),
+                            pts=update.pts - update.pts_count,
+                            limit=update.pts
+                        )
+                    )
+                except ChannelPrivate:
+                    pass
+                else:
+                    if not isinstance(diff, raw.types.updates.ChannelDifferenceEmpty):
+                        users.update({u.id: u for u in diff.users})
+                        chats.update({c.id: c for c in diff.chats})
+        elif isinstance(update, (raw.types.UpdateShortMessage, raw.types.UpdateShortChatMessage)):
             diff = await self.invoke(
                 raw.functions.updates.GetDifference(
-                    pts=updates.pts - updates.pts_count,
-                    date=updates.date,
+                    pts=update.pts - update.pts_count,
+                    date=update.date,
                     qts=-1
                 )
             )
 
             if diff.new_messages:
-                self.dispatcher.updates_queue.put_nowait((
+                self.dispatcher.put_update((
                     raw.types.UpdateNewMessage(
                         message=diff.new_messages[0],
-                        pts=updates.pts,
-                        pts_count=updates.pts_count
+                        pts=update.pts,
+                        pts_count=update.pts_count
                     ),
                     {u.id: u for u in diff.users},
                     {c.id: c for c in diff.chats}
                 ))
             else:
                 if diff.other_updates:  # The other_updates list can be empty
-                    self.dispatcher.updates_queue.put_nowait((diff.other_updates[0], {}, {}))
-        elif isinstance(updates, raw.types.UpdateShort):
-            self.dispatcher.updates_queue.put_nowait((updates.update, {}, {}))
-        elif isinstance(updates, raw.types.UpdatesTooLong):
-            log.info(updates)
+                    self.dispatcher.put_update((diff.other_updates[0], {}, {}))
+
+            return
+
+        self.dispatcher.put_update((update, users, chats))
 
     async def load_session(self):
         await self.storage.open()
@@ -806,6 +866,112 @@ class Client(Methods):
                 shutil.move(temp_file_path, file_path)
                 return file_path
 
+    async def get_media_session(self, dc_id: int, is_cdn: bool = False) -> Session:
+        """Get a started media session for the given DC, creating it only if none is pooled yet.
+
+        Sessions are kept in :attr:`media_sessions` keyed by *(dc_id, is_cdn)* and are shared by downloads, uploads
+        and inline message edits. Sessions that have not been used for :attr:`MEDIA_SESSION_IDLE_TIMEOUT` seconds
+        are stopped and evicted, and pooled sessions that are found to be dead are replaced.
+        """
+        key = (dc_id, is_cdn)
+
+        async with self.media_sessions_locks[key]:
+            session = self.media_sessions.get(key)
+
+            if session is not None:
+                if not session.is_started.is_set() and session.users == 0:
+                    try:
+                        await asyncio.wait_for(session.is_started.wait(), Session.START_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        log.info("Replacing dead media session for DC%s%s", dc_id, " (CDN)" if is_cdn else "")
+                        del self.media_sessions[key]
+                        await session.stop()
+                        session = None
+
+            if session is None:
+                session = await self.create_media_session(dc_id, is_cdn)
+                self.media_sessions[key] = session
+
+            self.schedule_media_session_eviction(key, session)
+
+            return session
+
+    def schedule_media_session_eviction(self, key: Tuple[int, bool], session: Session):
+        """(Re)start the idle timer of a pooled media session."""
+        if session.idle_handle is not None:
+            session.idle_handle.cancel()
+
+        session.idle_handle = self.loop.call_later(
+            self.MEDIA_SESSION_IDLE_TIMEOUT,
+            lambda: self.loop.create_task(self.evict_media_session(key, session))
+        )
+
+    async def evict_media_session(self, key: Tuple[int, bool], session: Session):
+        async with self.media_sessions_locks[key]:
+            # Sessions in use get their timer restarted once released
+            if self.media_sessions.get(key) is not session or session.users > 0:
+                return
+
+            log.info("Evicting idle media session for DC%s%s", key[0], " (CDN)" if key[1] else "")
+            del self.media_sessions[key]
+
+        await session.stop()
+
+    async def create_media_session(self, dc_id: int, is_cdn: bool = False) -> Session:
+        test_mode = await self.storage.test_mode()
+        is_home_dc = dc_id == await self.storage.dc_id() and not is_cdn
+
+        session = Session(
+            self, dc_id,
+            await self.storage.auth_key()
+            if is_home_dc
+            else await Auth(self, dc_id, test_mode).create(),
+            test_mode, is_media=True, is_cdn=is_cdn
+        )
+
+        await session.start()
+
+        if is_home_dc or is_cdn:
+            return session
+
+        for _ in range(3):
+            exported_auth = await self.invoke(
+                raw.functions.auth.ExportAuthorization(
+                    dc_id=dc_id
+                )
+            )
+
+            try:
+                await session.invoke(
+                    raw.functions.auth.ImportAuthorization(
+                        id=exported_auth.id,
+                        bytes=exported_auth.bytes
+                    )
+                )
+            except AuthBytesInvalid:
+                continue
+            else:
+                break
+        else:
+            await session.stop()
+            raise AuthBytesInvalid
+
+        return session
+
+    @contextlib.asynccontextmanager
+    async def use_media_session(self, dc_id: int, is_cdn: bool = False) -> AsyncGenerator[Session, None]:
+        """Borrow a pooled media session, preventing its eviction for as long as it's in use."""
+        session = await self.get_media_session(dc_id, is_cdn)
+        session.users += 1
+
+        try:
+            yield session
+        finally:
+            session.users -= 1
+
+            if session.users == 0:
+                self.schedule_media_session_eviction((dc_id, is_cdn), session)
+
     async def get_file(
         self,
         file_id: FileId,
@@ -862,165 +1028,156 @@ class Client(Methods):
 
             dc_id = file_id.dc_id
 
-            session = Session(
-                self, dc_id,
-                await Auth(self, dc_id, await self.storage.test_mode()).create()
-                if dc_id != await self.storage.dc_id()
-                else await self.storage.auth_key(),
-                await self.storage.test_mode(),
-                is_media=True
-            )
-
             try:
-                await session.start()
-
-                if dc_id != await self.storage.dc_id():
-                    exported_auth = await self.invoke(
-                        raw.functions.auth.ExportAuthorization(
-                            dc_id=dc_id
-                        )
+                async with self.use_media_session(dc_id) as session:
+                    r = await session.invoke(
+                        raw.functions.upload.GetFile(
+                            location=location,
+                            offset=offset_bytes,
+                            limit=chunk_size
+                        ),
+                        sleep_threshold=30
                     )
 
-                    await session.invoke(
-                        raw.functions.auth.ImportAuthorization(
-                            id=exported_auth.id,
-                            bytes=exported_auth.bytes
-                        )
-                    )
-
-                r = await session.invoke(
-                    raw.functions.upload.GetFile(
-                        location=location,
-                        offset=offset_bytes,
-                        limit=chunk_size
-                    ),
-                    sleep_threshold=30
-                )
+                    if isinstance(r, raw.types.upload.File):
+                        # Chunks that follow the first one are requested ahead of time, keeping up to
+                        # DOWNLOAD_WINDOW_SIZE requests in flight. Responses are consumed in offset order.
+                        pending = deque()
+                        requested = 1
+                        next_offset = offset_bytes + chunk_size
+
+                        def request_ahead():
+                            nonlocal requested, next_offset
+
+                            while (
+                                len(pending) < self.DOWNLOAD_WINDOW_SIZE
+                                and requested < total
+                                and (not pending or not file_size or next_offset < file_size)
+                            ):
+                                pending.append(self.loop.create_task(session.invoke(
+                                    raw.functions.upload.GetFile(
+                                        location=location,
+                                        offset=next_offset,
+                                        limit=chunk_size
+                                    ),
+                                    sleep_threshold=30
+                                )))
 
-                if isinstance(r, raw.types.upload.File):
-                    while True:
-                        chunk = r.bytes
+                                requested += 1
+                                next_offset += chunk_size
 
-                        yield chunk
+                        try:
+                            while True:
+                                chunk = r.bytes
 
-                        current += 1
-                        offset_bytes += chunk_size
+                                if len(chunk) == chunk_size:
+                                    request_ahead()
 
-                        if progress:
-                            func = functools.partial(
-                                progress,
-                                min(offset_bytes, file_size)
-                                if file_size != 0
-                                else offset_bytes,
-                                file_size,
-                                *progress_args
-                            )
+                                yield chunk
 
-                            if inspect.iscoroutinefunction(progress):
-                                await func()
-                            else:
-                                await self.loop.run_in_executor(self.executor, func)
+                                current += 1
+                                offset_bytes += chunk_size
 
-                        if len(chunk) < chunk_size or current >= total:
-                            break
+                                if progress:
+                                    func = functools.partial(
+                                        progress,
+                                        min(offset_bytes, file_size)
+                                        if file_size != 0
+                                        else offset_bytes,
+                                        file_size,
+                                        *progress_args
+                                    )
 
-                        r = await session.invoke(
-                            raw.functions.upload.GetFile(
-                                location=location,
-                                offset=offset_bytes,
-                                limit=chunk_size
-                            ),
-                            sleep_threshold=30
-                        )
+                                    if inspect.iscoroutinefunction(progress):
+                                        await func()
+                                    else:
+                                        await self.loop.run_in_executor(self.executor, func)
 
-                elif isinstance(r, raw.types.upload.FileCdnRedirect):
-                    cdn_session = Session(
-                        self, r.dc_id, await Auth(self, r.dc_id, await self.storage.test_mode()).create(),
-                        await self.storage.test_mode(), is_media=True, is_cdn=True
-                    )
+                                if len(chunk) < chunk_size or current >= total:
+                                    break
 
-                    try:
-                        await cdn_session.start()
-
-                        while True:
-                            r2 = await cdn_session.invoke(
-                                raw.functions.upload.GetCdnFile(
-                                    file_token=r.file_token,
-                                    offset=offset_bytes,
-                                    limit=chunk_size
+                                r = await pending.popleft()
+                        finally:
+                            for task in pending:
+                                task.cancel()
+
+                            await asyncio.gather(*pending, return_exceptions=True)
+
+                    elif isinstance(r, raw.types.upload.FileCdnRedirect):
+                        async with self.use_media_session(r.dc_id, is_cdn=True) as cdn_session:
+                            while True:
+                                r2 = await cdn_session.invoke(
+                                    raw.functions.upload.GetCdnFile(
+                                        file_token=r.file_token,
+                                        offset=offset_bytes,
+                                        limit=chunk_size
+                                    )
                                 )
-                            )
-
-                            if isinstance(r2, raw.types.upload.CdnFileReuploadNeeded):
-                                try:
-                                    await session.invoke(
-                                        raw.functions.upload.ReuploadCdnFile(
-                                            file_token=r.file_token,
-                                            request_token=r2.request_token
+
+                                if isinstance(r2, raw.types.upload.CdnFileReuploadNeeded):
+                                    try:
+                                        await session.invoke(
+                                            raw.functions.upload.ReuploadCdnFile(
+                                                file_token=r.file_token,
+                                                request_token=r2.request_token
+                                            )
                                         )
+                                    except VolumeLocNotFound:
+                                        break
+                                    else:
+                                        continue
+
+                                chunk = r2.bytes
+
+                                # https://core.telegram.org/cdn#decrypting-files
+                                decrypted_chunk = aes.ctr256_decrypt(
+                                    chunk,
+                                    r.encryption_key,
+                                    bytearray(
+                                        r.encryption_iv[:-4]
+                                        + (offset_bytes // 16).to_bytes(4, "big")
                                     )
-                                except VolumeLocNotFound:
-                                    break
-                                else:
-                                    continue
-
-                            chunk = r2.bytes
-
-                            # https://core.telegram.org/cdn#decrypting-files
-                            decrypted_chunk = aes.ctr256_decrypt(
-                                chunk,
-                                r.encryption_key,
-                                bytearray(
-                                    r.encryption_iv[:-4]
-                                    + (offset_bytes // 16).to_bytes(4, "big")
                                 )
-                            )
 
-                            hashes = await session.invoke(
-                                raw.functions.upload.GetCdnFileHashes(
-                                    file_token=r.file_token,
-                                    offset=offset_bytes
-                                )
-                            )
-
-                            # https://core.telegram.org/cdn#verifying-files
-                            for i, h in enumerate(hashes):
-                                cdn_chunk = decrypted_chunk[h.limit * i: h.limit * (i + 1)]
-                                CDNFileHashMismatch.check(
-                                    h.hash == sha256(cdn_chunk).digest(),
-                                    "h.hash == sha256(cdn_chunk).digest()"
+                                hashes = await session.invoke(
+                                    raw.functions.upload.GetCdnFileHashes(
+                                        file_token=r.file_token,
+                                        offset=offset_bytes
+                                    )
                                 )
 
-                            yield decrypted_chunk
+                                # https://core.telegram.org/cdn#verifying-files
+                                for i, h in enumerate(hashes):
+                                    cdn_chunk = decrypted_chunk[h.limit * i: h.limit * (i + 1)]
+                                    CDNFileHashMismatch.check(
+                                        h.hash == sha256(cdn_chunk).digest(),
+                                        "h.hash == sha256(cdn_chunk).digest()"
+                                    )
+
+                                yield decrypted_chunk
 
-                            current += 1
-                            offset_bytes += chunk_size
+                                current += 1
+                                offset_bytes += chunk_size
 
-                            if progress:
-                                func = functools.partial(
-                                    progress,
-                                    min(offset_bytes, file_size) if file_size != 0 else offset_bytes,
-                                    file_size,
-                                    *progress_args
-                                )
+                                if progress:
+                                    func = functools.partial(
+                                        progress,
+                                        min(offset_bytes, file_size) if file_size != 0 else offset_bytes,
+                                        file_size,
+                                        *progress_args
+                                    )
 
-                                if inspect.iscoroutinefunction(progress):
-                                    await func()
-                                else:
-                                    await self.loop.run_in_executor(self.executor, func)
+                                    if inspect.iscoroutinefunction(progress):
+                                        await func()
+                                    else:
+                                        await self.loop.run_in_executor(self.executor, func)
 
-                            if len(chunk) < chunk_size or current >= total:
-                                break
-                    except Exception as e:
-                        raise e
-                    finally:
-                        await cdn_session.stop()
+                                if len(chunk) < chunk_size or current >= total:
+                                    break
             except pyrogram.StopTransmission:
                 raise
             except Exception as e:
                 log.exception(e)
-            finally:
-                await session.stop()
 
     def guess_mime_type(self, filename: str) -> Optional[str]:
         return self.mimetypes.guess_type(filename)[0]
@@ -1046,3 +1203,113 @@ class Cache:
         if len(self.store) > self.capacity:
             for _ in range(self.capacity // 2 + 1):
                 del self.store[next(iter(self.store))]
+
+
+class PeerCache:
+    """Least recently used cache of the input peers resolved by id or username, in front of the storage.
+
+    Only lookups add peers to the cache. Peers written to the storage just update the cached ones, so that busy update
+    streams don't evict the peers actually being looked up.
+    """
+
+    USERNAME_TTL = Storage.USERNAME_TTL
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+
+        # Peer id -> (input peer, username)
+        self.peers = OrderedDict()
+        # Username -> (peer id, expiration time)
+        self.usernames = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_peer_id(input_peer: "raw.base.InputPeer") -> int:
+        if isinstance(input_peer, raw.types.InputPeerUser):
+            return input_peer.user_id
+
+        if isinstance(input_peer, raw.types.InputPeerChat):
+            return -input_peer.chat_id
+
+        return utils.get_channel_id(input_peer.channel_id)
+
+    def get(self, peer_id: int) -> Optional["raw.base.InputPeer"]:
+        entry = self.peers.get(peer_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.peers.move_to_end(peer_id)
+        self.hits += 1
+
+        return entry[0]
+
+    def get_by_username(self, username: str) -> Optional["raw.base.InputPeer"]:
+        value = self.usernames.get(username)
+
+        if value is None or value[1] < time.time():
+            self.misses += 1
+            return None
+
+        return self.get(value[0])
+
+    def put(self, input_peer: "raw.base.InputPeer", username: str = None):
+        """Cache a peer found in the storage. The username it was looked up with, if any, is associated to it."""
+        peer_id = self.get_peer_id(input_peer)
+        entry = self.peers.get(peer_id)
+
+        if username is None and entry is not None:
+            username = entry[1]
+
+        self.set(peer_id, input_peer, username)
+
+    def update(self, peers: List[Tuple[int, int, str, str, str]]):
+        """Keep the cache coherent with peers written to the storage. Their usernames replace the cached ones."""
+        for peer_id, access_hash, peer_type, username, _ in peers:
+            entry = self.peers.get(peer_id)
+
+            if entry is None:
+                # The username could have been taken from a cached peer
+                if username is not None and username in self.usernames:
+                    other_id = self.usernames.pop(username)[0]
+                    other = self.peers.get(other_id)
+
+                    if other is not None:
+                        self.peers[other_id] = (other[0], None)
+
+                continue
+
+            if getattr(entry[0], "access_hash", 0) == (access_hash or 0):
+                input_peer = entry[0]
+            else:
+                input_peer = get_input_peer(peer_id, access_hash, peer_type)
+
+            self.set(peer_id, input_peer, username, touch=False)
+
+    def set(self, peer_id: int, input_peer: "raw.base.InputPeer", username: Optional[str], touch: bool = True):
+        # Untouched peers keep their place in the eviction order
+        entry = self.peers.pop(peer_id, None) if touch else self.peers.get(peer_id)
+
+        if entry is not None and entry[1] != username:
+            self.discard_username(entry[1], peer_id)
+
+        self.peers[peer_id] = (input_peer, username)
+
+        if username is not None:
+            self.usernames[username] = (peer_id, time.time() + self.USERNAME_TTL)
+
+        if len(self.peers) > self.capacity:
+            evicted_id, (_, evicted_username) = self.peers.popitem(last=False)
+            self.discard_username(evicted_username, evicted_id)
+
+    def discard_username(self, username: Optional[str], peer_id: int):
+        # The username could belong to another peer by now
+        if username is not None and self.usernames.get(username, (None,))[0] == peer_id:
+            del self.usernames[username]
+
+    def clear(self):
+        self.peers.clear()
+        self.usernames.clear()
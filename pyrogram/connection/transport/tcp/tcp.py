@@ -104,20 +104,25 @@ class TCP:
                 raise OSError(e)
 
     async def recv(self, length: int = 0):
-        data = b""
-
-        while len(data) < length:
-            try:
-                chunk = await asyncio.wait_for(
-                    self.reader.read(length - len(data)),
-                    TCP.TIMEOUT
-                )
-            except (OSError, asyncio.TimeoutError):
-                return None
-            else:
-                if chunk:
-                    data += chunk
-                else:
+        # Chunks are copied straight into a preallocated buffer instead of being concatenated, which would copy the
+        # whole packet received so far for every chunk that arrives.
+        data = bytearray(length)
+        received = 0
+
+        with memoryview(data) as view:
+            while received < length:
+                try:
+                    chunk = await asyncio.wait_for(
+                        self.reader.read(length - received),
+                        TCP.TIMEOUT
+                    )
+                except (OSError, asyncio.TimeoutError):
                     return None
+                else:
+                    if chunk:
+                        view[received:received + len(chunk)] = chunk
+                        received += len(chunk)
+                    else:
+                        return None
 
         return data
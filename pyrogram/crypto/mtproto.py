@@ -19,6 +19,7 @@
 from hashlib import sha256
 from io import BytesIO
 from os import urandom
+from typing import Set
 
 from pyrogram.errors import SecurityCheckMismatch
 from pyrogram.raw.core import Message, Long
@@ -39,35 +40,47 @@ def kdf(auth_key: bytes, msg_key: bytes, outgoing: bool) -> tuple:
 
 
 def pack(message: Message, salt: int, session_id: bytes, auth_key: bytes, auth_key_id: bytes) -> bytes:
-    data = Long(salt) + session_id + message.write()
-    padding = urandom(-(len(data) + 12) % 16 + 12)
+    b = BytesIO()
+    b.write(Long(salt))
+    b.write(session_id)
+    message.write_into(b)
+    b.write(urandom(-(b.tell() + 12) % 16 + 12))  # Padding
+
+    data = b.getvalue()
 
     # 88 = 88 + 0 (outgoing message)
-    msg_key_large = sha256(auth_key[88: 88 + 32] + data + padding).digest()
-    msg_key = msg_key_large[8:24]
+    msg_key_large = sha256(auth_key[88: 88 + 32])
+    msg_key_large.update(data)
+    msg_key = msg_key_large.digest()[8:24]
     aes_key, aes_iv = kdf(auth_key, msg_key, True)
 
-    return auth_key_id + msg_key + aes.ige256_encrypt(data + padding, aes_key, aes_iv)
+    return auth_key_id + msg_key + aes.ige256_encrypt(data, aes_key, aes_iv)
 
 
 def unpack(
-    b: BytesIO,
+    packet: bytes,
     session_id: bytes,
     auth_key: bytes,
-    auth_key_id: bytes
+    auth_key_id: bytes,
+    update_ids: Set[int] = None
 ) -> Message:
-    SecurityCheckMismatch.check(b.read(8) == auth_key_id, "b.read(8) == auth_key_id")
+    # The packet is only ever sliced through a memoryview, so the encrypted payload is handed to the cipher without
+    # being copied first. The decrypted data is wrapped in a BytesIO, which shares the buffer instead of copying it.
+    packet = memoryview(packet)
+
+    SecurityCheckMismatch.check(packet[:8] == auth_key_id, "packet[:8] == auth_key_id")
 
-    msg_key = b.read(16)
+    msg_key = bytes(packet[8:24])
     aes_key, aes_iv = kdf(auth_key, msg_key, False)
-    data = BytesIO(aes.ige256_decrypt(b.read(), aes_key, aes_iv))
+    decrypted = aes.ige256_decrypt(packet[24:], aes_key, aes_iv)
+    data = BytesIO(decrypted)
     data.read(8)  # Salt
 
     # https://core.telegram.org/mtproto/security_guidelines#checking-session-id
     SecurityCheckMismatch.check(data.read(8) == session_id, "data.read(8) == session_id")
 
     try:
-        message = Message.read(data)
+        message = Message.read(data, update_ids)
     except KeyError as e:
         if e.args[0] == 0:
             raise ConnectionError(f"Received empty data. Check your internet connection.")
@@ -82,17 +95,20 @@ def unpack(
 
     # https://core.telegram.org/mtproto/security_guidelines#checking-sha256-hash-value-of-msg-key
     # 96 = 88 + 8 (incoming message)
+    msg_key_large = sha256(auth_key[96:96 + 32])
+    msg_key_large.update(decrypted)
+
     SecurityCheckMismatch.check(
-        msg_key == sha256(auth_key[96:96 + 32] + data.getvalue()).digest()[8:24],
-        "msg_key == sha256(auth_key[96:96 + 32] + data.getvalue()).digest()[8:24]"
+        msg_key == msg_key_large.digest()[8:24],
+        "msg_key == sha256(auth_key[96:96 + 32] + decrypted).digest()[8:24]"
     )
 
     # https://core.telegram.org/mtproto/security_guidelines#checking-message-length
-    data.seek(32)  # Get to the payload, skip salt (8) + session_id (8) + msg_id (8) + seq_no (4) + length (4)
-    payload = data.read()
-    padding = payload[message.length:]
-    SecurityCheckMismatch.check(12 <= len(padding) <= 1024, "12 <= len(padding) <= 1024")
-    SecurityCheckMismatch.check(len(payload) % 4 == 0, "len(payload) % 4 == 0")
+    # 32 = salt (8) + session_id (8) + msg_id (8) + seq_no (4) + length (4)
+    payload_length = len(decrypted) - 32
+    padding_length = payload_length - message.length
+    SecurityCheckMismatch.check(12 <= padding_length <= 1024, "12 <= len(padding) <= 1024")
+    SecurityCheckMismatch.check(payload_length % 4 == 0, "len(payload) % 4 == 0")
 
     # https://core.telegram.org/mtproto/security_guidelines#checking-msg-id
     SecurityCheckMismatch.check(message.msg_id % 2 != 0, "message.msg_id % 2 != 0")
@@ -19,10 +19,12 @@
 import asyncio
 import inspect
 import logging
-from collections import OrderedDict
+import time
+from collections import OrderedDict, Counter
+from typing import List, Optional
 
 import pyrogram
-from pyrogram import utils
+from pyrogram import utils, enums
 from pyrogram.handlers import (
     CallbackQueryHandler, MessageHandler, EditedMessageHandler, DeletedMessagesHandler,
     UserStatusHandler, RawUpdateHandler, InlineQueryHandler, PollHandler,
@@ -35,8 +37,9 @@ from pyrogram.raw.types import (
     UpdateBotCallbackQuery, UpdateInlineBotCallbackQuery,
     UpdateUserStatus, UpdateBotInlineQuery, UpdateMessagePoll,
     UpdateBotInlineSend, UpdateChatParticipant, UpdateChannelParticipant,
-    UpdateBotChatInviteRequester
+    UpdateBotChatInviteRequester, UpdateUserTyping, UpdateChatUserTyping, UpdateChannelUserTyping
 )
+from pyrogram.updates_state import UpdatesState
 
 log = logging.getLogger(__name__)
 
@@ -53,16 +56,65 @@ class Dispatcher:
     CHOSEN_INLINE_RESULT_UPDATES = (UpdateBotInlineSend,)
     CHAT_JOIN_REQUEST_UPDATES = (UpdateBotChatInviteRequester,)
 
+    # Updates only the latest of which matters: while one is still queued, a newer one of the same user replaces it
+    COALESCED_UPDATES = (UpdateUserStatus, UpdateUserTyping)
+
+    # Default updates dropped first when the queue is full and the policy is DROP_LOW_PRIORITY
+    LOW_PRIORITY_UPDATES = (UpdateUserStatus, UpdateUserTyping, UpdateChatUserTyping, UpdateChannelUserTyping)
+
+    HANDLER_UPDATES = {
+        MessageHandler: NEW_MESSAGE_UPDATES,
+        EditedMessageHandler: EDIT_MESSAGE_UPDATES,
+        DeletedMessagesHandler: DELETE_MESSAGES_UPDATES,
+        CallbackQueryHandler: CALLBACK_QUERY_UPDATES,
+        UserStatusHandler: USER_STATUS_UPDATES,
+        InlineQueryHandler: BOT_INLINE_QUERY_UPDATES,
+        PollHandler: POLL_UPDATES,
+        ChosenInlineResultHandler: CHOSEN_INLINE_RESULT_UPDATES,
+        ChatMemberUpdatedHandler: CHAT_MEMBER_UPDATES,
+        ChatJoinRequestHandler: CHAT_JOIN_REQUEST_UPDATES
+    }
+
     def __init__(self, client: "pyrogram.Client"):
         self.client = client
         self.loop = asyncio.get_event_loop()
 
         self.handler_worker_tasks = []
-        self.locks_list = []
 
         self.updates_queue = asyncio.Queue()
         self.groups = OrderedDict()
 
+        # Handler type -> the handlers able to receive its updates (raw update handlers included), grouped by group
+        # and in dispatch order. Rebuilt whenever handlers are added or removed.
+        self.handlers_index = {}
+
+        # In sharded mode each worker has a queue of its own, otherwise they all share the same queue
+        self.updates_queues = (
+            [self.updates_queue] + [asyncio.Queue() for _ in range(self.client.workers - 1)]
+            if self.client.shard_updates
+            else [self.updates_queue]
+        )
+        self.max_queue_depths = [0] * len(self.updates_queues)
+        self.next_queue = 0
+
+        # Queued entries are [enqueued_at, packet, coalesce_key] lists. Coalesced updates are looked up here by key to
+        # replace their packet in place.
+        self.coalesced = {}
+
+        # Cleared when a bounded queue is full, the session stops receiving until it is set again
+        self.room = asyncio.Event()
+        self.room.set()
+
+        self.dropped_updates = Counter()
+        self.coalesced_updates = 0
+        self.handled_updates = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+        # Constructor IDs of the updates the registered handlers are able to receive, None meaning all of them.
+        # Single updates not in this set are skipped by the session without being decoded.
+        self.update_ids = None
+
         async def message_parser(update, users, chats):
             return (
                 await pyrogram.types.Message._parse(self.client, update.message, users, chats,
@@ -144,11 +196,11 @@ class Dispatcher:
 
     async def start(self):
         if not self.client.no_updates:
-            for i in range(self.client.workers):
-                self.locks_list.append(asyncio.Lock())
+            self.update_ids = self.get_update_ids()
 
+            for i in range(self.client.workers):
                 self.handler_worker_tasks.append(
-                    self.loop.create_task(self.handler_worker(self.locks_list[-1]))
+                    self.loop.create_task(self.handler_worker(self.updates_queues[i % len(self.updates_queues)]))
                 )
 
             log.info("Started %s HandlerTasks", self.client.workers)
@@ -156,56 +208,232 @@ class Dispatcher:
     async def stop(self):
         if not self.client.no_updates:
             for i in range(self.client.workers):
-                self.updates_queue.put_nowait(None)
+                self.updates_queues[i % len(self.updates_queues)].put_nowait(None)
 
             for i in self.handler_worker_tasks:
                 await i
 
             self.handler_worker_tasks.clear()
-            self.groups.clear()
+            self.coalesced.clear()
+            self.room.set()
+            self.groups = OrderedDict()
+            self.handlers_index = {}
+            self.update_ids = None
 
             log.info("Stopped %s HandlerTasks", self.client.workers)
 
-    def add_handler(self, handler, group: int):
-        async def fn():
-            for lock in self.locks_list:
-                await lock.acquire()
+    @staticmethod
+    def get_chat_id(update) -> Optional[int]:
+        """Get the id of the chat (or user) an update belongs to, if any."""
+        peer = (
+            getattr(getattr(update, "message", None), "peer_id", None)
+            or getattr(update, "peer", None)
+        )
 
-            try:
-                if group not in self.groups:
-                    self.groups[group] = []
-                    self.groups = OrderedDict(sorted(self.groups.items()))
+        if peer is not None:
+            return utils.get_peer_id(peer)
+
+        channel_id = getattr(update, "channel_id", None)
+
+        if channel_id is not None:
+            return utils.get_channel_id(channel_id)
+
+        chat_id = getattr(update, "chat_id", None)
+
+        if chat_id is not None:
+            return -chat_id
+
+        return getattr(update, "user_id", None)
+
+    @staticmethod
+    def get_coalesce_key(update) -> Optional[tuple]:
+        """Get the key identifying updates that supersede each other, if the update can be coalesced."""
+        if isinstance(update, Dispatcher.COALESCED_UPDATES):
+            return type(update), update.user_id
+
+        return None
+
+    def put_update(self, packet: tuple):
+        """Queue an update packet (update, users, chats) for the workers.
+
+        In sharded mode, updates of the same chat always go to the same queue. Updates not belonging to any chat are
+        spread evenly among the queues.
+
+        When the queues are bounded, coalesced updates replace their queued counterpart and a full queue is dealt with
+        according to the client's updates queue policy.
+        """
+        update = packet[0]
+
+        if len(self.updates_queues) == 1:
+            index = 0
+        else:
+            chat_id = self.get_chat_id(update)
+
+            if chat_id is None:
+                index = self.next_queue
+                self.next_queue = (self.next_queue + 1) % len(self.updates_queues)
+            else:
+                index = chat_id % len(self.updates_queues)
+
+        queue = self.updates_queues[index]
+        size = self.client.updates_queue_size
+        key = None
+
+        if size > 0:
+            key = self.get_coalesce_key(update)
+
+            if key is not None:
+                entry = self.coalesced.get(key)
+
+                if entry is not None:
+                    entry[1] = packet
+                    self.coalesced_updates += 1
+                    return
+
+            if queue.qsize() >= size:
+                policy = self.client.updates_queue_policy
+
+                if policy == enums.UpdatesQueuePolicy.DROP_OLDEST:
+                    self.drop_oldest(queue)
+                elif (
+                    policy == enums.UpdatesQueuePolicy.DROP_LOW_PRIORITY
+                    and isinstance(update, self.client.low_priority_updates)
+                ):
+                    self.dropped_updates[type(update).__name__] += 1
+                    return
+
+        entry = [time.monotonic(), packet, key]
+
+        if key is not None:
+            self.coalesced[key] = entry
+
+        queue.put_nowait(entry)
+
+        if queue.qsize() > self.max_queue_depths[index]:
+            self.max_queue_depths[index] = queue.qsize()
+
+        if (
+            size > 0
+            and queue.qsize() >= size
+            and self.client.updates_queue_policy != enums.UpdatesQueuePolicy.DROP_OLDEST
+        ):
+            self.room.clear()
+
+    def drop_oldest(self, queue: asyncio.Queue):
+        entry = queue.get_nowait()
+
+        # Don't lose a worker stop signal, put it back
+        if entry is None:
+            queue.put_nowait(None)
+            return
 
-                self.groups[group].append(handler)
-            finally:
-                for lock in self.locks_list:
-                    lock.release()
+        _, packet, key = entry
 
-        self.loop.create_task(fn())
+        if key is not None:
+            self.coalesced.pop(key, None)
+
+        self.dropped_updates[type(packet[0]).__name__] += 1
+
+    def get_queue_depths(self) -> List[int]:
+        """Get the number of updates waiting in each queue (one per shard in sharded mode)."""
+        return [queue.qsize() for queue in self.updates_queues]
+
+    def get_metrics(self) -> dict:
+        """Get the updates queue metrics: depths, dropped and coalesced updates and time spent waiting in the queue."""
+        return {
+            "queue_depths": self.get_queue_depths(),
+            "max_queue_depths": list(self.max_queue_depths),
+            "dropped_updates": dict(self.dropped_updates),
+            "coalesced_updates": self.coalesced_updates,
+            "handled_updates": self.handled_updates,
+            "average_wait_time": self.total_wait_time / self.handled_updates if self.handled_updates else 0.0,
+            "max_wait_time": self.max_wait_time
+        }
+
+    def get_update_ids(self):
+        if not self.client.skip_unhandled_updates:
+            return None
+
+        # Updates carrying a pts or qts are needed to keep the updates state in sync, handled or not
+        update_ids = set(UpdatesState.ORDERED_UPDATE_IDS)
+
+        for group in self.groups.values():
+            for handler in group:
+                if isinstance(handler, RawUpdateHandler):
+                    return None
+
+                for handler_type, update_types in self.HANDLER_UPDATES.items():
+                    if isinstance(handler, handler_type):
+                        update_ids.update(update_type.ID for update_type in update_types)
+
+        return update_ids
+
+    def set_groups(self, groups: OrderedDict):
+        """Swap in a new snapshot of the handler groups.
+
+        Groups and the handlers index are never modified in place: workers keep using the snapshot they picked for the
+        update at hand and see the new one with the next update, so registering handlers never waits on them.
+        """
+        handlers_index = {}
+
+        for handler_type in (*self.HANDLER_UPDATES, type(None)):
+            handlers_index[handler_type] = tuple(
+                handlers for handlers in (
+                    tuple(
+                        handler for handler in group
+                        if isinstance(handler, (handler_type, RawUpdateHandler))
+                    )
+                    for group in groups.values()
+                )
+                if handlers
+            )
+
+        self.groups = groups
+        self.handlers_index = handlers_index
+        self.update_ids = self.get_update_ids()
+
+    def add_handler(self, handler, group: int):
+        groups = OrderedDict(self.groups)
+        groups[group] = (*groups.get(group, ()), handler)
+
+        self.set_groups(OrderedDict(sorted(groups.items())))
 
     def remove_handler(self, handler, group: int):
-        async def fn():
-            for lock in self.locks_list:
-                await lock.acquire()
+        if group not in self.groups:
+            raise ValueError(f"Group {group} does not exist. Handler was not removed.")
 
-            try:
-                if group not in self.groups:
-                    raise ValueError(f"Group {group} does not exist. Handler was not removed.")
+        handlers = list(self.groups[group])
+        handlers.remove(handler)
 
-                self.groups[group].remove(handler)
-            finally:
-                for lock in self.locks_list:
-                    lock.release()
+        groups = OrderedDict(self.groups)
+        groups[group] = tuple(handlers)
 
-        self.loop.create_task(fn())
+        self.set_groups(groups)
 
-    async def handler_worker(self, lock):
+    async def handler_worker(self, queue: asyncio.Queue):
         while True:
-            packet = await self.updates_queue.get()
+            entry = await queue.get()
 
-            if packet is None:
+            if entry is None:
                 break
 
+            enqueued_at, packet, key = entry
+
+            if key is not None:
+                self.coalesced.pop(key, None)
+
+            wait_time = time.monotonic() - enqueued_at
+            self.total_wait_time += wait_time
+            self.handled_updates += 1
+
+            if wait_time > self.max_wait_time:
+                self.max_wait_time = wait_time
+
+            size = self.client.updates_queue_size
+
+            if not self.room.is_set() and all(q.qsize() < size for q in self.updates_queues):
+                self.room.set()
+
             try:
                 update, users, chats = packet
                 parser = self.update_parsers.get(type(update), None)
@@ -216,43 +444,41 @@ class Dispatcher:
                     else (None, type(None))
                 )
 
-                async with lock:
-                    for group in self.groups.values():
-                        for handler in group:
-                            args = None
-
-                            if isinstance(handler, handler_type):
-                                try:
-                                    if await handler.check(self.client, parsed_update):
-                                        args = (parsed_update,)
-                                except Exception as e:
-                                    log.exception(e)
-                                    continue
-
-                            elif isinstance(handler, RawUpdateHandler):
-                                args = (update, users, chats)
-
-                            if args is None:
-                                continue
+                for group in self.handlers_index.get(handler_type, ()):
+                    for handler in group:
+                        args = None
 
+                        if isinstance(handler, RawUpdateHandler):
+                            args = (update, users, chats)
+                        else:
                             try:
-                                if inspect.iscoroutinefunction(handler.callback):
-                                    await handler.callback(self.client, *args)
-                                else:
-                                    await self.loop.run_in_executor(
-                                        self.client.executor,
-                                        handler.callback,
-                                        self.client,
-                                        *args
-                                    )
-                            except pyrogram.StopPropagation:
-                                raise
-                            except pyrogram.ContinuePropagation:
-                                continue
+                                if await handler.check(self.client, parsed_update):
+                                    args = (parsed_update,)
                             except Exception as e:
                                 log.exception(e)
+                                continue
 
-                            break
+                        if args is None:
+                            continue
+
+                        try:
+                            if inspect.iscoroutinefunction(handler.callback):
+                                await handler.callback(self.client, *args)
+                            else:
+                                await self.loop.run_in_executor(
+                                    self.client.executor,
+                                    handler.callback,
+                                    self.client,
+                                    *args
+                                )
+                        except pyrogram.StopPropagation:
+                            raise
+                        except pyrogram.ContinuePropagation:
+                            continue
+                        except Exception as e:
+                            log.exception(e)
+
+                        break
             except pyrogram.StopPropagation:
                 pass
             except Exception as e:
@@ -29,6 +29,7 @@ from .next_code_type import NextCodeType
 from .parse_mode import ParseMode
 from .poll_type import PollType
 from .sent_code_type import SentCodeType
+from .updates_queue_policy import UpdatesQueuePolicy
 from .user_status import UserStatus
 
 __all__ = [
@@ -45,5 +46,6 @@ __all__ = [
     'ParseMode', 
     'PollType', 
     'SentCodeType', 
+    'UpdatesQueuePolicy', 
     'UserStatus'
 ]
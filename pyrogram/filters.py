@@ -18,7 +18,7 @@
 
 import inspect
 import re
-from typing import Callable, Union, List, Pattern
+from typing import Callable, Union, List, Pattern, Tuple, Optional, Set
 
 import pyrogram
 from pyrogram import enums
@@ -42,80 +42,141 @@ class Filter:
 class InvertFilter(Filter):
     def __init__(self, base):
         self.base = base
+        self.compiled = None
 
     async def __call__(self, client: "pyrogram.Client", update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
-        else:
-            x = await client.loop.run_in_executor(
-                client.executor,
-                self.base,
-                client, update
-            )
+        if self.compiled is None:
+            self.compiled = CompiledFilter(self)
 
-        return not x
+        return await self.compiled(client, update)
 
 
 class AndFilter(Filter):
     def __init__(self, base, other):
         self.base = base
         self.other = other
+        self.compiled = None
 
     async def __call__(self, client: "pyrogram.Client", update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
-        else:
-            x = await client.loop.run_in_executor(
-                client.executor,
-                self.base,
-                client, update
-            )
-
-        # short circuit
-        if not x:
-            return False
+        if self.compiled is None:
+            self.compiled = CompiledFilter(self)
 
-        if inspect.iscoroutinefunction(self.other.__call__):
-            y = await self.other(client, update)
-        else:
-            y = await client.loop.run_in_executor(
-                client.executor,
-                self.other,
-                client, update
-            )
-
-        return x and y
+        return await self.compiled(client, update)
 
 
 class OrFilter(Filter):
     def __init__(self, base, other):
         self.base = base
         self.other = other
+        self.compiled = None
 
     async def __call__(self, client: "pyrogram.Client", update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
+        if self.compiled is None:
+            self.compiled = CompiledFilter(self)
+
+        return await self.compiled(client, update)
+
+
+def compile_filter(f) -> Tuple[bool, Callable]:
+    """Compile a filter tree into a single evaluator.
+
+    Returns whether the evaluator is asynchronous, together with the evaluator itself. Chains of the same operator
+    are flattened and consecutive synchronous operands are merged, so that they run inline one after the other in a
+    single executor call. Operands are evaluated in order and short-circuit exactly like the operators they replace.
+    """
+    if isinstance(f, InvertFilter):
+        is_async, base = compile_filter(f.base)
+
+        if is_async:
+            async def invert(client, update):
+                return not await base(client, update)
+
+            return True, invert
+
+        return False, lambda client, update: not base(client, update)
+
+    if not isinstance(f, (AndFilter, OrFilter)):
+        return inspect.iscoroutinefunction(f.__call__), f
+
+    is_and = isinstance(f, AndFilter)
+    operands = []
+    stack = [f]
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is type(f):
+            stack.extend((node.other, node.base))
         else:
-            x = await client.loop.run_in_executor(
-                client.executor,
-                self.base,
-                client, update
-            )
-
-        # short circuit
-        if x:
-            return True
-
-        if inspect.iscoroutinefunction(self.other.__call__):
-            y = await self.other(client, update)
+            operands.append(compile_filter(node))
+
+    segments = []
+
+    for is_async, operand in operands:
+        if not is_async and segments and not segments[-1][0]:
+            segments[-1][1].append(operand)
         else:
-            y = await client.loop.run_in_executor(
-                client.executor,
-                self.other,
-                client, update
-            )
+            segments.append((is_async, operand if is_async else [operand]))
+
+    def sync_segment(evaluators: List[Callable]):
+        def evaluate(client, update):
+            x = None
+
+            for e in evaluators:
+                x = e(client, update)
+
+                # short circuit
+                if is_and and not x:
+                    return False
+
+                if not is_and and x:
+                    return True
+
+            return x
 
-        return x or y
+        return evaluate
+
+    segments = [(is_async, segment if is_async else sync_segment(segment)) for is_async, segment in segments]
+
+    if len(segments) == 1:
+        return segments[0]
+
+    async def evaluate(client, update):
+        x = None
+
+        for is_async, segment in segments:
+            if is_async:
+                x = await segment(client, update)
+            else:
+                x = await client.loop.run_in_executor(client.executor, segment, client, update)
+
+            # short circuit
+            if is_and and not x:
+                return False
+
+            if not is_and and x:
+                return True
+
+        return x
+
+    return True, evaluate
+
+
+class CompiledFilter:
+    """A filter tree compiled by :func:`compile_filter`, awaitable as any other filter."""
+
+    def __init__(self, f):
+        self.is_async, self.evaluate = compile_filter(f)
+
+    async def __call__(self, client: "pyrogram.Client", update: Update):
+        if self.is_async:
+            return await self.evaluate(client, update)
+
+        return await client.loop.run_in_executor(
+            client.executor,
+            self.evaluate,
+            client, update
+        )
 
 
 CUSTOM_FILTER_NAME = "CustomFilter"
@@ -747,6 +808,163 @@ linked_channel = create(linked_channel_filter)
 
 
 # region command_filter
+class VersionedSet(set):
+    """Set counting the changes made to it in place, so that what is built from it can tell when it's outdated."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = 0
+
+
+def _versioned(name: str) -> Callable:
+    method = getattr(set, name)
+
+    def wrapper(self, *args):
+        self.version += 1
+        return method(self, *args)
+
+    wrapper.__name__ = name
+
+    return wrapper
+
+
+for _name in (
+    "add", "discard", "remove", "pop", "clear", "update", "difference_update", "intersection_update",
+    "symmetric_difference_update", "__ior__", "__iand__", "__isub__", "__ixor__"
+):
+    setattr(VersionedSet, _name, _versioned(_name))
+
+del _name
+
+
+class CommandMatcher:
+    """Match commands in a single pass over the text.
+
+    Prefixes and commands are kept in two character tries built once, so that matching takes a time proportional to
+    the length of the text, no matter how many commands there are.
+    """
+
+    ARGUMENTS_RE = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+    UNESCAPE_RE = re.compile(r"\\([\"'])")
+
+    def __init__(self, commands: VersionedSet, prefixes: VersionedSet, case_sensitive: bool):
+        # The sets the tries are built from can still be replaced or changed in place afterwards
+        self.commands = commands
+        self.prefixes = prefixes
+        self.commands_version = commands.version
+        self.prefixes_version = prefixes.version
+        self.case_sensitive = case_sensitive
+
+        self.commands_trie = self.build_trie(commands, case_sensitive)
+        self.prefixes_trie = self.build_trie(prefixes, True)
+
+    def is_outdated(self, commands: VersionedSet, prefixes: VersionedSet) -> bool:
+        return (
+            commands is not self.commands or commands.version != self.commands_version
+            or prefixes is not self.prefixes or prefixes.version != self.prefixes_version
+        )
+
+    @staticmethod
+    def build_trie(words: Set[str], case_sensitive: bool) -> dict:
+        trie = {}
+
+        for word in words:
+            node = trie
+
+            for char in word if case_sensitive else word.lower():
+                node = node.setdefault(char, {})
+
+            # The None key marks the end of a word, holding the word itself
+            node[None] = word
+
+        return trie
+
+    def match_mention(self, text: str, start: int, username: str) -> Optional[int]:
+        """Get where a command ending at *start* actually ends, optionally mentioning *username*, if anywhere."""
+        mention_start = start + 1 if text.startswith("@", start) else start
+        mention_end = mention_start + len(username)
+        mention = text[mention_start:mention_end]
+
+        if mention == username or not self.case_sensitive and mention.lower() == username.lower():
+            if mention_end == len(text) or text[mention_end].isspace():
+                return mention_end
+
+        if start == len(text) or text[start].isspace():
+            return start
+
+        return None
+
+    def match(self, text: str, username: str) -> Optional[Tuple[str, int]]:
+        """Get the command the text starts with, together with the position it ends at (mention included).
+
+        The longest prefix and, after that, the longest command win.
+        """
+        prefix_ends = []
+        node = self.prefixes_trie
+
+        for i, char in enumerate(text):
+            if None in node:
+                prefix_ends.append(i)
+
+            node = node.get(char)
+
+            if node is None:
+                break
+        else:
+            if None in node:
+                prefix_ends.append(len(text))
+
+        for start in reversed(prefix_ends):
+            result = None
+            node = self.commands_trie
+            i = start
+
+            while True:
+                if None in node:
+                    end = self.match_mention(text, i, username)
+
+                    if end is not None:
+                        result = (node[None], end)
+
+                if i == len(text):
+                    break
+
+                for char in text[i] if self.case_sensitive else text[i].lower():
+                    node = node.get(char)
+
+                    if node is None:
+                        break
+
+                if node is None:
+                    break
+
+                i += 1
+
+            if result is not None:
+                return result
+
+        return None
+
+    def parse(self, text: str, username: str) -> Optional[List[str]]:
+        """Get the command the text starts with followed by its arguments, or None if there's no command."""
+        result = self.match(text, username)
+
+        if result is None:
+            return None
+
+        cmd, end = result
+
+        if end < len(text) and text[end].isspace():
+            end += 1
+
+        # match.groups are 1-indexed, group(1) is the quote, group(2) is the text
+        # between the quotes, group(3) is unquoted, whitespace-split text
+        arguments = [m.group(2) or m.group(3) or "" for m in self.ARGUMENTS_RE.finditer(text, end)]
+
+        # Remove the escape character from the arguments
+        return [cmd] + [self.UNESCAPE_RE.sub(r"\1", a) if "\\" in a else a for a in arguments]
+
+
 def command(commands: Union[str, List[str]], prefixes: Union[str, List[str]] = "/", case_sensitive: bool = False):
     """Filter commands, i.e.: text messages starting with "/" or any other custom prefix.
 
@@ -766,56 +984,48 @@ def command(commands: Union[str, List[str]], prefixes: Union[str, List[str]] = "
             Pass True if you want your command(s) to be case sensitive. Defaults to False.
             Examples: when True, command="Start" would trigger /Start but not /start.
     """
-    command_re = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
 
     async def func(flt, client: pyrogram.Client, message: Message):
         username = client.me.username or ""
         text = message.text or message.caption
-        message.command = None
 
         if not text:
             return False
 
-        for prefix in flt.prefixes:
-            if not text.startswith(prefix):
-                continue
-
-            without_prefix = text[len(prefix):]
+        if flt.matcher.is_outdated(flt.commands, flt.prefixes):
+            # Sets assigned in place of the original ones are made versioned as well
+            if not isinstance(flt.commands, VersionedSet):
+                flt.commands = VersionedSet(flt.commands)
 
-            for cmd in flt.commands:
-                if not re.match(rf"^(?:{cmd}(?:@?{username})?)(?:\s|$)", without_prefix,
-                                flags=re.IGNORECASE if not flt.case_sensitive else 0):
-                    continue
+            if not isinstance(flt.prefixes, VersionedSet):
+                flt.prefixes = VersionedSet(flt.prefixes)
 
-                without_command = re.sub(rf"{cmd}(?:@?{username})?\s?", "", without_prefix, count=1,
-                                         flags=re.IGNORECASE if not flt.case_sensitive else 0)
+            flt.matcher = CommandMatcher(flt.commands, flt.prefixes, flt.case_sensitive)
 
-                # match.groups are 1-indexed, group(1) is the quote, group(2) is the text
-                # between the quotes, group(3) is unquoted, whitespace-split text
+        command = flt.matcher.parse(text, username)
 
-                # Remove the escape character from the arguments
-                message.command = [cmd] + [
-                    re.sub(r"\\([\"'])", r"\1", m.group(2) or m.group(3) or "")
-                    for m in command_re.finditer(without_command)
-                ]
+        # Don't overwrite the command found by another filter, e.g.: in command("a") | command("b")
+        if command is None:
+            return False
 
-                return True
+        message.command = command
 
-        return False
+        return True
 
     commands = commands if isinstance(commands, list) else [commands]
-    commands = {c if case_sensitive else c.lower() for c in commands}
+    commands = VersionedSet(c if case_sensitive else c.lower() for c in commands)
 
     prefixes = [] if prefixes is None else prefixes
     prefixes = prefixes if isinstance(prefixes, list) else [prefixes]
-    prefixes = set(prefixes) if prefixes else {""}
+    prefixes = VersionedSet(prefixes if prefixes else [""])
 
     return create(
         func,
         "CommandFilter",
         commands=commands,
         prefixes=prefixes,
-        case_sensitive=case_sensitive
+        case_sensitive=case_sensitive,
+        matcher=CommandMatcher(commands, prefixes, case_sensitive)
     )
 
 
@@ -0,0 +1,92 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import inspect
+from typing import Callable, Dict, List, Union
+
+import pyrogram
+from pyrogram.types import Message
+from .message_handler import MessageHandler
+
+
+class CommandRouter(MessageHandler):
+    """The Command router class. Used to handle many commands, each with a callback of its own, at once.
+    It is intended to be used with :meth:`~pyrogram.Client.add_handler`
+
+    Instead of registering one handler with a :meth:`~pyrogram.filters.command` filter per command, which are checked
+    one after the other, all the commands of a router are matched together in a single pass over the message text,
+    no matter how many they are.
+
+    Parameters:
+        prefixes (``str`` | ``list``, *optional*):
+            A prefix or a list of prefixes as string the commands should start with.
+            Defaults to "/" (slash). Pass None or "" (empty string) to allow commands with no prefix at all.
+
+        case_sensitive (``bool``, *optional*):
+            Pass True if you want the commands to be case sensitive. Defaults to False.
+
+        filters (:obj:`Filters`):
+            Pass one or more filters to allow only a subset of the command messages to be routed.
+
+    Example:
+        .. code-block:: python
+
+            from pyrogram import Client
+            from pyrogram.handlers import CommandRouter
+
+            async def start(client, message):
+                await message.reply("Hello")
+
+            app = Client("my_account")
+
+            router = CommandRouter()
+            router.add_command(["start", "hello"], start)
+
+            app.add_handler(router)
+    """
+
+    def __init__(self, prefixes: Union[str, List[str]] = "/", case_sensitive: bool = False, filters=None):
+        self.command_filter = pyrogram.filters.command([], prefixes, case_sensitive)
+        self.callbacks = {}  # type: Dict[str, Callable]
+
+        super().__init__(self.route, self.command_filter & filters if filters else self.command_filter)
+
+    def add_command(self, commands: Union[str, List[str]], callback: Callable):
+        """Route one or more commands to a callback taking *(client, message)* as positional arguments."""
+        for command in commands if isinstance(commands, list) else [commands]:
+            self.callbacks[command if self.command_filter.case_sensitive else command.lower()] = callback
+
+        self.command_filter.commands = set(self.callbacks)
+
+    def remove_command(self, commands: Union[str, List[str]]):
+        """Stop routing one or more commands."""
+        for command in commands if isinstance(commands, list) else [commands]:
+            self.callbacks.pop(command if self.command_filter.case_sensitive else command.lower(), None)
+
+        self.command_filter.commands = set(self.callbacks)
+
+    async def route(self, client: "pyrogram.Client", message: Message):
+        callback = self.callbacks.get(message.command[0])
+
+        if callback is None:
+            return
+
+        if inspect.iscoroutinefunction(callback):
+            await callback(client, message)
+        else:
+            await client.loop.run_in_executor(client.executor, callback, client, message)
@@ -16,11 +16,10 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
-import inspect
 from typing import Callable
 
 import pyrogram
-from pyrogram.filters import Filter
+from pyrogram.filters import Filter, CompiledFilter
 from pyrogram.types import Update
 
 
@@ -28,16 +27,14 @@ class Handler:
     def __init__(self, callback: Callable, filters: Filter = None):
         self.callback = callback
         self.filters = filters
+        self.compiled_filters = (filters, CompiledFilter(filters)) if callable(filters) else None
 
     async def check(self, client: "pyrogram.Client", update: Update):
         if callable(self.filters):
-            if inspect.iscoroutinefunction(self.filters.__call__):
-                return await self.filters(client, update)
-            else:
-                return await client.loop.run_in_executor(
-                    client.executor,
-                    self.filters,
-                    client, update
-                )
+            # Compiled again only in case the filters get replaced
+            if self.compiled_filters is None or self.compiled_filters[0] is not self.filters:
+                self.compiled_filters = (self.filters, CompiledFilter(self.filters))
+
+            return await self.compiled_filters[1](client, update)
 
         return True
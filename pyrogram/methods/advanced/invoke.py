@@ -86,4 +86,6 @@ class Invoke:
         await self.fetch_peers(getattr(r, "users", []))
         await self.fetch_peers(getattr(r, "chats", []))
 
+        self.updates_state.track(r, query)
+
         return r
@@ -58,8 +58,16 @@ class ResolvePeer:
         if not self.is_connected:
             raise ConnectionError("Client has not been started yet")
 
+        input_peer = (
+            self.peers_cache.get(peer_id) if isinstance(peer_id, int)
+            else self.peers_cache.get_by_username(re.sub(r"[@+\s]", "", peer_id.lower()))
+        )
+
+        if input_peer is not None:
+            return input_peer
+
         try:
-            return await self.storage.get_peer_by_id(peer_id)
+            input_peer = await self.storage.get_peer_by_id(peer_id)
         except KeyError:
             if isinstance(peer_id, str):
                 if peer_id in ("self", "me"):
@@ -71,7 +79,7 @@ class ResolvePeer:
                     int(peer_id)
                 except ValueError:
                     try:
-                        return await self.storage.get_peer_by_username(peer_id)
+                        input_peer = await self.storage.get_peer_by_username(peer_id)
                     except KeyError:
                         await self.invoke(
                             raw.functions.contacts.ResolveUsername(
@@ -80,6 +88,9 @@ class ResolvePeer:
                         )
 
                         return await self.storage.get_peer_by_username(peer_id)
+                    else:
+                        self.peers_cache.put(input_peer, peer_id)
+                        return input_peer
                 else:
                     try:
                         return await self.storage.get_peer_by_phone_number(peer_id)
@@ -123,3 +134,6 @@ class ResolvePeer:
                 return await self.storage.get_peer_by_id(peer_id)
             except KeyError:
                 raise PeerIdInvalid
+        else:
+            self.peers_cache.put(input_peer)
+            return input_peer
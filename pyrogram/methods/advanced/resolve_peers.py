@@ -0,0 +1,147 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+from typing import Union, List, Iterable, Optional
+
+import pyrogram
+from pyrogram import raw
+from pyrogram import utils
+from pyrogram.errors import BadRequest
+
+log = logging.getLogger(__name__)
+
+# Peers fetched per users.GetUsers, messages.GetChats or channels.GetChannels call
+MAX_PEERS_PER_CALL = 200
+# Usernames and phone numbers being resolved at the same time
+MAX_CONCURRENT_RESOLUTIONS = 8
+
+
+class ResolvePeers:
+    async def resolve_peers(
+        self: "pyrogram.Client",
+        peer_ids: Iterable[Union[int, str]]
+    ) -> List[Optional[raw.base.InputPeer]]:
+        """Get the InputPeers of many peers at once.
+
+        Unlike calling :meth:`~pyrogram.Client.resolve_peer` for each of them, ids are looked up in the storage all
+        together and the unknown ones are fetched with as few requests as possible, grouped by peer type.
+        Usernames and phone numbers are resolved a few at a time.
+
+        .. include:: /_includes/usable-by/users-bots.rst
+
+        Parameters:
+            peer_ids (Iterable of ``int`` | ``str``):
+                The peer ids you want to extract the InputPeers from.
+                Each one can be a direct id (int), a username (str) or a phone number (str).
+
+        Returns:
+            List of ``InputPeer``: The resolved peers, in the same order as *peer_ids*. Peers that couldn't be
+            resolved are None.
+
+        Example:
+            .. code-block:: python
+
+                peers = await app.resolve_peers([12345, "pyrogram", -1001234567890])
+        """
+        if not self.is_connected:
+            raise ConnectionError("Client has not been started yet")
+
+        peer_ids = list(peer_ids)
+        peers = {}
+
+        ids = {i for i in peer_ids if isinstance(i, int)}
+        strings = {i for i in peer_ids if not isinstance(i, int)}
+
+        for peer_id in ids:
+            input_peer = self.peers_cache.get(peer_id)
+
+            if input_peer is not None:
+                peers[peer_id] = input_peer
+
+        missing = [i for i in ids if i not in peers]
+
+        if missing:
+            found = await self.storage.get_peers_by_id(missing)
+
+            for input_peer in found.values():
+                self.peers_cache.put(input_peer)
+
+            peers.update(found)
+            missing = [i for i in missing if i not in peers]
+
+        if missing:
+            await self.fetch_missing_peers(missing)
+            peers.update(await self.storage.get_peers_by_id(missing))
+
+        if strings:
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_RESOLUTIONS)
+
+            async def resolve(peer_id: str):
+                async with semaphore:
+                    try:
+                        peers[peer_id] = await self.resolve_peer(peer_id)
+                    except (KeyError, BadRequest) as e:
+                        log.debug("Unable to resolve %s: %s", peer_id, e)
+
+            await asyncio.gather(*[resolve(i) for i in strings])
+
+        return [peers.get(i) for i in peer_ids]
+
+    async def fetch_missing_peers(self: "pyrogram.Client", peer_ids: List[int]):
+        users, chats, channels = [], [], []
+
+        for peer_id in peer_ids:
+            try:
+                peer_type = utils.get_peer_type(peer_id)
+            except ValueError:
+                continue
+
+            if peer_type == "user":
+                users.append(raw.types.InputUser(user_id=peer_id, access_hash=0))
+            elif peer_type == "chat":
+                chats.append(-peer_id)
+            else:
+                channels.append(raw.types.InputChannel(channel_id=utils.get_channel_id(peer_id), access_hash=0))
+
+        for query_type, ids in (
+            (raw.functions.users.GetUsers, users),
+            (raw.functions.messages.GetChats, chats),
+            (raw.functions.channels.GetChannels, channels)
+        ):
+            for i in range(0, len(ids), MAX_PEERS_PER_CALL):
+                await self.fetch_peers_chunk(query_type, ids[i:i + MAX_PEERS_PER_CALL])
+
+    async def fetch_peers_chunk(self: "pyrogram.Client", query_type: type, ids: list):
+        """Fetch a chunk of peers, splitting it in halves on errors so that only the invalid ids are left out."""
+        try:
+            r = await self.invoke(query_type(id=ids))
+        except BadRequest as e:
+            if len(ids) == 1:
+                log.debug("Unable to get %s: %s", ids[0], e)
+                return
+
+            half = len(ids) // 2
+
+            await self.fetch_peers_chunk(query_type, ids[:half])
+            await self.fetch_peers_chunk(query_type, ids[half:])
+        else:
+            # Chats and channels come in messages.Chats, already stored by invoke
+            if isinstance(r, list):
+                await self.fetch_peers(r)
@@ -17,6 +17,7 @@
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import contextlib
 import functools
 import inspect
 import io
@@ -30,7 +31,6 @@ from typing import Union, BinaryIO, Callable
 import pyrogram
 from pyrogram import StopTransmission
 from pyrogram import raw
-from pyrogram.session import Session
 
 log = logging.getLogger(__name__)
 
@@ -139,88 +139,86 @@ class SaveFile:
             is_missing_part = file_id is not None
             file_id = file_id or self.rnd_id()
             md5_sum = md5() if not is_big and not is_missing_part else None
-            session = Session(
-                self, await self.storage.dc_id(), await self.storage.auth_key(),
-                await self.storage.test_mode(), is_media=True
-            )
-            workers = [self.loop.create_task(worker(session)) for _ in range(workers_count)]
+
             queue = asyncio.Queue(1)
+            workers = []
+
+            async with contextlib.AsyncExitStack() as stack:
+                try:
+                    # Borrowed inside the try, so that failing to start the session is handled like any other error
+                    session = await stack.enter_async_context(self.use_media_session(await self.storage.dc_id()))
+                    workers = [self.loop.create_task(worker(session)) for _ in range(workers_count)]
+
+                    fp.seek(part_size * file_part)
+
+                    while True:
+                        chunk = fp.read(part_size)
+
+                        if not chunk:
+                            if not is_big and not is_missing_part:
+                                md5_sum = "".join([hex(i)[2:].zfill(2) for i in md5_sum.digest()])
+                            break
+
+                        if is_big:
+                            rpc = raw.functions.upload.SaveBigFilePart(
+                                file_id=file_id,
+                                file_part=file_part,
+                                file_total_parts=file_total_parts,
+                                bytes=chunk
+                            )
+                        else:
+                            rpc = raw.functions.upload.SaveFilePart(
+                                file_id=file_id,
+                                file_part=file_part,
+                                bytes=chunk
+                            )
 
-            try:
-                await session.start()
+                        await queue.put(rpc)
 
-                fp.seek(part_size * file_part)
+                        if is_missing_part:
+                            return
 
-                while True:
-                    chunk = fp.read(part_size)
-
-                    if not chunk:
                         if not is_big and not is_missing_part:
-                            md5_sum = "".join([hex(i)[2:].zfill(2) for i in md5_sum.digest()])
-                        break
-
+                            md5_sum.update(chunk)
+
+                        file_part += 1
+
+                        if progress:
+                            func = functools.partial(
+                                progress,
+                                min(file_part * part_size, file_size),
+                                file_size,
+                                *progress_args
+                            )
+
+                            if inspect.iscoroutinefunction(progress):
+                                await func()
+                            else:
+                                await self.loop.run_in_executor(self.executor, func)
+                except StopTransmission:
+                    raise
+                except Exception as e:
+                    log.exception(e)
+                else:
                     if is_big:
-                        rpc = raw.functions.upload.SaveBigFilePart(
-                            file_id=file_id,
-                            file_part=file_part,
-                            file_total_parts=file_total_parts,
-                            bytes=chunk
+                        return raw.types.InputFileBig(
+                            id=file_id,
+                            parts=file_total_parts,
+                            name=file_name,
+
                         )
                     else:
-                        rpc = raw.functions.upload.SaveFilePart(
-                            file_id=file_id,
-                            file_part=file_part,
-                            bytes=chunk
+                        return raw.types.InputFile(
+                            id=file_id,
+                            parts=file_total_parts,
+                            name=file_name,
+                            md5_checksum=md5_sum
                         )
+                finally:
+                    for _ in workers:
+                        await queue.put(None)
 
-                    await queue.put(rpc)
-
-                    if is_missing_part:
-                        return
+                    await asyncio.gather(*workers)
 
-                    if not is_big and not is_missing_part:
-                        md5_sum.update(chunk)
-
-                    file_part += 1
-
-                    if progress:
-                        func = functools.partial(
-                            progress,
-                            min(file_part * part_size, file_size),
-                            file_size,
-                            *progress_args
-                        )
-
-                        if inspect.iscoroutinefunction(progress):
-                            await func()
-                        else:
-                            await self.loop.run_in_executor(self.executor, func)
-            except StopTransmission:
-                raise
-            except Exception as e:
-                log.exception(e)
-            else:
-                if is_big:
-                    return raw.types.InputFileBig(
-                        id=file_id,
-                        parts=file_total_parts,
-                        name=file_name,
-
-                    )
-                else:
-                    return raw.types.InputFile(
-                        id=file_id,
-                        parts=file_total_parts,
-                        name=file_name,
-                        md5_checksum=md5_sum
-                    )
-            finally:
-                for _ in workers:
-                    await queue.put(None)
-
-                await asyncio.gather(*workers)
-
-                await session.stop()
-
-                if isinstance(path, (str, PurePath)):
-                    fp.close()
+                    if isinstance(path, (str, PurePath)):
+                        fp.close()
@@ -37,4 +37,5 @@ class Disconnect:
 
         await self.session.stop()
         await self.storage.close()
+        self.peers_cache.clear()
         self.is_connected = False
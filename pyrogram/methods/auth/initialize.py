@@ -46,6 +46,7 @@ class Initialize:
         self.load_plugins()
 
         await self.dispatcher.start()
+        await self.updates_state.start()
 
         self.updates_watchdog_task = asyncio.create_task(self.updates_watchdog())
 
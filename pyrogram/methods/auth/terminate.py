@@ -43,10 +43,14 @@ class Terminate:
             await self.invoke(raw.functions.account.FinishTakeoutSession())
             log.info("Takeout session %s finished", self.takeout_id)
 
+        await self.updates_state.stop()
         await self.storage.save()
         await self.dispatcher.stop()
 
         for media_session in self.media_sessions.values():
+            if media_session.idle_handle is not None:
+                media_session.idle_handle.cancel()
+
             await media_session.stop()
 
         self.media_sessions.clear()
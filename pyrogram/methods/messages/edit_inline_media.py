@@ -27,7 +27,7 @@ from pyrogram import types
 from pyrogram import utils
 from pyrogram.errors import RPCError, MediaEmpty
 from pyrogram.file_id import FileType
-from .inline_session import get_session
+from .inline_session import use_session
 
 
 class EditInlineMedia:
@@ -196,8 +196,6 @@ class EditInlineMedia:
         unpacked = utils.unpack_inline_message_id(inline_message_id)
         dc_id = unpacked.dc_id
 
-        session = await get_session(self, dc_id)
-
         if is_uploaded_file:
             uploaded_media = await self.invoke(
                 raw.functions.messages.UploadMedia(
@@ -224,21 +222,22 @@ class EditInlineMedia:
         else:
             actual_media = media
 
-        for i in range(self.MAX_RETRIES):
-            try:
-                return await session.invoke(
-                    raw.functions.messages.EditInlineBotMessage(
-                        id=unpacked,
-                        media=actual_media,
-                        reply_markup=await reply_markup.write(self) if reply_markup else None,
-                        **await self.parser.parse(caption, parse_mode)
-                    ),
-                    sleep_threshold=self.sleep_threshold
-                )
-            except RPCError as e:
-                if i == self.MAX_RETRIES - 1:
-                    raise
-
-                if isinstance(e, MediaEmpty):
-                    # Must wait due to a server race condition
-                    await asyncio.sleep(1)
+        async with use_session(self, dc_id) as session:
+            for i in range(self.MAX_RETRIES):
+                try:
+                    return await session.invoke(
+                        raw.functions.messages.EditInlineBotMessage(
+                            id=unpacked,
+                            media=actual_media,
+                            reply_markup=await reply_markup.write(self) if reply_markup else None,
+                            **await self.parser.parse(caption, parse_mode)
+                        ),
+                        sleep_threshold=self.sleep_threshold
+                    )
+                except RPCError as e:
+                    if i == self.MAX_RETRIES - 1:
+                        raise
+
+                    if isinstance(e, MediaEmpty):
+                        # Must wait due to a server race condition
+                        await asyncio.sleep(1)
@@ -20,7 +20,7 @@ import pyrogram
 from pyrogram import raw
 from pyrogram import types
 from pyrogram import utils
-from .inline_session import get_session
+from .inline_session import use_session
 
 
 class EditInlineReplyMarkup:
@@ -58,12 +58,11 @@ class EditInlineReplyMarkup:
         unpacked = utils.unpack_inline_message_id(inline_message_id)
         dc_id = unpacked.dc_id
 
-        session = await get_session(self, dc_id)
-
-        return await session.invoke(
-            raw.functions.messages.EditInlineBotMessage(
-                id=unpacked,
-                reply_markup=await reply_markup.write(self) if reply_markup else None,
-            ),
-            sleep_threshold=self.sleep_threshold
-        )
+        async with use_session(self, dc_id) as session:
+            return await session.invoke(
+                raw.functions.messages.EditInlineBotMessage(
+                    id=unpacked,
+                    reply_markup=await reply_markup.write(self) if reply_markup else None,
+                ),
+                sleep_threshold=self.sleep_threshold
+            )
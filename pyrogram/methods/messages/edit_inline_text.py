@@ -22,7 +22,7 @@ import pyrogram
 from pyrogram import raw, enums
 from pyrogram import types
 from pyrogram import utils
-from .inline_session import get_session
+from .inline_session import use_session
 
 
 class EditInlineText:
@@ -75,14 +75,13 @@ class EditInlineText:
         unpacked = utils.unpack_inline_message_id(inline_message_id)
         dc_id = unpacked.dc_id
 
-        session = await get_session(self, dc_id)
-
-        return await session.invoke(
-            raw.functions.messages.EditInlineBotMessage(
-                id=unpacked,
-                no_webpage=disable_web_page_preview or None,
-                reply_markup=await reply_markup.write(self) if reply_markup else None,
-                **await self.parser.parse(text, parse_mode)
-            ),
-            sleep_threshold=self.sleep_threshold
-        )
+        async with use_session(self, dc_id) as session:
+            return await session.invoke(
+                raw.functions.messages.EditInlineBotMessage(
+                    id=unpacked,
+                    no_webpage=disable_web_page_preview or None,
+                    reply_markup=await reply_markup.write(self) if reply_markup else None,
+                    **await self.parser.parse(text, parse_mode)
+                ),
+                sleep_threshold=self.sleep_threshold
+            )
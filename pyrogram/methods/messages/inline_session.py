@@ -16,49 +16,21 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
+from typing import AsyncGenerator, Union
+
 import pyrogram
-from pyrogram import raw
-from pyrogram.errors import AuthBytesInvalid
 from pyrogram.session import Session
-from pyrogram.session.auth import Auth
 
 
-async def get_session(client: "pyrogram.Client", dc_id: int):
+@contextlib.asynccontextmanager
+async def use_session(
+    client: "pyrogram.Client",
+    dc_id: int
+) -> AsyncGenerator[Union["pyrogram.Client", Session], None]:
+    """Borrow what inline messages of the given DC are edited through: the client itself or a pooled media session."""
     if dc_id == await client.storage.dc_id():
-        return client
-
-    async with client.media_sessions_lock:
-        if client.media_sessions.get(dc_id):
-            return client.media_sessions[dc_id]
-
-        session = client.media_sessions[dc_id] = Session(
-            client, dc_id,
-            await Auth(client, dc_id, await client.storage.test_mode()).create(),
-            await client.storage.test_mode(), is_media=True
-        )
-
-        await session.start()
-
-        for _ in range(3):
-            exported_auth = await client.invoke(
-                raw.functions.auth.ExportAuthorization(
-                    dc_id=dc_id
-                )
-            )
-
-            try:
-                await session.invoke(
-                    raw.functions.auth.ImportAuthorization(
-                        id=exported_auth.id,
-                        bytes=exported_auth.bytes
-                    )
-                )
-            except AuthBytesInvalid:
-                continue
-            else:
-                break
-        else:
-            await session.stop()
-            raise AuthBytesInvalid
-
-        return session
+        yield client
+    else:
+        async with client.use_media_session(dc_id) as session:
+            yield session
@@ -17,7 +17,7 @@
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
 from io import BytesIO
-from typing import Any
+from typing import Any, Set
 
 from .primitives.int import Int, Long
 from .tl_object import TLObject
@@ -26,31 +26,60 @@ from .tl_object import TLObject
 class Message(TLObject):
     ID = 0x5BB8E511  # hex(crc32(b"message msg_id:long seqno:int bytes:int body:Object = Message"))
 
-    __slots__ = ["msg_id", "seq_no", "length", "body"]
+    __slots__ = ["msg_id", "seq_no", "length", "body", "_body"]
 
     QUALNAME = "Message"
 
-    def __init__(self, body: TLObject, msg_id: int, seq_no: int, length: int):
+    UPDATE_SHORT_ID = 0x78D4DEC1  # hex(crc32(b"updateShort update:Update date:int = Updates"))
+
+    def __init__(self, body: TLObject, msg_id: int, seq_no: int, length: int, serialized_body: bytes = None):
         self.msg_id = msg_id
         self.seq_no = seq_no
         self.length = length
         self.body = body
 
+        # The body already serialized by whom computed its length, reused as it is when writing the message
+        self._body = serialized_body
+
     @staticmethod
-    def read(data: BytesIO, *args: Any) -> "Message":
+    def read(data: BytesIO, update_ids: Set[int] = None, *args: Any) -> "Message":
+        """Read a message.
+
+        When *update_ids* is given, a body consisting of a single update (updateShort) whose constructor ID is not
+        part of the set is skipped without being decoded, and the message is returned with a ``None`` body.
+        """
         msg_id = Long.read(data)
         seq_no = Int.read(data)
         length = Int.read(data)
-        body = data.read(length)
 
-        return Message(TLObject.read(BytesIO(body)), msg_id, seq_no, length)
+        # The body is decoded from a stream of its own: a bare vector returned as RPC result needs to know where
+        # the body ends to find out its element size.
+        body = BytesIO(data.read(length))
+
+        if update_ids is None:
+            return Message(TLObject.read(body), msg_id, seq_no, length)
+
+        constructor_id = Int.read(body, False)
+        update_id = Int.read(body, False)
+        body.seek(0)
+
+        if constructor_id == Message.UPDATE_SHORT_ID and update_id not in update_ids:
+            return Message(None, msg_id, seq_no, length)
+
+        return Message(TLObject.read(body, update_ids), msg_id, seq_no, length)
 
     def write(self, *args: Any) -> bytes:
         b = BytesIO()
+        self.write_into(b)
 
+        return b.getvalue()
+
+    def write_into(self, b: BytesIO, *args: Any) -> None:
         b.write(Long(self.msg_id))
         b.write(Int(self.seq_no))
         b.write(Int(self.length))
-        b.write(self.body.write())
 
-        return b.getvalue()
+        if self._body is not None:
+            b.write(self._body)
+        else:
+            self.body.write_into(b)
@@ -37,17 +37,19 @@ class MsgContainer(TLObject):
     @staticmethod
     def read(data: BytesIO, *args: Any) -> "MsgContainer":
         count = Int.read(data)
-        return MsgContainer([Message.read(data) for _ in range(count)])
+        return MsgContainer([Message.read(data, *args) for _ in range(count)])
 
     def write(self, *args: Any) -> bytes:
         b = BytesIO()
+        self.write_into(b)
 
+        return b.getvalue()
+
+    def write_into(self, b: BytesIO, *args: Any) -> None:
         b.write(Int(self.ID, False))
 
         count = len(self.messages)
         b.write(Int(count))
 
         for message in self.messages:
-            b.write(message.write())
-
-        return b.getvalue()
+            message.write_into(b)
@@ -42,9 +42,16 @@ class Vector(bytes, TLObject):
     @classmethod
     def read(cls, data: BytesIO, t: Any = None, *args: Any) -> List:
         count = Int.read(data)
-        left = len(data.read())
-        size = (left / count) if count else 0
-        data.seek(-left, 1)
+
+        if t is None and count:
+            # The element type is unknown only for bare vectors returned as RPC results, which always span up to
+            # the end of the data. Look at the remaining size without reading it.
+            position = data.tell()
+            left = data.seek(0, 2) - position
+            data.seek(position)
+            size = left / count
+        else:
+            size = 0
 
         return List(
             t.read(data) if t
@@ -52,6 +59,17 @@ class Vector(bytes, TLObject):
             for _ in range(count)
         )
 
+    @staticmethod
+    def write_into(b: BytesIO, value: list, t: Any = None) -> None:  # type: ignore
+        b.write(Int(Vector.ID, False))
+        b.write(Int(len(value)))
+
+        for i in value:
+            if t:
+                b.write(t(i))
+            else:
+                i.write_into(b)
+
     def __new__(cls, value: list, t: Any = None) -> bytes:  # type: ignore
         return b"".join(
             [Int(cls.ID, False), Int(len(value))]
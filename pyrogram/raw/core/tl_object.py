@@ -35,6 +35,9 @@ class TLObject:
     def write(self, *args: Any) -> bytes:
         pass
 
+    def write_into(self, b: BytesIO, *args: Any) -> None:
+        b.write(self.write(*args))
+
     @staticmethod
     def default(obj: "TLObject") -> Union[str, Dict[str, str]]:
         if isinstance(obj, bytes):
@@ -45,7 +48,7 @@ class TLObject:
             **{
                 attr: getattr(obj, attr)
                 for attr in obj.__slots__
-                if getattr(obj, attr) is not None
+                if not attr.startswith("_") and getattr(obj, attr) is not None
             }
         }
 
@@ -61,7 +64,7 @@ class TLObject:
             ", ".join(
                 f"{attr}={repr(getattr(self, attr))}"
                 for attr in self.__slots__
-                if getattr(self, attr) is not None
+                if not attr.startswith("_") and getattr(self, attr) is not None
             )
         )
 
@@ -0,0 +1,112 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import pyrogram
+from pyrogram import raw
+from pyrogram import types
+from pyrogram import utils
+from pyrogram.errors import MessageIdsEmpty
+
+log = logging.getLogger(__name__)
+
+
+class ReplyResolver:
+    """Fetch the messages replied to by incoming messages in batches.
+
+    Lookups made within a short window are grouped by box: one group for each channel and a single group for all the
+    other chats, whose message ids are unique account-wide. Each group is fetched with a single
+    channels.GetMessages or messages.GetMessages call and the results are handed back to every message waiting for them.
+    Failed fetches are logged and leave the replied messages unavailable.
+    """
+
+    # How long to collect lookups before fetching them
+    WINDOW = 0.01
+    # Message ids fetched per call, at most
+    MAX_IDS = 200
+
+    def __init__(self, client: "pyrogram.Client"):
+        self.client = client
+        self.loop = asyncio.get_event_loop()
+
+        # (channel chat id or 0, replies) -> reply_to_message_id -> (id of a replying message, future)
+        self.pending: Dict[Tuple[int, int], Dict[int, Tuple[int, asyncio.Future]]] = {}
+
+    async def resolve(
+        self,
+        chat_id: int,
+        message_id: int,
+        reply_to_message_id: int,
+        replies: int = 0
+    ) -> Optional["types.Message"]:
+        """Get the message replied to by the message *message_id* of the chat *chat_id*.
+
+        The messages are parsed with *replies* further levels of replies. Returns None in case the message can't be
+        found.
+        """
+        key = (chat_id if utils.get_peer_type(chat_id) == "channel" else 0, replies)
+        batch = self.pending.get(key)
+
+        if batch is None:
+            batch = self.pending[key] = {}
+            self.loop.call_later(self.WINDOW, self.flush, key, batch)
+
+        entry = batch.get(reply_to_message_id)
+
+        if entry is None:
+            entry = batch[reply_to_message_id] = (message_id, self.loop.create_future())
+
+            if len(batch) >= self.MAX_IDS:
+                self.flush(key, batch)
+
+        # Shielded: a cancelled waiter must not cancel the lookup for the others waiting for the same message
+        return await asyncio.shield(entry[1])
+
+    def flush(self, key: Tuple[int, int], batch: dict):
+        # The batch could have been already flushed because it got full
+        if self.pending.get(key) is batch:
+            del self.pending[key]
+            self.loop.create_task(self.fetch(key, batch))
+
+    async def fetch(self, key: Tuple[int, int], batch: Dict[int, Tuple[int, asyncio.Future]]):
+        chat_id, replies = key
+        ids = [raw.types.InputMessageReplyTo(id=message_id) for message_id, _ in batch.values()]
+
+        try:
+            if chat_id:
+                rpc = raw.functions.channels.GetMessages(channel=await self.client.resolve_peer(chat_id), id=ids)
+            else:
+                rpc = raw.functions.messages.GetMessages(id=ids)
+
+            r = await self.client.invoke(rpc)
+            messages = await utils.parse_messages(self.client, r, replies=replies)
+        except MessageIdsEmpty:
+            messages = []
+        except Exception as e:
+            # The replied messages are just not available, as when they are deleted
+            log.warning("Failed to fetch %s replied messages: %s", len(batch), e)
+            messages = []
+
+        messages = {m.id: m for m in messages if not m.empty}
+
+        for reply_to_message_id, (_, future) in batch.items():
+            if not future.done():
+                future.set_result(messages.get(reply_to_message_id))
@@ -47,11 +47,13 @@ class Auth:
 
     @staticmethod
     def pack(data: TLObject) -> bytes:
+        data = data.write()
+
         return (
             bytes(8)
             + Long(MsgId())
-            + Int(len(data.write()))
-            + data.write()
+            + Int(len(data))
+            + data
         )
 
     @staticmethod
@@ -19,3 +19,4 @@
 from .data_center import DataCenter
 from .msg_factory import MsgFactory
 from .msg_id import MsgId
+from .stored_msg_ids import StoredMsgIds
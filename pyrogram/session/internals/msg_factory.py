@@ -30,9 +30,13 @@ class MsgFactory:
         self.seq_no = SeqNo()
 
     def __call__(self, body: TLObject) -> Message:
+        # Serialize the body once: the same bytes give the length and are written out when packing the message
+        serialized_body = body.write()
+
         return Message(
             body,
             MsgId(),
             self.seq_no(not isinstance(body, not_content_related)),
-            len(body)
+            len(serialized_body),
+            serialized_body
         )
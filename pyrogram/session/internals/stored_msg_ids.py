@@ -0,0 +1,80 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import deque
+
+from pyrogram.errors import SecurityCheckMismatch
+from .msg_id import MsgId
+
+
+class StoredMsgIds:
+    """Replay protection for incoming msg_ids.
+
+    The msg_ids are kept both in a set, for constant time lookups, and in a queue ordered by arrival, so that the
+    oldest half can be evicted in one go once the store grows over *max_size*. Evicted msg_ids are not forgotten:
+    the highest of them becomes the low-water mark below which every msg_id is rejected.
+    https://core.telegram.org/mtproto/security_guidelines#checking-msg-id
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+
+        self.msg_ids = set()
+        self.queue = deque()
+
+        # Lowest msg_id that can still be accepted
+        self.min_msg_id = 0
+
+    def __len__(self) -> int:
+        return len(self.msg_ids)
+
+    def __contains__(self, msg_id: int) -> bool:
+        return msg_id in self.msg_ids
+
+    def add(self, msg_id: int):
+        if len(self.msg_ids) > self.max_size:
+            evicted = [self.queue.popleft() for _ in range(self.max_size // 2)]
+            self.msg_ids.difference_update(evicted)
+            self.min_msg_id = max(self.min_msg_id, max(evicted) + 1)
+
+        if self.msg_ids:
+            if msg_id < self.min_msg_id:
+                raise SecurityCheckMismatch("The msg_id is lower than all the stored values")
+
+            if msg_id in self.msg_ids:
+                raise SecurityCheckMismatch("The msg_id is equal to any of the stored values")
+
+            time_diff = (msg_id - MsgId()) / 2 ** 32
+
+            if time_diff > 30:
+                raise SecurityCheckMismatch("The msg_id belongs to over 30 seconds in the future. "
+                                            "Most likely the client time has to be synchronized.")
+
+            if time_diff < -300:
+                raise SecurityCheckMismatch("The msg_id belongs to over 300 seconds in the past. "
+                                            "Most likely the client time has to be synchronized.")
+        else:
+            self.min_msg_id = max(self.min_msg_id, msg_id)
+
+        self.msg_ids.add(msg_id)
+        self.queue.append(msg_id)
+
+    def clear(self):
+        self.msg_ids.clear()
+        self.queue.clear()
+        self.min_msg_id = 0
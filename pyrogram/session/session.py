@@ -17,7 +17,8 @@
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
-import bisect
+import heapq
+import itertools
 import logging
 import os
 from hashlib import sha1
@@ -33,17 +34,11 @@ from pyrogram.errors import (
 )
 from pyrogram.raw.all import layer
 from pyrogram.raw.core import TLObject, MsgContainer, Int, FutureSalts
-from .internals import MsgId, MsgFactory
+from .internals import MsgFactory, StoredMsgIds
 
 log = logging.getLogger(__name__)
 
 
-class Result:
-    def __init__(self):
-        self.value = None
-        self.event = asyncio.Event()
-
-
 class Session:
     START_TIMEOUT = 2
     WAIT_TIMEOUT = 15
@@ -52,6 +47,9 @@ class Session:
     ACKS_THRESHOLD = 10
     PING_INTERVAL = 5
     STORED_MSG_IDS_MAX_SIZE = 1000 * 2
+    # Outgoing messages queued while a write is in progress are sent together inside a single container
+    MAX_CONTAINER_MESSAGES = 1000
+    MAX_CONTAINER_LENGTH = 512 * 1024
 
     TRANSPORT_ERRORS = {
         404: "auth key not found",
@@ -86,17 +84,39 @@ class Session:
 
         self.pending_acks = set()
 
+        # msg_id -> future resolved by handle_packet with the response
         self.results = {}
 
-        self.stored_msg_ids = []
+        # Heap of (deadline, key) and key -> future of the futures not done yet. A single timer handle, always set to
+        # the earliest deadline, fails expired futures with a TimeoutError. Futures are forgotten as soon as they are
+        # done, so that their results aren't kept alive; their heap entries are simply skipped.
+        self.timeouts = []
+        self.timeouts_futures = {}
+        self.timeouts_counter = itertools.count()
+        self.timeouts_handle = None
+
+        # Container msg_id -> msg_ids of the messages sent inside it, needed to route bad msg notifications
+        self.containers = {}
+
+        self.send_queue = asyncio.Queue()
+        self.send_task = None
+
+        self.stored_msg_ids = StoredMsgIds(self.STORED_MSG_IDS_MAX_SIZE)
 
         self.ping_task = None
         self.ping_task_event = asyncio.Event()
 
         self.recv_task = None
 
+        # Set when a response is expected, to resume receiving while the updates queue is full
+        self.recv_wakeup = asyncio.Event()
+
         self.is_started = asyncio.Event()
 
+        # Bookkeeping for sessions pooled in Client.media_sessions
+        self.users = 0
+        self.idle_handle = None
+
         self.loop = asyncio.get_event_loop()
 
     async def start(self):
@@ -113,6 +133,7 @@ class Session:
                 await self.connection.connect()
 
                 self.recv_task = self.loop.create_task(self.recv_worker())
+                self.send_task = self.loop.create_task(self.send_worker())
 
                 await self.send(raw.functions.Ping(ping_id=0), timeout=self.START_TIMEOUT)
 
@@ -156,6 +177,7 @@ class Session:
 
     async def stop(self):
         self.is_started.clear()
+        self.recv_wakeup.set()
 
         self.stored_msg_ids.clear()
 
@@ -166,6 +188,23 @@ class Session:
 
         self.ping_task_event.clear()
 
+        if self.send_task is not None:
+            self.send_task.cancel()
+
+            try:
+                await self.send_task
+            except asyncio.CancelledError:
+                pass
+
+            self.send_task = None
+
+        # Messages still queued would otherwise be sent after a restart, long after their senders gave up
+        while not self.send_queue.empty():
+            _, sent = self.send_queue.get_nowait()
+
+            if not sent.done():
+                sent.set_exception(ConnectionError("Session stopped"))
+
         await self.connection.close()
 
         if self.recv_task:
@@ -183,14 +222,19 @@ class Session:
         await self.stop()
         await self.start()
 
+        if self.client is not None and not self.is_media:
+            # Updates could have been missed while disconnected
+            self.client.updates_state.request_difference()
+
     async def handle_packet(self, packet):
         data = await self.loop.run_in_executor(
             pyrogram.crypto_executor,
             mtproto.unpack,
-            BytesIO(packet),
+            packet,
             self.session_id,
             self.auth_key,
-            self.auth_key_id
+            self.auth_key_id,
+            self.client.dispatcher.update_ids if self.client is not None and not self.is_media else None
         )
 
         messages = (
@@ -209,31 +253,15 @@ class Session:
                     self.pending_acks.add(msg.msg_id)
 
             try:
-                if len(self.stored_msg_ids) > Session.STORED_MSG_IDS_MAX_SIZE:
-                    del self.stored_msg_ids[:Session.STORED_MSG_IDS_MAX_SIZE // 2]
-
-                if self.stored_msg_ids:
-                    if msg.msg_id < self.stored_msg_ids[0]:
-                        raise SecurityCheckMismatch("The msg_id is lower than all the stored values")
-
-                    if msg.msg_id in self.stored_msg_ids:
-                        raise SecurityCheckMismatch("The msg_id is equal to any of the stored values")
-
-                    time_diff = (msg.msg_id - MsgId()) / 2 ** 32
-
-                    if time_diff > 30:
-                        raise SecurityCheckMismatch("The msg_id belongs to over 30 seconds in the future. "
-                                                    "Most likely the client time has to be synchronized.")
-
-                    if time_diff < -300:
-                        raise SecurityCheckMismatch("The msg_id belongs to over 300 seconds in the past. "
-                                                    "Most likely the client time has to be synchronized.")
+                self.stored_msg_ids.add(msg.msg_id)
             except SecurityCheckMismatch as e:
                 log.info("Discarding packet: %s", e)
                 await self.connection.close()
                 return
-            else:
-                bisect.insort(self.stored_msg_ids, msg.msg_id)
+
+            # The update was skipped without being decoded, as there's no handler for it
+            if msg.body is None:
+                continue
 
             if isinstance(msg.body, (raw.types.MsgDetailedInfo, raw.types.MsgNewDetailedInfo)):
                 self.pending_acks.add(msg.body.answer_msg_id)
@@ -254,19 +282,22 @@ class Session:
                 if self.client is not None:
                     self.loop.create_task(self.client.handle_updates(msg.body))
 
-            if msg_id in self.results:
-                self.results[msg_id].value = getattr(msg.body, "result", msg.body)
-                self.results[msg_id].event.set()
+            for msg_id in self.containers.pop(msg_id, [msg_id]):
+                result = self.results.get(msg_id)
+
+                if result is not None and not result.done():
+                    result.set_result(getattr(msg.body, "result", msg.body))
 
         if len(self.pending_acks) >= self.ACKS_THRESHOLD:
             log.debug("Sending %s acks", len(self.pending_acks))
 
+            acks = list(self.pending_acks)
+            self.pending_acks.clear()
+
             try:
-                await self.send(raw.types.MsgsAck(msg_ids=list(self.pending_acks)), False)
+                await self.send(raw.types.MsgsAck(msg_ids=acks), False)
             except OSError:
-                pass
-            else:
-                self.pending_acks.clear()
+                self.pending_acks.update(acks)
 
     async def ping_worker(self):
         log.info("PingTask started")
@@ -310,45 +341,182 @@ class Session:
 
                 break
 
+            if not self.is_media and self.client is not None and not self.client.dispatcher.room.is_set():
+                await self.wait_updates_room()
+
             self.loop.create_task(self.handle_packet(packet))
 
         log.info("NetworkTask stopped")
 
+    async def wait_updates_room(self):
+        """Wait for the full updates queue to have room again.
+
+        Receiving goes on anyway while responses are awaited: handlers waiting for them would never make room.
+        """
+        room = self.client.dispatcher.room
+
+        while True:
+            self.recv_wakeup.clear()
+
+            if room.is_set() or self.results or not self.is_started.is_set():
+                return
+
+            waiters = [
+                self.loop.create_task(room.wait()),
+                self.loop.create_task(self.recv_wakeup.wait())
+            ]
+
+            _, pending = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+
+            for waiter in pending:
+                waiter.cancel()
+
+    async def send_worker(self):
+        while True:
+            # Everything that got queued in the meantime (e.g.: while the previous write was in progress) is sent
+            # along with the first message, packed in as few containers as possible.
+            batch = [await self.send_queue.get()]
+
+            while not self.send_queue.empty():
+                batch.append(self.send_queue.get_nowait())
+
+            groups = [[]]
+            length = 0
+
+            for message, sent in batch:
+                group = groups[-1]
+
+                if group and (
+                    len(group) >= self.MAX_CONTAINER_MESSAGES
+                    or length + message.length + 16 > self.MAX_CONTAINER_LENGTH
+                ):
+                    groups.append([])
+                    length = 0
+
+                groups[-1].append((message, sent))
+                length += message.length + 16  # 16 = msg_id (8) + seq_no (4) + length (4)
+
+            try:
+                for group in groups:
+                    await self.send_group(group)
+            except asyncio.CancelledError:
+                for _, sent in batch:
+                    if not sent.done():
+                        sent.set_exception(ConnectionError("Session stopped"))
+
+                raise
+
+    async def send_group(self, group: list):
+        messages = [message for message, _ in group]
+        acks = list(self.pending_acks)
+
+        if acks:
+            self.pending_acks.clear()
+            messages.append(self.msg_factory(raw.types.MsgsAck(msg_ids=acks)))
+
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = self.msg_factory(MsgContainer(messages))
+
+            # Drop the oldest containers whose messages are no longer waiting for a response
+            for container_msg_id in list(self.containers):
+                if any(msg_id in self.results for msg_id in self.containers[container_msg_id]):
+                    break
+
+                del self.containers[container_msg_id]
+
+            self.containers[message.msg_id] = [m.msg_id for m in messages]
+
+        try:
+            payload = await self.loop.run_in_executor(
+                pyrogram.crypto_executor,
+                mtproto.pack,
+                message,
+                self.salt,
+                self.session_id,
+                self.auth_key,
+                self.auth_key_id
+            )
+
+            await self.connection.send(payload)
+        except Exception as e:
+            self.pending_acks.update(acks)
+
+            for _, sent in group:
+                if not sent.done():
+                    sent.set_exception(e)
+        else:
+            for _, sent in group:
+                if not sent.done():
+                    sent.set_result(None)
+
+    @property
+    def in_flight(self) -> int:
+        """Amount of requests sent that are still waiting for a response."""
+        return len(self.results)
+
+    def set_timeout(self, future: asyncio.Future, timeout: float):
+        deadline = self.loop.time() + timeout
+        key = next(self.timeouts_counter)
+
+        self.timeouts_futures[key] = future
+        future.add_done_callback(lambda _: self.timeouts_futures.pop(key, None))
+
+        # Drop the entries of the futures already done once they outnumber the others
+        if len(self.timeouts) > 2 * len(self.timeouts_futures) + 1024:
+            self.timeouts = [entry for entry in self.timeouts if entry[1] in self.timeouts_futures]
+            heapq.heapify(self.timeouts)
+
+        heapq.heappush(self.timeouts, (deadline, key))
+
+        if self.timeouts_handle is None or deadline < self.timeouts_handle.when():
+            if self.timeouts_handle is not None:
+                self.timeouts_handle.cancel()
+
+            self.timeouts_handle = self.loop.call_at(deadline, self.expire_timeouts)
+
+    def expire_timeouts(self):
+        self.timeouts_handle = None
+        now = self.loop.time()
+
+        while self.timeouts and self.timeouts[0][0] <= now:
+            _, key = heapq.heappop(self.timeouts)
+            future = self.timeouts_futures.pop(key, None)
+
+            if future is not None and not future.done():
+                future.set_exception(TimeoutError("Request timed out"))
+
+        if self.timeouts:
+            self.timeouts_handle = self.loop.call_at(self.timeouts[0][0], self.expire_timeouts)
+
     async def send(self, data: TLObject, wait_response: bool = True, timeout: float = WAIT_TIMEOUT):
         message = self.msg_factory(data)
         msg_id = message.msg_id
 
         if wait_response:
-            self.results[msg_id] = Result()
+            self.results[msg_id] = self.loop.create_future()
+            self.recv_wakeup.set()
 
         log.debug("Sent: %s", message)
 
-        payload = await self.loop.run_in_executor(
-            pyrogram.crypto_executor,
-            mtproto.pack,
-            message,
-            self.salt,
-            self.session_id,
-            self.auth_key,
-            self.auth_key_id
-        )
+        sent = self.loop.create_future()
+        self.set_timeout(sent, timeout)
+        self.send_queue.put_nowait((message, sent))
 
         try:
-            await self.connection.send(payload)
-        except OSError as e:
+            await sent
+        except BaseException as e:
             self.results.pop(msg_id, None)
             raise e
 
         if wait_response:
-            try:
-                await asyncio.wait_for(self.results[msg_id].event.wait(), timeout)
-            except asyncio.TimeoutError:
-                pass
-
-            result = self.results.pop(msg_id).value
+            self.set_timeout(self.results[msg_id], timeout)
 
-            if result is None:
-                raise TimeoutError("Request timed out")
+            try:
+                result = await self.results[msg_id]
+            finally:
+                self.results.pop(msg_id, None)
 
             if isinstance(result, raw.types.RpcError):
                 if isinstance(data, (raw.functions.InvokeWithoutUpdates, raw.functions.InvokeWithTakeout)):
@@ -372,10 +540,11 @@ class Session:
         timeout: float = WAIT_TIMEOUT,
         sleep_threshold: float = SLEEP_THRESHOLD
     ):
-        try:
-            await asyncio.wait_for(self.is_started.wait(), self.WAIT_TIMEOUT)
-        except asyncio.TimeoutError:
-            pass
+        if not self.is_started.is_set():
+            try:
+                await asyncio.wait_for(self.is_started.wait(), self.WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
 
         if isinstance(query, (raw.functions.InvokeWithoutUpdates, raw.functions.InvokeWithTakeout)):
             inner_query = query.query
@@ -49,13 +49,27 @@ class FileStorage(SQLiteStorage):
 
             version += 1
 
+        if version == 3:
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE update_state (id INTEGER PRIMARY KEY, pts INTEGER, qts INTEGER, date INTEGER, "
+                    "seq INTEGER)"
+                )
+
+            version += 1
+
         self.version(version)
 
     async def open(self):
+        await self.run(self.connect)
+
+    def connect(self):
         path = self.database
         file_exists = path.is_file()
 
         self.conn = sqlite3.connect(str(path), timeout=1, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
 
         if not file_exists:
             self.create()
@@ -18,23 +18,49 @@
 
 import base64
 import logging
-import sqlite3
 import struct
+import time
+from typing import List, Tuple, Any, Union, Dict, Iterable
 
-from .sqlite_storage import SQLiteStorage
+from pyrogram import raw
+
+from .sqlite_storage import get_input_peer
+from .storage import Storage
 
 log = logging.getLogger(__name__)
 
 
-class MemoryStorage(SQLiteStorage):
+class MemoryStorage(Storage):
+    """Storage kept in memory only, in plain dictionaries.
+
+    Peers are indexed by id, username and phone number. Nothing is persisted: the session can be carried over with
+    a session string.
+    """
+
     def __init__(self, name: str, session_string: str = None):
         super().__init__(name)
 
         self.session_string = session_string
 
+        self.session = {}
+        # Peer id -> (access_hash, type, username, phone_number, last_update_on)
+        self.peers = {}
+        # Username or phone number -> ids of the peers having it
+        self.usernames = {}
+        self.phone_numbers = {}
+        # Box id -> (id, pts, qts, date, seq)
+        self.states = {}
+
     async def open(self):
-        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
-        self.create()
+        self.session = {
+            "dc_id": 2,
+            "api_id": None,
+            "test_mode": None,
+            "auth_key": None,
+            "date": 0,
+            "user_id": None,
+            "is_bot": None
+        }
 
         if self.session_string:
             # Old format
@@ -69,5 +95,124 @@ class MemoryStorage(SQLiteStorage):
             await self.is_bot(is_bot)
             await self.date(0)
 
+    async def save(self):
+        await self.date(int(time.time()))
+
+    async def close(self):
+        self.peers.clear()
+        self.usernames.clear()
+        self.phone_numbers.clear()
+        self.states.clear()
+
     async def delete(self):
         pass
+
+    async def update_peers(self, peers: List[Tuple[int, int, str, str, str]]):
+        now = int(time.time())
+
+        for peer_id, access_hash, peer_type, username, phone_number in peers:
+            old = self.peers.get(peer_id)
+
+            if old is not None:
+                self.unindex(self.usernames, old[2], peer_id)
+                self.unindex(self.phone_numbers, old[3], peer_id)
+
+            self.peers[peer_id] = (access_hash, peer_type, username, phone_number, now)
+
+            if username is not None:
+                self.usernames.setdefault(username, set()).add(peer_id)
+
+            if phone_number is not None:
+                self.phone_numbers.setdefault(phone_number, set()).add(peer_id)
+
+    @staticmethod
+    def unindex(index: dict, key: str, peer_id: int):
+        if key is not None:
+            ids = index.get(key)
+
+            if ids is not None:
+                ids.discard(peer_id)
+
+                if not ids:
+                    del index[key]
+
+    def get_latest(self, ids: set) -> int:
+        # Like the SQLite storage, prefer the most recently updated peer among those sharing a username
+        return max(ids, key=lambda i: self.peers[i][4])
+
+    async def get_peer_by_id(self, peer_id: int):
+        peer = self.peers.get(peer_id)
+
+        if peer is None:
+            raise KeyError(f"ID not found: {peer_id}")
+
+        return get_input_peer(peer_id, peer[0], peer[1])
+
+    async def get_peers_by_id(self, peer_ids: Iterable[int]) -> Dict[int, "raw.base.InputPeer"]:
+        return {
+            peer_id: get_input_peer(peer_id, peer[0], peer[1])
+            for peer_id, peer in ((i, self.peers.get(i)) for i in peer_ids)
+            if peer is not None
+        }
+
+    async def get_peer_by_username(self, username: str):
+        ids = self.usernames.get(username)
+
+        if ids is None:
+            raise KeyError(f"Username not found: {username}")
+
+        peer_id = self.get_latest(ids)
+        peer = self.peers[peer_id]
+
+        if abs(time.time() - peer[4]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+
+        return get_input_peer(peer_id, peer[0], peer[1])
+
+    async def get_peer_by_phone_number(self, phone_number: str):
+        ids = self.phone_numbers.get(phone_number)
+
+        if ids is None:
+            raise KeyError(f"Phone number not found: {phone_number}")
+
+        peer_id = self.get_latest(ids)
+        peer = self.peers[peer_id]
+
+        return get_input_peer(peer_id, peer[0], peer[1])
+
+    async def update_state(self, value: Union[int, List[Tuple[int, int, int, int, int]]] = object):
+        if value == object:
+            return list(self.states.values())
+        else:
+            if isinstance(value, int):
+                self.states.pop(value, None)
+            else:
+                for state in value:
+                    self.states[state[0]] = tuple(state)
+
+    def _accessor(self, attr: str, value: Any = object):
+        if value == object:
+            return self.session[attr]
+
+        self.session[attr] = value
+
+    async def dc_id(self, value: int = object):
+        return self._accessor("dc_id", value)
+
+    async def api_id(self, value: int = object):
+        return self._accessor("api_id", value)
+
+    async def test_mode(self, value: bool = object):
+        return self._accessor("test_mode", value)
+
+    async def auth_key(self, value: bytes = object):
+        return self._accessor("auth_key", value)
+
+    async def date(self, value: int = object):
+        return self._accessor("date", value)
+
+    async def user_id(self, value: int = object):
+        return self._accessor("user_id", value)
+
+    async def is_bot(self, value: bool = object):
+        return self._accessor("is_bot", value)
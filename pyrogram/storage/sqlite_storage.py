@@ -16,10 +16,12 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
 
-import inspect
+import asyncio
 import sqlite3
 import time
-from typing import List, Tuple, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Any, Union, Callable, Dict, Iterable, Optional
 
 from pyrogram import raw
 from .storage import Storage
@@ -48,6 +50,15 @@ CREATE TABLE peers
     last_update_on INTEGER NOT NULL DEFAULT (CAST(STRFTIME('%s', 'now') AS INTEGER))
 );
 
+CREATE TABLE update_state
+(
+    id   INTEGER PRIMARY KEY,
+    pts  INTEGER,
+    qts  INTEGER,
+    date INTEGER,
+    seq  INTEGER
+);
+
 CREATE TABLE version
 (
     number INTEGER PRIMARY KEY
@@ -90,14 +101,100 @@ def get_input_peer(peer_id: int, access_hash: int, peer_type: str):
 
 
 class SQLiteStorage(Storage):
-    VERSION = 3
-    USERNAME_TTL = 8 * 60 * 60
+    """Storage backed by a SQLite database.
+
+    The database is only ever accessed from a dedicated thread, so that slow queries and disk writes don't block the
+    event loop. Concurrent reads of the same data share a single query and writes issued while the thread is busy are
+    committed together in a single transaction. Reads always run after the writes queued before them.
+    """
+
+    VERSION = 4
+
+    SESSION_COLUMNS = ("dc_id", "api_id", "test_mode", "auth_key", "date", "user_id", "is_bot")
+
+    # How long peer changes are held before being written in a single transaction
+    PEERS_FLUSH_INTERVAL = 1
+    # Unchanged peers having a username are written again this often, so that the username doesn't expire
+    USERNAME_REFRESH_INTERVAL = 60 * 60
+    # How many of the last written peers are remembered to skip writing them again unchanged
+    WRITTEN_PEERS_SIZE = 100000
+    # Parameters bound per query at most, below SQLite's default limit
+    MAX_QUERY_PARAMETERS = 500
 
     def __init__(self, name: str):
         super().__init__(name)
 
         self.conn = None  # type: sqlite3.Connection
 
+        # In-memory copy of the sessions table row, loaded on first access and written through on every change
+        self.session_row = None
+
+        # Peer id -> (row, time) of the peers last committed
+        self.written_peers = OrderedDict()
+        # Peer id -> row of the peers waiting to be written, and of those being written
+        self.pending_peers = {}
+        self.flushing_peers = {}
+        self.flush_handle = None
+
+        self.executor = None
+        # Key -> future of the reads in progress
+        self.reads = {}
+        # Writes waiting to be committed, and the task committing them
+        self.writes = []
+        self.writes_task = None
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run a function on the storage thread."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix="Storage")
+
+        return await asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    async def read(self, key: Any, query: str, parameters: tuple = (), fetch_all: bool = False) -> Any:
+        """Run a query on the storage thread. Concurrent reads having the same key share the same query."""
+        # Let the queued writes reach the storage thread first
+        if self.writes_task is not None:
+            await asyncio.wait([self.writes_task])
+
+        future = self.reads.get(key)
+
+        if future is None:
+            future = asyncio.ensure_future(self.run(self.fetch, query, parameters, fetch_all))
+            future.add_done_callback(lambda f: self.reads.pop(key) if self.reads.get(key) is f else None)
+            self.reads[key] = future
+
+        return await asyncio.shield(future)
+
+    async def write(self, query: str, parameters: Union[tuple, list] = (), many: bool = False):
+        """Queue a write and wait for it to be committed."""
+        self.writes.append((query, parameters, many))
+        # Reads already in progress may miss this write, don't let new readers share them
+        self.reads.clear()
+
+        if self.writes_task is None:
+            self.writes_task = asyncio.ensure_future(self.commit_writes())
+
+        await asyncio.shield(self.writes_task)
+
+    async def commit_writes(self):
+        writes, self.writes = self.writes, []
+        self.writes_task = None
+
+        await self.run(self.execute, writes)
+
+    def fetch(self, query: str, parameters: tuple, fetch_all: bool):
+        cursor = self.conn.execute(query, parameters)
+
+        return cursor.fetchall() if fetch_all else cursor.fetchone()
+
+    def execute(self, writes: List[Tuple[str, Any, bool]]):
+        with self.conn:
+            for query, parameters, many in writes:
+                if many:
+                    self.conn.executemany(query, parameters)
+                else:
+                    self.conn.execute(query, parameters)
+
     def create(self):
         with self.conn:
             self.conn.executescript(SCHEMA)
@@ -116,39 +213,155 @@ class SQLiteStorage(Storage):
         raise NotImplementedError
 
     async def save(self):
+        await self.flush_peers()
         await self.date(int(time.time()))
-        self.conn.commit()
+        await self.run(self.conn.commit)
 
     async def close(self):
-        self.conn.close()
+        await self.flush_peers()
+
+        if self.writes_task is not None:
+            await self.writes_task
+
+        await self.run(self.conn.close)
+
+        self.executor.shutdown()
+        self.executor = None
+
+        self.session_row = None
+        self.written_peers.clear()
 
     async def delete(self):
         raise NotImplementedError
 
     async def update_peers(self, peers: List[Tuple[int, int, str, str, str]]):
-        self.conn.executemany(
-            "REPLACE INTO peers (id, access_hash, type, username, phone_number)"
-            "VALUES (?, ?, ?, ?, ?)",
-            peers
-        )
+        now = time.time()
+
+        for peer in peers:
+            peer_id = peer[0]
+
+            # Already waiting to be written, or being written
+            if self.get_unwritten_peer(peer_id) == peer:
+                continue
+
+            written = self.written_peers.get(peer_id)
+
+            if written is not None:
+                self.written_peers.move_to_end(peer_id)
+
+                if written[0] == peer and (peer[3] is None or now - written[1] < self.USERNAME_REFRESH_INTERVAL):
+                    continue
+
+            self.pending_peers[peer_id] = peer
+
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if self.pending_peers and self.flush_handle is None:
+            self.flush_handle = asyncio.get_event_loop().call_later(
+                self.PEERS_FLUSH_INTERVAL,
+                lambda: asyncio.ensure_future(self.flush_peers())
+            )
+
+    async def flush_peers(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if not self.pending_peers:
+            return
+
+        peers, self.pending_peers = self.pending_peers, {}
+        self.flushing_peers.update(peers)
+
+        try:
+            await self.write(
+                "REPLACE INTO peers (id, access_hash, type, username, phone_number)"
+                "VALUES (?, ?, ?, ?, ?)",
+                list(peers.values()),
+                many=True
+            )
+        except BaseException:
+            # Written again with the next flush, unless they changed in the meantime
+            for peer_id, peer in peers.items():
+                self.pending_peers.setdefault(peer_id, peer)
+
+            self.schedule_flush()
+
+            raise
+        else:
+            # Only peers actually committed are remembered as written
+            now = time.time()
+
+            for peer_id, peer in peers.items():
+                self.written_peers[peer_id] = (peer, now)
+                self.written_peers.move_to_end(peer_id)
+
+            while len(self.written_peers) > self.WRITTEN_PEERS_SIZE:
+                self.written_peers.popitem(last=False)
+        finally:
+            for peer_id, peer in peers.items():
+                if self.flushing_peers.get(peer_id) is peer:
+                    del self.flushing_peers[peer_id]
+
+    def get_unwritten_peer(self, peer_id: int) -> Optional[Tuple[int, int, str, str, str]]:
+        peer = self.pending_peers.get(peer_id)
+
+        return peer if peer is not None else self.flushing_peers.get(peer_id)
 
     async def get_peer_by_id(self, peer_id: int):
-        r = self.conn.execute(
+        peer = self.get_unwritten_peer(peer_id)
+
+        if peer is not None:
+            return get_input_peer(*peer[:3])
+
+        r = await self.read(
+            ("id", peer_id),
             "SELECT id, access_hash, type FROM peers WHERE id = ?",
             (peer_id,)
-        ).fetchone()
+        )
 
         if r is None:
             raise KeyError(f"ID not found: {peer_id}")
 
         return get_input_peer(*r)
 
+    async def get_peers_by_id(self, peer_ids: Iterable[int]) -> Dict[int, "raw.base.InputPeer"]:
+        peers = {}
+        missing = []
+
+        for peer_id in peer_ids:
+            peer = self.get_unwritten_peer(peer_id)
+
+            if peer is not None:
+                peers[peer_id] = get_input_peer(*peer[:3])
+            else:
+                missing.append(peer_id)
+
+        for i in range(0, len(missing), self.MAX_QUERY_PARAMETERS):
+            chunk = missing[i:i + self.MAX_QUERY_PARAMETERS]
+
+            rows = await self.read(
+                ("ids", tuple(chunk)),
+                f"SELECT id, access_hash, type FROM peers WHERE id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk),
+                fetch_all=True
+            )
+
+            for r in rows:
+                peers[r[0]] = get_input_peer(*r)
+
+        return peers
+
     async def get_peer_by_username(self, username: str):
-        r = self.conn.execute(
+        await self.flush_peers()
+
+        r = await self.read(
+            ("username", username),
             "SELECT id, access_hash, type, last_update_on FROM peers WHERE username = ?"
             "ORDER BY last_update_on DESC",
             (username,)
-        ).fetchone()
+        )
 
         if r is None:
             raise KeyError(f"Username not found: {username}")
@@ -159,55 +372,86 @@ class SQLiteStorage(Storage):
         return get_input_peer(*r[:3])
 
     async def get_peer_by_phone_number(self, phone_number: str):
-        r = self.conn.execute(
+        await self.flush_peers()
+
+        r = await self.read(
+            ("phone_number", phone_number),
             "SELECT id, access_hash, type FROM peers WHERE phone_number = ?",
             (phone_number,)
-        ).fetchone()
+        )
 
         if r is None:
             raise KeyError(f"Phone number not found: {phone_number}")
 
         return get_input_peer(*r)
 
-    def _get(self):
-        attr = inspect.stack()[2].function
+    async def update_state(self, value: Union[int, List[Tuple[int, int, int, int, int]]] = object):
+        if value == object:
+            return await self.read(
+                "update_state",
+                "SELECT id, pts, qts, date, seq FROM update_state",
+                fetch_all=True
+            )
+        else:
+            if isinstance(value, int):
+                await self.write(
+                    "DELETE FROM update_state WHERE id = ?",
+                    (value,)
+                )
+            else:
+                await self.write(
+                    "REPLACE INTO update_state (id, pts, qts, date, seq)"
+                    "VALUES (?, ?, ?, ?, ?)",
+                    value,
+                    many=True
+                )
 
-        return self.conn.execute(
-            f"SELECT {attr} FROM sessions"
-        ).fetchone()[0]
+    async def _get(self, attr: str):
+        if self.session_row is None:
+            row = await self.read(
+                "sessions",
+                f"SELECT {', '.join(self.SESSION_COLUMNS)} FROM sessions"
+            )
 
-    def _set(self, value: Any):
-        attr = inspect.stack()[2].function
+            # A concurrent _get or _set may have loaded and changed the row in the meantime
+            if self.session_row is None:
+                self.session_row = dict(zip(self.SESSION_COLUMNS, row))
 
-        with self.conn:
-            self.conn.execute(
-                f"UPDATE sessions SET {attr} = ?",
-                (value,)
-            )
+        return self.session_row[attr]
+
+    async def _set(self, attr: str, value: Any):
+        # Load the row first, so that a read in progress can't overwrite it with the old value later
+        await self._get(attr)
+        self.session_row[attr] = value
+
+        await self.write(
+            f"UPDATE sessions SET {attr} = ?",
+            (value,)
+        )
 
-    def _accessor(self, value: Any = object):
-        return self._get() if value == object else self._set(value)
+    async def _accessor(self, attr: str, value: Any = object):
+        return await (self._get(attr) if value == object else self._set(attr, value))
 
     async def dc_id(self, value: int = object):
-        return self._accessor(value)
+        return await self._accessor("dc_id", value)
 
     async def api_id(self, value: int = object):
-        return self._accessor(value)
+        return await self._accessor("api_id", value)
 
     async def test_mode(self, value: bool = object):
-        return self._accessor(value)
+        return await self._accessor("test_mode", value)
 
     async def auth_key(self, value: bytes = object):
-        return self._accessor(value)
+        return await self._accessor("auth_key", value)
 
     async def date(self, value: int = object):
-        return self._accessor(value)
+        return await self._accessor("date", value)
 
     async def user_id(self, value: int = object):
-        return self._accessor(value)
+        return await self._accessor("user_id", value)
 
     async def is_bot(self, value: bool = object):
-        return self._accessor(value)
+        return await self._accessor("is_bot", value)
 
     def version(self, value: int = object):
         if value == object:
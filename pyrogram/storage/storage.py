@@ -18,7 +18,9 @@
 
 import base64
 import struct
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
+
+from pyrogram import raw
 
 
 class Storage:
@@ -29,6 +31,9 @@ class Storage:
 
     SESSION_STRING_FORMAT = ">BI?256sQ?"
 
+    # How long a username is trusted to still belong to the peer it was last seen with
+    USERNAME_TTL = 8 * 60 * 60
+
     def __init__(self, name: str):
         self.name = name
 
@@ -56,6 +61,27 @@ class Storage:
     async def get_peer_by_phone_number(self, phone_number: str):
         raise NotImplementedError
 
+    async def get_peers_by_id(self, peer_ids: Iterable[int]) -> Dict[int, "raw.base.InputPeer"]:
+        """Get the input peers of many ids at once. Ids not found are left out."""
+        peers = {}
+
+        for peer_id in peer_ids:
+            try:
+                peers[peer_id] = await self.get_peer_by_id(peer_id)
+            except KeyError:
+                pass
+
+        return peers
+
+    async def update_state(self, value: Union[int, List[Tuple[int, int, int, int, int]]] = object):
+        """Get or set the stored (id, pts, qts, date, seq) update states.
+
+        Storages that don't persist them always start without any state, so that the client starts from the current
+        state, as on the first run.
+        """
+        if value == object:
+            return []
+
     async def dc_id(self, value: int = object):
         raise NotImplementedError
 
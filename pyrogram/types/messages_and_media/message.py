@@ -600,7 +600,7 @@ class Message(Object, Update):
             if isinstance(action, raw.types.MessageActionGameScore):
                 parsed_message.game_high_score = types.GameHighScore._parse_action(client, message, users)
 
-                if message.reply_to and replies:
+                if message.reply_to is not None and replies:
                     try:
                         parsed_message.reply_to_message = await client.get_messages(
                             parsed_message.chat.id,
@@ -629,10 +629,10 @@ class Message(Object, Update):
 
             forward_header = message.fwd_from  # type: raw.types.MessageFwdHeader
 
-            if forward_header:
+            if forward_header is not None:
                 forward_date = utils.timestamp_to_datetime(forward_header.date)
 
-                if forward_header.from_id:
+                if forward_header.from_id is not None:
                     raw_peer_id = utils.get_raw_peer_id(forward_header.from_id)
                     peer_id = utils.get_peer_id(forward_header.from_id)
 
@@ -665,7 +665,7 @@ class Message(Object, Update):
             media_type = None
             has_media_spoiler = None
 
-            if media:
+            if media is not None:
                 if isinstance(media, raw.types.MessageMediaPhoto):
                     photo = types.Photo._parse(client, media.photo, media.ttl_seconds)
                     media_type = enums.MessageMediaType.PHOTO
@@ -741,7 +741,7 @@ class Message(Object, Update):
 
             reply_markup = message.reply_markup
 
-            if reply_markup:
+            if reply_markup is not None:
                 if isinstance(reply_markup, raw.types.ReplyKeyboardForceReply):
                     reply_markup = types.ForceReply.read(reply_markup)
                 elif isinstance(reply_markup, raw.types.ReplyKeyboardMarkup):
@@ -823,25 +823,23 @@ class Message(Object, Update):
                 client=client
             )
 
-            if message.reply_to:
+            if message.reply_to is not None:
                 parsed_message.reply_to_message_id = message.reply_to.reply_to_msg_id
                 parsed_message.reply_to_top_message_id = message.reply_to.reply_to_top_id
 
                 if replies:
-                    try:
-                        key = (parsed_message.chat.id, parsed_message.reply_to_message_id)
-                        reply_to_message = client.message_cache[key]
+                    key = (parsed_message.chat.id, parsed_message.reply_to_message_id)
+                    reply_to_message = client.message_cache[key]
 
-                        if not reply_to_message:
-                            reply_to_message = await client.get_messages(
-                                parsed_message.chat.id,
-                                reply_to_message_ids=message.id,
-                                replies=replies - 1
-                            )
+                    if not reply_to_message and not client.lazy_replies:
+                        reply_to_message = await client.reply_resolver.resolve(
+                            parsed_message.chat.id,
+                            parsed_message.id,
+                            parsed_message.reply_to_message_id,
+                            replies=replies - 1
+                        )
 
-                        parsed_message.reply_to_message = reply_to_message
-                    except MessageIdsEmpty:
-                        pass
+                    parsed_message.reply_to_message = reply_to_message
 
             if not parsed_message.poll:  # Do not cache poll messages
                 client.message_cache[(parsed_message.chat.id, parsed_message.id)] = parsed_message
@@ -858,6 +856,30 @@ class Message(Object, Update):
         else:
             return f"https://t.me/c/{utils.get_channel_id(self.chat.id)}/{self.id}"
 
+    async def get_reply_to_message(self) -> Optional["types.Message"]:
+        """Bound method *get_reply_to_message* of :obj:`~pyrogram.types.Message`.
+
+        Get the message this message replies to, fetching it in case it wasn't already, e.g. because the client was
+        created with *lazy_replies*. The result is stored in *reply_to_message*.
+
+        Example:
+            .. code-block:: python
+
+                reply_to_message = await message.get_reply_to_message()
+
+        Returns:
+            :obj:`~pyrogram.types.Message` | ``None``: The replied message, None in case this message is not a reply or
+            the replied message is not available.
+        """
+        if self.reply_to_message is None and self.reply_to_message_id:
+            self.reply_to_message = await self._client.reply_resolver.resolve(
+                self.chat.id,
+                self.id,
+                self.reply_to_message_id
+            )
+
+        return self.reply_to_message
+
     async def get_media_group(self) -> List["types.Message"]:
         """Bound method *get_media_group* of :obj:`~pyrogram.types.Message`.
         
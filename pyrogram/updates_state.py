@@ -0,0 +1,593 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import pyrogram
+from pyrogram import raw
+from pyrogram import utils
+from pyrogram.errors import ChannelPrivate, ChannelInvalid, PeerIdInvalid, RPCError
+
+log = logging.getLogger(__name__)
+
+
+class UpdatesState:
+    """Keep the updates state (pts, qts, date, seq) in sync with the server and recover the updates lost in gaps.
+
+    Updates carrying a pts or qts are checked against the local state of their box: the common message box, the qts
+    box or the box of their channel. Updates coming out of order are held for a short while waiting for the missing
+    ones; if the gap is not filled in time the difference is requested with updates.GetDifference or
+    updates.GetChannelDifference. The state is persisted in the storage so that it can be resumed after a restart.
+    """
+
+    # How long to wait for the missing updates before requesting the difference
+    GAP_TIMEOUT = 0.5
+    # How often, at most, the state is written to the storage
+    SAVE_INTERVAL = 10
+
+    # Updates fetched per updates.GetChannelDifference call. Users are supposed to pass small values.
+    CHANNEL_DIFFERENCE_LIMIT = 100
+    CHANNEL_DIFFERENCE_LIMIT_BOT = 100000
+
+    # Boxes other than the channel ones, which are identified by their bare channel id. SEQ only keys the gap timer
+    # of the updates containers.
+    COMMON = 0
+    QTS = -1
+    SEQ = -2
+
+    CHANNEL_UPDATES = (
+        raw.types.UpdateNewChannelMessage, raw.types.UpdateEditChannelMessage,
+        raw.types.UpdateDeleteChannelMessages, raw.types.UpdateChannelWebPage,
+        raw.types.UpdatePinnedChannelMessages, raw.types.UpdateChannelTooLong
+    )
+
+    # Results of the methods that only return the pts they moved the box to, e.g.: messages.DeleteMessages
+    AFFECTED_RESULTS = (
+        raw.types.messages.AffectedMessages, raw.types.messages.AffectedHistory,
+        raw.types.messages.AffectedFoundMessages
+    )
+
+    # Constructor IDs of the updates carrying a pts or qts. They must always be decoded: skipping one would open a gap.
+    ORDERED_UPDATE_IDS = frozenset(
+        t.ID for t in vars(raw.types).values()
+        if isinstance(t, type) and t.QUALNAME.startswith("types.Update") and {"pts", "qts"} & set(t.__slots__)
+    )
+
+    def __init__(self, client: "pyrogram.Client"):
+        self.client = client
+        self.loop = asyncio.get_event_loop()
+
+        self.pts = None  # type: Optional[int]
+        self.qts = None  # type: Optional[int]
+        self.date = None  # type: Optional[int]
+        self.seq = None  # type: Optional[int]
+        self.channels = {}  # type: Dict[int, int]
+
+        # Out of order updates waiting for the gap before them to be filled, as (pts, pts_count, update) per box.
+        # The update is None when it comes from a method result and only needs to be accounted for.
+        self.pending = {}  # type: Dict[int, List[Tuple[int, int, Optional[tuple]]]]
+        # Updates containers coming after a seq gap, as (seq_start, seq, date, packet) with packet being
+        # (updates, users, chats, is_min)
+        self.pending_seq = []  # type: List[Tuple[int, int, int, tuple]]
+        self.gap_timers = {}  # type: Dict[int, asyncio.TimerHandle]
+        self.fetching = set()  # type: Set[int]
+        self.tasks = set()  # type: Set[asyncio.Task]
+
+        self.dirty = set()  # type: Set[int]
+        self.last_save = 0.0
+
+    async def start(self):
+        if self.client.no_updates:
+            return
+
+        for peer_id, pts, qts, date, seq in await self.client.storage.update_state():
+            if peer_id == self.COMMON:
+                self.pts, self.qts, self.date, self.seq = pts, qts, date, seq
+            else:
+                self.channels[utils.get_channel_id(peer_id)] = pts
+
+        if self.pts is None:
+            self.set_state(await self.client.invoke(raw.functions.updates.GetState()))
+            await self.save()
+        else:
+            self.create_task(self.recover())
+
+    async def stop(self):
+        for timer in self.gap_timers.values():
+            timer.cancel()
+
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        if self.pts is not None:
+            await self.save()
+
+        self.pts = self.qts = self.date = self.seq = None
+        self.channels.clear()
+        self.pending.clear()
+        self.pending_seq.clear()
+        self.gap_timers.clear()
+        self.fetching.clear()
+        self.dirty.clear()
+
+    async def recover(self):
+        """Fetch the updates missed while offline.
+
+        Only the common box is fetched. The difference carries the missed channel updates as well, and flags the
+        channels that missed too many of them with updateChannelTooLong: only those are fetched on their own.
+        """
+        await self.get_difference()
+
+        log.info("Recovered updates state")
+
+    async def save(self, force: bool = True):
+        if not self.dirty or not force and time.monotonic() - self.last_save < self.SAVE_INTERVAL:
+            return
+
+        rows = []
+
+        for box in self.dirty:
+            if box in (self.COMMON, self.QTS):
+                rows.append((self.COMMON, self.pts, self.qts, self.date, self.seq))
+            elif box in self.channels:
+                rows.append((utils.get_channel_id(box), self.channels[box], None, None, None))
+
+        self.dirty.clear()
+        self.last_save = time.monotonic()
+
+        await self.client.storage.update_state(list(dict.fromkeys(rows)))
+
+    def set_state(self, state: "raw.types.updates.State"):
+        self.pts, self.qts, self.date, self.seq = state.pts, state.qts, state.date, state.seq
+        self.dirty.add(self.COMMON)
+
+    def create_task(self, coro) -> asyncio.Task:
+        task = self.loop.create_task(coro)
+
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return task
+
+    def get_box(self, update) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """Get the box an update belongs to, together with its pts and pts_count, or None if it's not ordered."""
+        qts = getattr(update, "qts", None)
+
+        if qts is not None:
+            return self.QTS, qts, 1
+
+        pts = getattr(update, "pts", None)
+        pts_count = getattr(update, "pts_count", None)
+
+        if pts is None or pts_count is None:
+            return None, None, None
+
+        if isinstance(update, self.CHANNEL_UPDATES):
+            channel_id = getattr(
+                getattr(
+                    getattr(
+                        update, "message", None
+                    ), "peer_id", None
+                ), "channel_id", None
+            ) or getattr(update, "channel_id", None)
+
+            return channel_id, pts, pts_count
+
+        return self.COMMON, pts, pts_count
+
+    def get_query_box(self, query: Optional["raw.core.TLObject"]) -> int:
+        """Get the box of the pts returned by a method, in messages.Affected* results."""
+        while isinstance(query, (raw.functions.InvokeWithoutUpdates, raw.functions.InvokeWithTakeout)):
+            query = query.query
+
+        # Methods acting on a channel take it either as channel or as peer
+        for name in ("channel", "peer"):
+            channel_id = getattr(getattr(query, name, None), "channel_id", None)
+
+            if channel_id is not None:
+                return channel_id
+
+        return self.COMMON
+
+    def get_pts(self, box: int) -> Optional[int]:
+        if box == self.COMMON:
+            return self.pts
+
+        if box == self.QTS:
+            return self.qts
+
+        return self.channels.get(box)
+
+    def set_pts(self, box: int, pts: int):
+        if box == self.COMMON:
+            self.pts = pts
+        elif box == self.QTS:
+            self.qts = pts
+        else:
+            self.channels[box] = pts
+
+        self.dirty.add(box)
+
+    def apply(self, box: int, pts: int, pts_count: int, update: Optional[tuple]) -> List[tuple]:
+        """Account for an update in its box and return the updates that are ready to be dispatched."""
+        local_pts = self.get_pts(box)
+
+        if box in self.fetching or local_pts is not None and local_pts + pts_count < pts:
+            self.pending.setdefault(box, []).append((pts, pts_count, update))
+
+            if box not in self.fetching:
+                self.schedule(box)
+
+            return []
+
+        if local_pts is not None and local_pts + pts_count > pts:
+            # Already applied
+            return []
+
+        self.set_pts(box, pts)
+
+        return ([update] if update is not None else []) + self.drain(box)
+
+    def drain(self, box: int, flush: bool = False) -> List[tuple]:
+        """Apply the pending updates of a box that no longer have a gap before them.
+
+        Once a difference has been applied, the box is flushed instead: the state is now the server's one, so updates
+        still having a gap before them are applied anyway rather than waiting for another difference.
+        """
+        pending = self.pending.get(box)
+
+        if not pending:
+            return []
+
+        pending.sort(key=lambda p: p[0] - p[1])
+        updates = []
+
+        while pending:
+            pts, pts_count, update = pending[0]
+            local_pts = self.get_pts(box)
+
+            if local_pts is not None and local_pts + pts_count < pts and not flush:
+                break
+
+            pending.pop(0)
+
+            if local_pts is None or local_pts + pts_count == pts or flush and local_pts + pts_count < pts:
+                self.set_pts(box, pts)
+
+                if update is not None:
+                    updates.append(update)
+
+        if pending:
+            self.schedule(box)
+        else:
+            del self.pending[box]
+
+            timer = self.gap_timers.pop(box, None)
+
+            if timer is not None:
+                timer.cancel()
+
+        return updates
+
+    def schedule(self, box: int):
+        if box not in self.gap_timers:
+            self.gap_timers[box] = self.loop.call_later(self.GAP_TIMEOUT, self.fill_gap, box)
+
+    def fill_gap(self, box: int):
+        self.gap_timers.pop(box, None)
+
+        if box in (self.COMMON, self.QTS, self.SEQ):
+            self.create_task(self.get_difference())
+        else:
+            self.create_task(self.get_channel_difference(box))
+
+    def request_difference(self):
+        if self.pts is not None:
+            self.create_task(self.get_difference())
+
+    def check_seq(self, updates: "raw.base.Updates", packet: tuple = None) -> List[tuple]:
+        """Check the seq of an updates container and get the packets of the containers ready to be processed.
+
+        The packet (updates, users, chats, is_min) of the container itself is left out in case it was already applied
+        or it comes after a gap, in which case it's held until the gap is filled. Method results pass no packet: they
+        only move the seq forward, releasing the containers held after them.
+        """
+        seq_start = getattr(updates, "seq_start", updates.seq)
+
+        if updates.seq == 0 or self.seq is None:
+            return [packet] if packet is not None else []
+
+        if seq_start <= self.seq:
+            return []
+
+        if seq_start > self.seq + 1:
+            if packet is not None:
+                self.pending_seq.append((seq_start, updates.seq, updates.date, packet))
+                self.schedule(self.SEQ)
+
+            return []
+
+        self.set_seq(updates.seq, updates.date)
+
+        return ([packet] if packet is not None else []) + self.drain_seq()
+
+    def set_seq(self, seq: int, date: int):
+        self.seq = seq
+        self.date = max(self.date or 0, date)
+        self.dirty.add(self.COMMON)
+
+    def drain_seq(self, flush: bool = False) -> List[tuple]:
+        """Release the held containers that no longer have a gap before them.
+
+        Once a difference has been applied, all the held containers are released: their updates having a pts are
+        recognized as already applied, the others are still dispatched.
+        """
+        self.pending_seq.sort(key=lambda p: p[0])
+        packets = []
+
+        while self.pending_seq and (flush or self.pending_seq[0][0] <= self.seq + 1):
+            seq_start, seq, date, packet = self.pending_seq.pop(0)
+
+            if seq_start == self.seq + 1 or flush:
+                packets.append(packet)
+
+            if seq > self.seq:
+                self.set_seq(seq, date)
+
+        if self.pending_seq:
+            self.schedule(self.SEQ)
+        else:
+            timer = self.gap_timers.pop(self.SEQ, None)
+
+            if timer is not None:
+                timer.cancel()
+
+        return packets
+
+    async def process_updates(self, packets: List[tuple]):
+        """Process the updates of the containers released by check_seq."""
+        for updates, users, chats, is_min in packets:
+            for update in updates.updates:
+                await self.process(update, users, chats, is_min)
+
+    async def process(self, update, users: dict = None, chats: dict = None, is_min: bool = False):
+        """Process an incoming update, dispatching it together with the ones it unblocks."""
+        await self.dispatch(self.check(update, users or {}, chats or {}, is_min))
+
+    async def dispatch(self, updates: List[tuple]):
+        for u in updates:
+            await self.client.dispatch_update(*u)
+
+    def check(self, update, users: dict, chats: dict, is_min: bool = False) -> List[tuple]:
+        if self.pts is None:
+            return [(update, users, chats, is_min)]
+
+        if isinstance(update, raw.types.UpdateChannelTooLong):
+            if update.channel_id not in self.channels and update.pts is not None:
+                self.channels[update.channel_id] = update.pts
+
+            if update.channel_id in self.channels:
+                self.create_task(self.get_channel_difference(update.channel_id))
+            else:
+                log.info(update)
+
+            return []
+
+        box, pts, pts_count = self.get_box(update)
+
+        if box is None:
+            return [(update, users, chats, is_min)]
+
+        return self.apply(box, pts, pts_count, (update, users, chats, is_min))
+
+    def track(self, result, query: "raw.core.TLObject" = None):
+        """Account for the updates returned by a method, which are not dispatched.
+
+        The held updates they unblock are dispatched in a task of their own, not to delay the method result.
+        """
+        if self.pts is None:
+            return
+
+        if isinstance(result, (raw.types.Updates, raw.types.UpdatesCombined)):
+            packets = self.check_seq(result)
+
+            if packets:
+                self.create_task(self.process_updates(packets))
+
+            boxes = [self.get_box(update) for update in result.updates]
+        elif isinstance(result, raw.types.UpdateShort):
+            boxes = [self.get_box(result.update)]
+        elif isinstance(result, (raw.types.UpdateShortSentMessage, raw.types.UpdateShortMessage,
+                                 raw.types.UpdateShortChatMessage)):
+            boxes = [self.get_box(result)]
+        elif isinstance(result, self.AFFECTED_RESULTS):
+            boxes = [(self.get_query_box(query), result.pts, result.pts_count)]
+        else:
+            return
+
+        ready = []
+
+        for box, pts, pts_count in boxes:
+            if box is not None:
+                ready += self.apply(box, pts, pts_count, None)
+
+        if ready:
+            self.create_task(self.dispatch(ready))
+
+    async def check_state(self, state: "raw.types.updates.State"):
+        """Compare the local state with the server one, fetching the difference if something was missed."""
+        if self.pts is not None and (state.pts > self.pts or state.qts > self.qts):
+            await self.get_difference()
+
+    async def get_difference(self):
+        if self.COMMON in self.fetching:
+            return
+
+        self.fetching.update((self.COMMON, self.QTS))
+        applied = False
+
+        for box in (self.COMMON, self.QTS, self.SEQ):
+            timer = self.gap_timers.pop(box, None)
+
+            if timer is not None:
+                timer.cancel()
+
+        try:
+            while True:
+                diff = await self.client.invoke(
+                    raw.functions.updates.GetDifference(
+                        pts=self.pts,
+                        date=self.date,
+                        qts=self.qts
+                    )
+                )
+
+                if isinstance(diff, raw.types.updates.DifferenceEmpty):
+                    self.date, self.seq = diff.date, diff.seq
+                    self.dirty.add(self.COMMON)
+                    break
+
+                if isinstance(diff, raw.types.updates.DifferenceTooLong):
+                    log.warning("Too many updates missed, some of them will be skipped")
+                    self.pts = diff.pts
+                    self.dirty.add(self.COMMON)
+                    continue
+
+                state = diff.state if isinstance(diff, raw.types.updates.Difference) else diff.intermediate_state
+                users = {u.id: u for u in diff.users}
+                chats = {c.id: c for c in diff.chats}
+
+                for message in diff.new_messages:
+                    await self.client.dispatch_update(
+                        raw.types.UpdateNewMessage(message=message, pts=state.pts, pts_count=0),
+                        users, chats
+                    )
+
+                for update in diff.other_updates:
+                    box, _, _ = self.get_box(update)
+
+                    # Updates of the common and qts boxes are already accounted for by the state of the difference
+                    if box in (self.COMMON, self.QTS):
+                        await self.client.dispatch_update(update, users, chats)
+                    else:
+                        for u in self.check(update, users, chats):
+                            await self.client.dispatch_update(*u)
+
+                self.set_state(state)
+
+                if isinstance(diff, raw.types.updates.Difference):
+                    break
+
+            applied = True
+        except (RPCError, OSError) as e:
+            log.warning("Unable to get the updates difference: %s", e)
+        finally:
+            self.fetching.difference_update((self.COMMON, self.QTS))
+
+        packets = self.drain_seq(applied)
+
+        for box in (self.COMMON, self.QTS):
+            for u in self.drain(box, applied):
+                await self.client.dispatch_update(*u)
+
+        await self.process_updates(packets)
+
+        await self.save()
+
+    async def get_channel_difference(self, channel_id: int):
+        if channel_id in self.fetching or channel_id not in self.channels:
+            return
+
+        self.fetching.add(channel_id)
+        applied = False
+
+        timer = self.gap_timers.pop(channel_id, None)
+
+        if timer is not None:
+            timer.cancel()
+
+        try:
+            channel = await self.client.resolve_peer(utils.get_channel_id(channel_id))
+
+            while True:
+                diff = await self.client.invoke(
+                    raw.functions.updates.GetChannelDifference(
+                        channel=channel,
+                        filter=raw.types.ChannelMessagesFilterEmpty(),
+                        pts=self.channels[channel_id],
+                        limit=(
+                            self.CHANNEL_DIFFERENCE_LIMIT_BOT
+                            if self.client.me and self.client.me.is_bot
+                            else self.CHANNEL_DIFFERENCE_LIMIT
+                        )
+                    )
+                )
+
+                if isinstance(diff, raw.types.updates.ChannelDifferenceEmpty):
+                    self.set_pts(channel_id, diff.pts)
+                    break
+
+                if isinstance(diff, raw.types.updates.ChannelDifferenceTooLong):
+                    log.warning("Too many updates missed in channel %s, some of them will be skipped", channel_id)
+
+                    if diff.dialog.pts is not None:
+                        self.set_pts(channel_id, diff.dialog.pts)
+
+                    break
+
+                users = {u.id: u for u in diff.users}
+                chats = {c.id: c for c in diff.chats}
+
+                for message in diff.new_messages:
+                    await self.client.dispatch_update(
+                        raw.types.UpdateNewChannelMessage(message=message, pts=diff.pts, pts_count=0),
+                        users, chats
+                    )
+
+                for update in diff.other_updates:
+                    await self.client.dispatch_update(update, users, chats)
+
+                self.set_pts(channel_id, diff.pts)
+
+                if diff.final:
+                    break
+
+            applied = True
+        except (ChannelPrivate, ChannelInvalid, PeerIdInvalid) as e:
+            # The channel can't be reached anymore, its state is of no use
+            log.info("Dropping the updates state of channel %s: %s", channel_id, e)
+
+            self.channels.pop(channel_id, None)
+            self.pending.pop(channel_id, None)
+            self.dirty.discard(channel_id)
+
+            await self.client.storage.update_state(utils.get_channel_id(channel_id))
+        except (RPCError, OSError) as e:
+            log.warning("Unable to get the updates difference of channel %s: %s", channel_id, e)
+        finally:
+            self.fetching.discard(channel_id)
+
+        for u in self.drain(channel_id, applied):
+            await self.client.dispatch_update(*u)
+
+        await self.save(force=False)
@@ -95,16 +95,18 @@ async def parse_messages(
     if not messages.messages:
         return types.List()
 
-    parsed_messages = []
-
-    for message in messages.messages:
-        parsed_messages.append(await types.Message._parse(client, message, users, chats, replies=0))
+    # Parsing doesn't yield to the event loop unless a message actually needs I/O (e.g. a pinned message to fetch)
+    parsed_messages = [
+        await types.Message._parse(client, message, users, chats, replies=0)
+        for message in messages.messages
+    ]
 
     if replies:
+        # TL objects are truthy by serializing themselves, hence the explicit None check on reply_to
         messages_with_replies = {
             i.id: i.reply_to.reply_to_msg_id
             for i in messages.messages
-            if not isinstance(i, raw.types.MessageEmpty) and i.reply_to
+            if not isinstance(i, raw.types.MessageEmpty) and i.reply_to is not None
         }
 
         if messages_with_replies:
@@ -123,12 +125,13 @@ async def parse_messages(
                 replies=replies - 1
             )
 
+            reply_messages = {reply.id: reply for reply in reply_messages}
+
             for message in parsed_messages:
                 reply_id = messages_with_replies.get(message.id, None)
 
-                for reply in reply_messages:
-                    if reply.id == reply_id:
-                        message.reply_to_message = reply
+                if reply_id in reply_messages:
+                    message.reply_to_message = reply_messages[reply_id]
 
     return types.List(parsed_messages)
 
@@ -19,6 +19,7 @@
 import pytest
 
 from pyrogram import filters
+from pyrogram.handlers import CommandRouter
 from tests.filters import Client, Message
 
 c = Client()
@@ -146,3 +147,76 @@ async def test_no_text():
 
     m = Message()
     assert not await f(c, m)
+
+
+@pytest.mark.asyncio
+async def test_longest_match():
+    f = filters.command(["start", "start now"], prefixes=["/", "//"])
+
+    m = Message("/start now please")
+    assert await f(c, m)
+    assert m.command == ["start now", "please"]
+
+    m = Message("//start")
+    assert await f(c, m)
+    assert m.command == ["start"]
+
+
+@pytest.mark.asyncio
+async def test_commands_changed():
+    f = filters.command("start")
+    f.commands.add("help")
+
+    m = Message("/help")
+    assert await f(c, m)
+
+    # Same size, different contents
+    f.commands.discard("start")
+    f.commands.add("stop")
+
+    m = Message("/stop")
+    assert await f(c, m)
+
+    m = Message("/start")
+    assert not await f(c, m)
+
+    # Unchanged sets don't rebuild the matcher
+    matcher = f.matcher
+    assert await f(c, Message("/stop"))
+    assert f.matcher is matcher
+
+    f.commands = {"settings"}
+    assert await f(c, Message("/settings"))
+    assert not await f(c, Message("/stop"))
+
+    f.commands.add("stop")
+    assert await f(c, Message("/stop"))
+
+
+@pytest.mark.asyncio
+async def test_router():
+    routed = []
+
+    async def callback(_, message):
+        routed.append(message.command)
+
+    router = CommandRouter()
+    router.add_command([f"cmd{i}" for i in range(1000)], callback)
+    router.remove_command("cmd0")
+
+    for text in ("/cmd999 a", "/cmd0", "/cmd1000"):
+        m = Message(text)
+
+        if await router.check(c, m):
+            await router.callback(c, m)
+
+    assert routed == [["cmd999", "a"]]
+
+
+@pytest.mark.asyncio
+async def test_no_match_keeps_command():
+    f = filters.command("start") & ~filters.command("help")
+
+    m = Message("/start now")
+    assert await f(c, m)
+    assert m.command == ["start", "now"]
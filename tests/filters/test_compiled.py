@@ -0,0 +1,80 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyrogram import filters
+from pyrogram.filters import compile_filter
+from tests.filters import Message
+
+
+class Client:
+    def __init__(self):
+        self.loop = asyncio.get_event_loop()
+        self.executor = ThreadPoolExecutor(1)
+
+
+def create(value, calls: list, is_async: bool):
+    if is_async:
+        async def func(_, __, ___):
+            calls.append(value)
+            return value
+    else:
+        def func(_, __, ___):
+            calls.append(value)
+            return value
+
+    return filters.create(func)
+
+
+def test_flatten_and_merge_sync():
+    calls = []
+    a, b, c = (create(True, calls, False) for _ in range(3))
+
+    assert compile_filter(a & b & ~c)[0] is False
+    assert compile_filter(a & (b | c))[0] is False
+    assert compile_filter(a & filters.text)[0] is True
+
+
+@pytest.mark.asyncio
+async def test_short_circuit_mixed():
+    calls = []
+    f = (
+        create(1, calls, False)
+        & create(0, calls, True)
+        & create(2, calls, False)
+    )
+
+    assert await f(Client(), Message("text")) is False
+    assert calls == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_same_results_as_operators():
+    calls = []
+    t, f = create(True, calls, False), create(False, calls, True)
+    c = Client()
+
+    assert await (t | f)(c, Message()) is True
+    assert await (f | f)(c, Message()) is False
+    assert await (~f & t)(c, Message()) is True
+    assert await (f | ~(t & f) | t)(c, Message()) is True
+    assert calls == [True, False, False, False, True, False, True, False]
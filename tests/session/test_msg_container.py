@@ -0,0 +1,40 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from io import BytesIO
+
+from pyrogram import raw
+from pyrogram.raw.core import Int, Long, Message, MsgContainer, TLObject, Vector
+
+
+def test_bare_vector_result():
+    # messages.GetMessagesViews-like result: a bare Vector<long> inside an rpc_result, followed by another message
+    result = Int(raw.types.RpcResult.ID, False) + Long(1) + Vector([10, 20, 30], Long)
+    pong = raw.types.Pong(msg_id=2, ping_id=3).write()
+
+    container = Int(MsgContainer.ID, False) + Int(2) + b"".join(
+        Long(msg_id) + Int(seq_no) + Int(len(body)) + body
+        for msg_id, seq_no, body in ((4, 1, result), (5, 2, pong))
+    )
+
+    messages = TLObject.read(BytesIO(container)).messages
+
+    assert messages[0].body.req_msg_id == 1
+    assert messages[0].body.result == [10, 20, 30]
+    assert messages[1].body == raw.types.Pong(msg_id=2, ping_id=3)
+    assert isinstance(messages[1], Message)
@@ -0,0 +1,144 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+from pyrogram import raw
+from pyrogram.crypto import mtproto
+from pyrogram.raw.core import Message, MsgContainer
+from pyrogram.session import Session
+from pyrogram.session.internals import MsgId
+
+
+class Connection:
+    def __init__(self):
+        self.payloads = []
+        self.sent = asyncio.Event()
+        self.blocked = False
+
+    async def send(self, payload):
+        self.payloads.append(payload)
+        self.sent.set()
+
+        if self.blocked:
+            await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def create_session(monkeypatch):
+    # Pass messages through as they are, along with the salt they are sent with
+    monkeypatch.setattr(mtproto, "pack", lambda message, salt, *args: (message, salt))
+    monkeypatch.setattr(mtproto, "unpack", lambda packet, *args: packet)
+
+    sessions = []
+
+    def create():
+        session = Session(None, 2, bytes(256), False, is_media=True)
+        session.connection = Connection()
+        sessions.append(session)
+
+        return session
+
+    yield create
+
+    for session in sessions:
+        if session.send_task is not None:
+            session.send_task.cancel()
+
+        if session.timeouts_handle is not None:
+            session.timeouts_handle.cancel()
+
+
+async def next_payload(session):
+    await session.connection.sent.wait()
+    session.connection.sent.clear()
+
+    return session.connection.payloads[-1]
+
+
+@pytest.mark.asyncio
+async def test_queued_messages_share_a_container(create_session):
+    session = create_session()
+
+    sends = [asyncio.ensure_future(session.send(raw.functions.Ping(ping_id=i), False)) for i in range(3)]
+    await asyncio.sleep(0)
+
+    session.send_task = asyncio.ensure_future(session.send_worker())
+    await asyncio.gather(*sends)
+
+    (message, _), = session.connection.payloads
+
+    assert isinstance(message.body, MsgContainer)
+    assert [m.body.ping_id for m in message.body.messages] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_bad_server_salt_resends_container(create_session):
+    session = create_session()
+
+    sends = [asyncio.ensure_future(session.send(raw.functions.Ping(ping_id=i))) for i in range(2)]
+    await asyncio.sleep(0)
+
+    session.send_task = asyncio.ensure_future(session.send_worker())
+    container, salt = await next_payload(session)
+
+    assert salt == 0
+    assert container.msg_id in session.containers
+
+    bad_server_salt = raw.types.BadServerSalt(
+        bad_msg_id=container.msg_id, bad_msg_seqno=container.seq_no, error_code=48, new_server_salt=42
+    )
+    await session.handle_packet(Message(bad_server_salt, MsgId(), 0, 0))
+
+    # Both requests are sent again, with the new salt
+    container, salt = await next_payload(session)
+
+    assert salt == 42
+    assert [m.body.ping_id for m in container.body.messages] == [0, 1]
+
+    for m in container.body.messages:
+        pong = raw.types.Pong(msg_id=m.msg_id, ping_id=m.body.ping_id)
+        await session.handle_packet(Message(pong, MsgId(), 0, 0))
+
+    assert [pong.ping_id for pong in await asyncio.gather(*sends)] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_queued_and_in_flight_messages(create_session):
+    session = create_session()
+
+    session.connection.blocked = True
+    session.send_task = asyncio.ensure_future(session.send_worker())
+
+    in_flight = asyncio.ensure_future(session.send(raw.functions.Ping(ping_id=0), False))
+    await next_payload(session)
+    queued = asyncio.ensure_future(session.send(raw.functions.Ping(ping_id=1), False))
+    await asyncio.sleep(0)
+
+    await session.stop()
+
+    for send in (in_flight, queued):
+        with pytest.raises(ConnectionError):
+            await send
+
+    assert session.send_queue.empty()
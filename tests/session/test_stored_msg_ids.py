@@ -0,0 +1,126 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pyrogram.errors import SecurityCheckMismatch
+from pyrogram.session.internals import MsgId, StoredMsgIds
+
+
+def msg_ids(count: int, start: int = None):
+    start = start or MsgId() - 60 * 2 ** 32
+    return [start + 4 * i + 1 for i in range(count)]
+
+
+def test_accepts_increasing():
+    s = StoredMsgIds(10)
+
+    for msg_id in msg_ids(5):
+        s.add(msg_id)
+
+    assert len(s) == 5
+
+
+def test_accepts_out_of_order_above_lowest():
+    s = StoredMsgIds(10)
+    first, second, third = msg_ids(3)
+
+    s.add(first)
+    s.add(third)
+    s.add(second)
+
+    assert second in s
+
+
+def test_duplicate():
+    s = StoredMsgIds(10)
+    first, second = msg_ids(2)
+
+    s.add(first)
+    s.add(second)
+
+    with pytest.raises(SecurityCheckMismatch, match="equal"):
+        s.add(second)
+
+
+def test_lower_than_stored():
+    s = StoredMsgIds(10)
+    first, second = msg_ids(2)
+
+    s.add(second)
+
+    with pytest.raises(SecurityCheckMismatch, match="lower"):
+        s.add(first)
+
+
+def test_evicted_replay():
+    s = StoredMsgIds(10)
+    ids = msg_ids(20)
+
+    for msg_id in ids:
+        s.add(msg_id)
+
+    assert len(s) <= 11
+    assert ids[0] not in s
+
+    for msg_id in ids[:5]:
+        with pytest.raises(SecurityCheckMismatch, match="lower"):
+            s.add(msg_id)
+
+
+def test_evicted_out_of_order_replay():
+    s = StoredMsgIds(4)
+    ids = msg_ids(6)
+
+    # The highest msg_id arrives among the first ones and gets evicted along with them
+    for msg_id in [ids[0], ids[4], ids[1], ids[2], ids[3]]:
+        s.add(msg_id)
+
+    s.add(ids[5])
+
+    assert ids[4] not in s
+
+    with pytest.raises(SecurityCheckMismatch, match="lower"):
+        s.add(ids[4])
+
+
+def test_future():
+    s = StoredMsgIds(10)
+    s.add(msg_ids(1)[0])
+
+    with pytest.raises(SecurityCheckMismatch, match="future"):
+        s.add(MsgId() + 60 * 2 ** 32)
+
+
+def test_past():
+    s = StoredMsgIds(10)
+    s.add(msg_ids(1, MsgId() - 600 * 2 ** 32)[0])
+
+    with pytest.raises(SecurityCheckMismatch, match="past"):
+        s.add(MsgId() - 400 * 2 ** 32)
+
+
+def test_clear():
+    s = StoredMsgIds(10)
+    first, second = msg_ids(2)
+
+    s.add(second)
+    s.clear()
+    s.add(first)
+
+    assert len(s) == 1
@@ -0,0 +1,64 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import gc
+import weakref
+
+import pytest
+
+from pyrogram.session import Session
+
+
+class Result:
+    pass
+
+
+@pytest.mark.asyncio
+async def test_done_future_is_not_referenced():
+    session = Session(None, 2, bytes(256), False)
+
+    future = session.loop.create_future()
+    session.set_timeout(future, 15)
+
+    result = Result()
+    ref = weakref.ref(result)
+    future.set_result(result)
+
+    await asyncio.sleep(0)
+    del future, result
+    gc.collect()
+
+    assert ref() is None
+    assert session.timeouts_futures == {}
+
+    session.timeouts_handle.cancel()
+
+
+@pytest.mark.asyncio
+async def test_pending_future_times_out():
+    session = Session(None, 2, bytes(256), False)
+
+    future = session.loop.create_future()
+    session.set_timeout(future, 0)
+
+    with pytest.raises(TimeoutError):
+        await future
+
+    assert session.timeouts == []
+    assert session.timeouts_futures == {}
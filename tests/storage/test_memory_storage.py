@@ -0,0 +1,66 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pyrogram.storage import MemoryStorage
+
+
+@pytest.mark.asyncio
+async def test_peers():
+    storage = MemoryStorage("test")
+    await storage.open()
+
+    await storage.update_peers([(1, 10, "user", "one", "123"), (-2, 0, "group", None, None)])
+
+    assert (await storage.get_peer_by_id(1)).access_hash == 10
+    assert (await storage.get_peer_by_id(-2)).chat_id == 2
+    assert (await storage.get_peer_by_username("one")).user_id == 1
+    assert (await storage.get_peer_by_phone_number("123")).user_id == 1
+
+    # The username moved to another peer
+    await storage.update_peers([(1, 10, "user", None, "123"), (3, 30, "bot", "one", None)])
+    assert (await storage.get_peer_by_username("one")).user_id == 3
+
+    storage.peers[3] = storage.peers[3][:4] + (0,)
+
+    with pytest.raises(KeyError):
+        await storage.get_peer_by_username("one")
+
+    with pytest.raises(KeyError):
+        await storage.get_peer_by_id(4)
+
+
+@pytest.mark.asyncio
+async def test_session_string():
+    storage = MemoryStorage("test")
+    await storage.open()
+
+    await storage.dc_id(4)
+    await storage.api_id(1)
+    await storage.test_mode(False)
+    await storage.auth_key(b"\x01" * 256)
+    await storage.user_id(5)
+    await storage.is_bot(True)
+
+    storage = MemoryStorage("test", await storage.export_session_string())
+    await storage.open()
+
+    assert await storage.dc_id() == 4
+    assert await storage.auth_key() == b"\x01" * 256
+    assert await storage.is_bot() is True
@@ -0,0 +1,146 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from pyrogram.storage import FileStorage
+
+
+@pytest.mark.asyncio
+async def test_session_accessors(tmp_path):
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    assert await storage.dc_id() == 2
+    assert await storage.auth_key() is None
+
+    await storage.dc_id(4)
+    await storage.auth_key(b"\x01" * 256)
+
+    assert await storage.dc_id() == 4
+    await storage.close()
+
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    assert await storage.dc_id() == 4
+    assert await storage.auth_key() == b"\x01" * 256
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_peers(tmp_path):
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    await storage.update_peers([(1, 10, "user", "one", None)])
+    assert storage.pending_peers
+
+    # Pending peers are visible to lookups
+    assert (await storage.get_peer_by_id(1)).access_hash == 10
+    assert (await storage.get_peer_by_username("one")).user_id == 1
+    assert not storage.pending_peers
+
+    # Unchanged peers are not written again
+    await storage.update_peers([(1, 10, "user", "one", None)])
+    assert not storage.pending_peers
+
+    await storage.update_peers([(1, 11, "user", "one", None)])
+    await storage.close()
+
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    assert (await storage.get_peer_by_id(1)).access_hash == 11
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_lookup_during_flush(tmp_path):
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    await storage.update_peers([(1, 10, "user", "one", None)])
+
+    # Peers being flushed stay visible, and reads run after the queued writes
+    flush = asyncio.ensure_future(storage.flush_peers())
+    await asyncio.sleep(0)
+    assert not storage.pending_peers
+
+    peer, by_username = await asyncio.gather(
+        storage.get_peer_by_id(1),
+        storage.get_peer_by_username("one")
+    )
+    await flush
+
+    assert peer.access_hash == 10
+    assert by_username.user_id == 1
+    assert not storage.flushing_peers
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_set_during_get(tmp_path):
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    _, _, dc_id = await asyncio.gather(storage.dc_id(), storage.dc_id(4), storage.dc_id())
+
+    assert dc_id == 4
+    assert await storage.dc_id() == 4
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried(tmp_path):
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    execute = storage.execute
+
+    def fail(writes):
+        storage.execute = execute
+        raise sqlite3.OperationalError("database is locked")
+
+    storage.execute = fail
+
+    await storage.update_peers([(1, 10, "user", "one", None)])
+
+    with pytest.raises(sqlite3.OperationalError):
+        await storage.flush_peers()
+
+    # Not committed: the peer is still pending and not remembered as written
+    assert storage.pending_peers == {1: (1, 10, "user", "one", None)}
+    assert storage.flush_handle is not None
+    assert not storage.written_peers and not storage.flushing_peers
+
+    await storage.update_peers([(1, 10, "user", "one", None)])
+    await storage.flush_peers()
+
+    assert not storage.pending_peers
+    assert 1 in storage.written_peers
+    await storage.close()
+
+    storage = FileStorage("test", tmp_path)
+    await storage.open()
+
+    assert (await storage.get_peer_by_id(1)).access_hash == 10
+    await storage.close()
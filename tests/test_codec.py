@@ -0,0 +1,152 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from io import BytesIO
+from struct import pack
+
+from pyrogram import raw
+from pyrogram.raw.core import TLObject, List
+from pyrogram.raw.core.primitives import Double, Int, Long, Vector
+
+
+def round_trip(obj: TLObject) -> TLObject:
+    data = obj.write()
+
+    b = BytesIO()
+    obj.write_into(b)
+    assert b.getvalue() == data
+
+    b = BytesIO(data)
+    read = TLObject.read(b)
+
+    # Everything is consumed, and the object written back is the same
+    assert b.tell() == len(data)
+    assert read.write() == data
+
+    return read
+
+
+def test_fixed_size_fields():
+    geo_point = raw.types.GeoPoint(long=12.5, lat=-41.25, access_hash=-2 ** 63, accuracy_radius=None)
+
+    # flags, long, lat and access_hash are read and written as a single run
+    assert geo_point.write() == pack("<Iiddq", 0xB2A2F663, 0, 12.5, -41.25, -2 ** 63)
+    assert round_trip(geo_point) == geo_point
+
+    geo_point.accuracy_radius = 100
+    assert geo_point.write() == pack("<Iiddqi", 0xB2A2F663, 1, 12.5, -41.25, -2 ** 63, 100)
+    assert round_trip(geo_point) == geo_point
+
+
+def test_flags():
+    message = raw.types.Message(
+        id=2 ** 31 - 1,
+        peer_id=raw.types.PeerChannel(channel_id=2 ** 40),
+        date=1700000000,
+        message="hello",
+        out=True,
+        silent=True,
+        noforwards=True,
+        from_id=raw.types.PeerUser(user_id=1),
+        via_bot_id=2 ** 62,
+        entities=[raw.types.MessageEntityBold(offset=0, length=5)],
+        views=0,
+        forwards=7,
+        edit_date=1700000001,
+        grouped_id=-1
+    )
+
+    read = round_trip(message)
+
+    # True flags take no room in the stream and don't get in the way of the fields around them
+    assert (read.out, read.mentioned, read.silent, read.post, read.noforwards) == (True, False, True, False, True)
+    assert (read.id, read.via_bot_id, read.date) == (2 ** 31 - 1, 2 ** 62, 1700000000)
+    assert (read.views, read.forwards, read.edit_date, read.grouped_id) == (0, 7, 1700000001, -1)
+    assert read.peer_id == message.peer_id and read.from_id == message.from_id
+    assert read.entities == message.entities
+
+    # Unset optional fields are left out
+    assert read.reply_to is None and read.media is None and read.replies is None
+
+
+def test_only_true_flags():
+    update = raw.types.UpdateStickerSetsOrder(order=[1, -2 ** 63, 2 ** 63 - 1], masks=False, emojis=True)
+
+    read = round_trip(update)
+
+    assert (read.masks, read.emojis) == (False, True)
+    assert read.order == [1, -2 ** 63, 2 ** 63 - 1]
+
+
+def test_vectors():
+    update = raw.types.UpdateDeleteMessages(messages=[1, -1, 2 ** 31 - 1], pts=5, pts_count=3)
+    assert update.write() == pack("<IIIiiiii", 0xA20DB0E5, 0x1CB5C415, 3, 1, -1, 2 ** 31 - 1, 5, 3)
+    assert round_trip(update) == update
+
+    action = raw.types.MessageActionChatAddUser(users=[2 ** 40, 2 ** 62])
+    assert round_trip(action) == action
+
+    empty = raw.types.MessageActionChatAddUser(users=[])
+    assert round_trip(empty) == empty
+
+    doubles = Vector([0.5, -1e300, 3.0], Double)
+    assert doubles == pack("<IIddd", 0x1CB5C415, 3, 0.5, -1e300, 3.0)
+
+    b = BytesIO(doubles[4:])
+    assert Vector.read(b, Double) == [0.5, -1e300, 3.0]
+    assert b.read() == b""
+
+
+def test_boxed_vectors():
+    users = [raw.types.User(id=i, access_hash=i * 10, first_name=f"user{i}") for i in range(3)]
+    messages = raw.types.messages.ChannelMessages(
+        pts=1,
+        count=2,
+        messages=[
+            raw.types.MessageEmpty(id=1),
+            raw.types.MessageService(
+                id=2,
+                peer_id=raw.types.PeerChannel(channel_id=1),
+                date=0,
+                action=raw.types.MessageActionChatAddUser(users=[0, 1])
+            )
+        ],
+        topics=[],
+        chats=[],
+        users=users
+    )
+
+    read = round_trip(messages)
+
+    assert isinstance(read.users, List)
+    assert [u.first_name for u in read.users] == ["user0", "user1", "user2"]
+    assert read.messages[1].action.users == [0, 1]
+
+
+def test_bare_vector_results():
+    # Vectors returned as RPC results are read without knowing their element type
+    ints = Vector([5, 6, 7], Int)
+    assert TLObject.read(BytesIO(ints)) == [5, 6, 7]
+
+    longs = Vector([2 ** 40, -1], Long)
+    assert TLObject.read(BytesIO(longs)) == [2 ** 40, -1]
+
+    peers = [raw.types.PeerUser(user_id=1), raw.types.PeerChat(chat_id=2)]
+    assert TLObject.read(BytesIO(Vector(peers))) == peers
+
+    assert TLObject.read(BytesIO(Vector([]))) == []
@@ -0,0 +1,250 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import random
+
+import pytest
+
+from pyrogram import raw, enums, handlers
+from pyrogram.dispatcher import Dispatcher
+
+
+class Client:
+    no_updates = False
+    skip_unhandled_updates = False
+    executor = None
+
+    def __init__(
+        self,
+        updates_queue_size: int = 0,
+        updates_queue_policy: enums.UpdatesQueuePolicy = enums.UpdatesQueuePolicy.BLOCK,
+        workers: int = 1,
+        shard_updates: bool = False,
+        low_priority_updates: tuple = Dispatcher.LOW_PRIORITY_UPDATES
+    ):
+        self.updates_queue_size = updates_queue_size
+        self.updates_queue_policy = updates_queue_policy
+        self.low_priority_updates = low_priority_updates
+        self.workers = workers
+        self.shard_updates = shard_updates
+
+
+def status(user_id: int, expires: int = 0):
+    return raw.types.UpdateUserStatus(user_id=user_id, status=raw.types.UserStatusOnline(expires=expires))
+
+
+def deleted(message_id: int):
+    return raw.types.UpdateDeleteMessages(messages=[message_id], pts=0, pts_count=1)
+
+
+def read_history(chat_id: int, max_id: int):
+    return raw.types.UpdateReadHistoryInbox(
+        peer=raw.types.PeerUser(user_id=chat_id), max_id=max_id, still_unread_count=0, pts=0, pts_count=0
+    )
+
+
+def queued(dispatcher: Dispatcher, index: int = 0):
+    return [entry[1][0] for entry in dispatcher.updates_queues[index]._queue]
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    d = Dispatcher(Client(10, enums.UpdatesQueuePolicy.BLOCK))
+
+    for i in range(3):
+        d.put_update((status(1, i), {}, {}))
+
+    d.put_update((status(2), {}, {}))
+
+    assert [(u.user_id, u.status.expires) for u in queued(d)] == [(1, 2), (2, 0)]
+    assert d.coalesced_updates == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    d = Dispatcher(Client(2, enums.UpdatesQueuePolicy.DROP_OLDEST))
+
+    for i in range(4):
+        d.put_update((deleted(i), {}, {}))
+
+    assert [u.messages[0] for u in queued(d)] == [2, 3]
+    assert d.get_metrics()["dropped_updates"] == {"UpdateDeleteMessages": 2}
+    assert d.room.is_set()
+
+
+@pytest.mark.asyncio
+async def test_drop_low_priority():
+    d = Dispatcher(Client(1, enums.UpdatesQueuePolicy.DROP_LOW_PRIORITY))
+
+    d.put_update((deleted(0), {}, {}))
+    assert not d.room.is_set()
+
+    d.put_update((status(1), {}, {}))
+    d.put_update((deleted(1), {}, {}))
+
+    assert [u.messages[0] for u in queued(d)] == [0, 1]
+    assert d.get_metrics()["dropped_updates"] == {"UpdateUserStatus": 1}
+
+
+@pytest.mark.asyncio
+async def test_custom_low_priority():
+    d = Dispatcher(Client(
+        1, enums.UpdatesQueuePolicy.DROP_LOW_PRIORITY, low_priority_updates=(raw.types.UpdateDeleteMessages,)
+    ))
+
+    d.put_update((status(1), {}, {}))
+    d.put_update((deleted(0), {}, {}))
+
+    assert [type(u).__name__ for u in queued(d)] == ["UpdateUserStatus"]
+    assert d.get_metrics()["dropped_updates"] == {"UpdateDeleteMessages": 1}
+
+
+@pytest.mark.asyncio
+async def test_shard_routing():
+    d = Dispatcher(Client(workers=3, shard_updates=True))
+
+    for chat_id in (1, 2, 4, 5):
+        d.put_update((read_history(chat_id, 1), {}, {}))
+
+    # Updates not belonging to any chat are spread evenly
+    for i in range(3):
+        d.put_update((raw.types.UpdateConfig(), {}, {}))
+
+    assert [u.peer.user_id for u in queued(d, 1) if hasattr(u, "peer")] == [1, 4]
+    assert [u.peer.user_id for u in queued(d, 2) if hasattr(u, "peer")] == [2, 5]
+    assert [len(queued(d, i)) for i in range(3)] == [1, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_shard_per_chat_order():
+    d = Dispatcher(Client(workers=4, shard_updates=True))
+    handled = {}
+
+    async def callback(_, update, users, chats):
+        # Handlers taking random time must not reorder the updates of a chat
+        await asyncio.sleep(random.random() / 1000)
+        handled.setdefault(update.peer.user_id, []).append(update.max_id)
+
+    d.add_handler(handlers.RawUpdateHandler(callback), 0)
+    await d.start()
+
+    for max_id in range(20):
+        for chat_id in range(10):
+            d.put_update((read_history(chat_id, max_id), {}, {}))
+
+    await d.stop()
+
+    assert handled == {chat_id: list(range(20)) for chat_id in range(10)}
+
+
+@pytest.mark.asyncio
+async def test_handlers_index():
+    d = Dispatcher(Client())
+    raw_handler = handlers.RawUpdateHandler(None)
+    status_handler = handlers.UserStatusHandler(None)
+    message_handler = handlers.MessageHandler(None)
+
+    d.add_handler(status_handler, 2)
+    d.add_handler(message_handler, 0)
+    d.add_handler(raw_handler, 1)
+
+    # Groups in order, raw update handlers included, groups with no candidates left out
+    assert d.handlers_index[handlers.UserStatusHandler] == ((raw_handler,), (status_handler,))
+    assert d.handlers_index[handlers.MessageHandler] == ((message_handler,), (raw_handler,))
+    assert d.handlers_index[type(None)] == ((raw_handler,),)
+    assert d.handlers_index[handlers.PollHandler] == ((raw_handler,),)
+
+    d.remove_handler(raw_handler, 1)
+
+    assert d.handlers_index[handlers.UserStatusHandler] == ((status_handler,),)
+    assert d.handlers_index[type(None)] == ()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_through_index():
+    d = Dispatcher(Client())
+    called = []
+
+    def record(name):
+        async def callback(*args):
+            called.append(name)
+
+        return callback
+
+    d.add_handler(handlers.MessageHandler(record("message")), 0)
+    d.add_handler(handlers.UserStatusHandler(record("status")), 1)
+    d.add_handler(handlers.UserStatusHandler(record("status, same group")), 1)
+    d.add_handler(handlers.RawUpdateHandler(record("raw")), 2)
+    await d.start()
+
+    d.put_update((status(1), {}, {}))
+    d.put_update((raw.types.UpdateConfig(), {}, {}))
+    await d.stop()
+
+    # One handler per group, only the handlers able to receive the update
+    assert called == ["status", "raw", "raw"]
+
+
+@pytest.mark.asyncio
+async def test_handlers_changed_at_runtime():
+    d = Dispatcher(Client())
+    called = []
+
+    async def first(_, user):
+        called.append(("first", user.id))
+
+        # Takes effect from the next update on
+        d.remove_handler(first_handler, 0)
+        d.add_handler(second_handler, 0)
+        d.add_handler(later_handler, 1)
+
+    async def second(_, user):
+        called.append(("second", user.id))
+
+    async def later(_, user):
+        called.append(("later", user.id))
+
+    first_handler = handlers.UserStatusHandler(first)
+    second_handler = handlers.UserStatusHandler(second)
+    later_handler = handlers.UserStatusHandler(later)
+
+    d.add_handler(first_handler, 0)
+    await d.start()
+
+    d.put_update((status(1), {}, {}))
+    d.put_update((status(2), {}, {}))
+    await d.stop()
+
+    assert called == [("first", 1), ("second", 2), ("later", 2)]
+
+
+@pytest.mark.asyncio
+async def test_remove_missing_handler():
+    d = Dispatcher(Client())
+    handler = handlers.UserStatusHandler(None)
+    d.add_handler(handler, 0)
+
+    with pytest.raises(ValueError, match="Group 1 does not exist"):
+        d.remove_handler(handler, 1)
+
+    with pytest.raises(ValueError):
+        d.remove_handler(handlers.UserStatusHandler(None), 0)
+
+    assert d.groups == {0: (handler,)}
+    assert d.handlers_index[handlers.UserStatusHandler] == ((handler,),)
@@ -0,0 +1,172 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+import pyrogram
+from pyrogram import raw
+from pyrogram.file_id import FileId, FileType
+
+CHUNK_SIZE = 1024 * 1024
+
+# Five full chunks and a last, shorter one
+FILE_SIZE = 5 * CHUNK_SIZE + 10
+
+
+class Session:
+    """Media session whose GetFile requests complete only when the test says so."""
+
+    def __init__(self):
+        self.is_started = asyncio.Event()
+        self.is_started.set()
+        self.users = 0
+        self.idle_handle = None
+        self.requests = {}
+        self.cancelled = []
+
+    async def stop(self):
+        pass
+
+    async def invoke(self, query, sleep_threshold=None):
+        index = query.offset // CHUNK_SIZE
+        self.requests[index] = asyncio.get_event_loop().create_future()
+
+        try:
+            return await self.requests[index]
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+
+    def complete(self, index: int):
+        size = CHUNK_SIZE if index < FILE_SIZE // CHUNK_SIZE else FILE_SIZE % CHUNK_SIZE
+
+        self.requests[index].set_result(
+            raw.types.upload.File(type=raw.types.storage.FilePartial(), mtime=0, bytes=bytes([index]) * size)
+        )
+
+    def in_flight(self):
+        return sorted(i for i, request in self.requests.items() if not request.done())
+
+
+def create_client():
+    client = pyrogram.Client("test", api_id=1, api_hash="", in_memory=True)
+    session = Session()
+
+    async def create_media_session(dc_id, is_cdn=False):
+        return session
+
+    client.create_media_session = create_media_session
+
+    return client, session
+
+
+async def download(client: pyrogram.Client, chunks: list):
+    file_id = FileId(file_type=FileType.DOCUMENT, dc_id=2, media_id=1, access_hash=1)
+
+    async for chunk in client.get_file(file_id, FILE_SIZE):
+        chunks.append(chunk[0])
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_out_of_order_completion():
+    client, session = create_client()
+    chunks = []
+    task = asyncio.ensure_future(download(client, chunks))
+
+    await settle()
+    session.complete(0)
+    await settle()
+
+    # The chunks that follow are requested ahead, up to the window size
+    assert session.in_flight() == [1, 2, 3, 4]
+
+    for index in (4, 3, 2):
+        session.complete(index)
+
+    await settle()
+
+    # Nothing is yielded past a chunk still in flight
+    assert chunks == [0]
+    assert session.in_flight() == [1]
+
+    session.complete(1)
+    await settle()
+
+    assert chunks == [0, 1, 2, 3, 4]
+    assert session.in_flight() == [5]
+
+    session.complete(5)
+    await task
+
+    # Chunks come out in offset order, and nothing is requested past the end of the file
+    assert chunks == [0, 1, 2, 3, 4, 5]
+    assert sorted(session.requests) == [0, 1, 2, 3, 4, 5]
+    assert session.users == 0
+    session.idle_handle.cancel()
+
+
+@pytest.mark.asyncio
+async def test_error_mid_window():
+    client, session = create_client()
+    chunks = []
+    task = asyncio.ensure_future(download(client, chunks))
+
+    await settle()
+    session.complete(0)
+    await settle()
+
+    session.requests[2].set_exception(OSError())
+    session.complete(1)
+    await task
+
+    # The download stops at the failed chunk, and the requests still in flight are cancelled
+    assert chunks == [0, 1]
+    assert sorted(session.cancelled) == [3, 4]
+    assert session.users == 0
+    session.idle_handle.cancel()
+
+
+@pytest.mark.asyncio
+async def test_cancel_mid_window():
+    client, session = create_client()
+    chunks = []
+    task = asyncio.ensure_future(download(client, chunks))
+
+    await settle()
+    session.complete(0)
+    await settle()
+
+    session.complete(2)
+    await settle()
+
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert chunks == [0]
+    assert sorted(session.cancelled) == [1, 3, 4]
+    assert session.users == 0
+    session.idle_handle.cancel()
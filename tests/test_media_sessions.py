@@ -0,0 +1,106 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+import pyrogram
+from pyrogram.methods.messages.inline_session import use_session
+
+
+class Session:
+    def __init__(self):
+        self.is_started = asyncio.Event()
+        self.is_started.set()
+        self.users = 0
+        self.idle_handle = None
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+def create_client():
+    client = pyrogram.Client("test", api_id=1, api_hash="", in_memory=True)
+    client.MEDIA_SESSION_IDLE_TIMEOUT = 0.05
+
+    async def create_media_session(dc_id, is_cdn=False):
+        return Session()
+
+    client.create_media_session = create_media_session
+
+    return client
+
+
+@pytest.mark.asyncio
+async def test_idle_session_is_evicted():
+    client = create_client()
+
+    async with client.use_media_session(2) as session:
+        await asyncio.sleep(0.1)
+
+        # Sessions in use are kept
+        assert client.media_sessions[(2, False)] is session
+
+    await asyncio.sleep(0.1)
+
+    assert not client.media_sessions
+    assert session.stopped
+
+
+@pytest.mark.asyncio
+async def test_session_setup_does_not_block_other_dcs():
+    client = create_client()
+    setup = asyncio.Event()
+    create_media_session = client.create_media_session
+
+    async def slow_create_media_session(dc_id, is_cdn=False):
+        if dc_id == 4:
+            await setup.wait()
+
+        return await create_media_session(dc_id, is_cdn)
+
+    client.create_media_session = slow_create_media_session
+
+    slow = asyncio.ensure_future(client.get_media_session(4))
+    await asyncio.sleep(0)
+
+    assert await asyncio.wait_for(client.get_media_session(2), 1) is client.media_sessions[(2, False)]
+    assert not slow.done()
+
+    setup.set()
+    assert await slow is client.media_sessions[(4, False)]
+
+    for session in client.media_sessions.values():
+        session.idle_handle.cancel()
+
+
+@pytest.mark.asyncio
+async def test_inline_session_is_in_use():
+    client = create_client()
+    await client.storage.open()
+
+    async with use_session(client, await client.storage.dc_id()) as session:
+        assert session is client
+
+    async with use_session(client, 4) as session:
+        assert session.users == 1
+
+    assert session.users == 0
+    session.idle_handle.cancel()
@@ -0,0 +1,76 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from pyrogram import raw
+from pyrogram.client import PeerCache
+
+
+def user(user_id: int, access_hash: int) -> raw.types.InputPeerUser:
+    return raw.types.InputPeerUser(user_id=user_id, access_hash=access_hash)
+
+
+def test_lru():
+    cache = PeerCache(2)
+    cache.put(user(1, 10), "one")
+    cache.put(user(2, 20))
+
+    assert cache.get(1).access_hash == 10
+    cache.put(user(3, 30))
+
+    # 2 was the least recently used one
+    assert cache.get(2) is None
+    assert cache.get_by_username("one").user_id == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_coherent_with_updates():
+    cache = PeerCache(10)
+    cache.put(user(1, 10), "one")
+    input_peer = cache.get(1)
+
+    cache.update([(1, 10, "user", "uno", None)])
+
+    assert cache.get(1) is input_peer
+    assert cache.get_by_username("one") is None
+    assert cache.get_by_username("uno") is input_peer
+
+    cache.update([(1, 11, "user", "uno", None)])
+
+    assert cache.get(1).access_hash == 11
+
+    # The username moved to a peer that isn't cached
+    cache.update([(2, 20, "user", "uno", None)])
+
+    assert cache.get_by_username("uno") is None
+    cache.put(user(1, 11))
+    assert cache.get_by_username("uno") is None
+
+
+def test_updates_dont_evict():
+    cache = PeerCache(2)
+    cache.put(user(1, 10))
+    cache.put(user(2, 20))
+
+    cache.update([(i, i * 10, "user", None, None) for i in range(3, 100)])
+    cache.update([(1, 11, "user", None, None)])
+    cache.put(user(3, 30))
+
+    # Updates are not lookups: 1 is still the least recently used one
+    assert cache.get(1) is None
+    assert cache.get(2).access_hash == 20
+    assert len(cache.peers) == 2
@@ -0,0 +1,86 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+from pyrogram.reply_resolver import ReplyResolver
+
+CHANNEL_ID = -1000000000001
+
+
+class Client:
+    def __init__(self):
+        self.message_cache = {}
+        self.calls = []
+
+    async def resolve_peer(self, chat_id):
+        return raw.types.InputPeerChannel(channel_id=1, access_hash=0)
+
+    async def invoke(self, query, sleep_threshold=None):
+        self.calls.append(query)
+        peer_id = raw.types.PeerChannel(channel_id=1) if query.QUALNAME.startswith("functions.channels") else None
+
+        return raw.types.messages.Messages(
+            messages=[
+                # The replying messages are 1000 ids ahead of the messages they reply to
+                raw.types.Message(
+                    id=i.id - 1000, peer_id=peer_id or raw.types.PeerUser(user_id=1), date=0, message="", entities=[]
+                )
+                for i in query.id
+            ],
+            chats=[
+                raw.types.Channel(
+                    id=1, title="", photo=raw.types.ChatPhotoEmpty(), date=0, access_hash=0, restriction_reason=[]
+                )
+            ],
+            users=[raw.types.User(id=1, access_hash=0, restriction_reason=[])]
+        )
+
+
+@pytest.mark.asyncio
+async def test_batched():
+    client = Client()
+    resolver = ReplyResolver(client)
+
+    messages = await asyncio.gather(
+        *[resolver.resolve(CHANNEL_ID, 1000 + i, i) for i in range(1, 51)],
+        resolver.resolve(CHANNEL_ID, 2000, 1),
+        resolver.resolve(1, 1005, 5),
+        resolver.resolve(2, 1006, 6)
+    )
+
+    assert [m.id for m in messages] == list(range(1, 51)) + [1, 5, 6]
+    assert len(client.calls) == 2
+    assert sorted(len(query.id) for query in client.calls) == [2, 50]
+
+
+@pytest.mark.asyncio
+async def test_failure():
+    client = Client()
+    resolver = ReplyResolver(client)
+
+    async def invoke(query, sleep_threshold=None):
+        raise FloodWait(value=60)
+
+    client.invoke = invoke
+
+    assert await asyncio.gather(resolver.resolve(1, 1001, 1), resolver.resolve(1, 1002, 2)) == [None, None]
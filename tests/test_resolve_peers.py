@@ -0,0 +1,87 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+import pyrogram
+from pyrogram import raw
+from pyrogram.errors import PeerIdInvalid
+
+
+@pytest.mark.asyncio
+async def test_resolve_peers():
+    client = pyrogram.Client("test", api_id=1, api_hash="", in_memory=True)
+    await client.storage.open()
+    client.is_connected = True
+
+    await client.storage.update_peers([(1, 10, "user", "one", None)])
+
+    queries = []
+
+    async def invoke(query, *args, **kwargs):
+        queries.append(query)
+
+        if isinstance(query, raw.functions.users.GetUsers):
+            return [raw.types.User(id=i.user_id, access_hash=i.user_id * 10) for i in query.id if i.user_id != 1000]
+
+        chats = [
+            raw.types.Channel(id=i.channel_id, title="", photo=raw.types.ChatPhotoEmpty(), date=0, access_hash=1)
+            for i in query.id
+        ]
+        await client.fetch_peers(chats)
+
+        return raw.types.messages.Chats(chats=chats)
+
+    client.invoke = invoke
+
+    user_ids = list(range(2, 452)) + [1000]
+    peers = await client.resolve_peers([-1000000000005, "one", *user_ids, 1])
+
+    assert peers[0].channel_id == 5
+    assert peers[1].user_id == 1
+    assert [p.access_hash for p in peers[2:-2]] == [i * 10 for i in user_ids[:-1]]
+    assert peers[-2] is None
+    assert peers[-1].access_hash == 10
+
+    # 451 users in 3 calls and one channel
+    assert [len(q.id) for q in queries] == [200, 200, 51, 1]
+
+
+@pytest.mark.asyncio
+async def test_invalid_id_in_chunk():
+    client = pyrogram.Client("test", api_id=1, api_hash="", in_memory=True)
+    await client.storage.open()
+    client.is_connected = True
+
+    queries = []
+
+    async def invoke(query, *args, **kwargs):
+        queries.append(query)
+
+        if any(i.user_id == 7 for i in query.id):
+            raise PeerIdInvalid()
+
+        return [raw.types.User(id=i.user_id, access_hash=i.user_id * 10) for i in query.id]
+
+    client.invoke = invoke
+
+    peers = await client.resolve_peers(range(1, 65))
+
+    # Only the invalid id is left out, found in a few calls
+    assert [p and p.access_hash for p in peers] == [i * 10 if i != 7 else None for i in range(1, 65)]
+    assert len(queries) == 13
@@ -0,0 +1,261 @@
+#  Pyrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-present Dan <https://github.com/delivrance>
+#
+#  This file is part of Pyrogram.
+#
+#  Pyrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Pyrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Pyrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from io import BytesIO
+
+import pytest
+
+from pyrogram import raw
+from pyrogram.dispatcher import Dispatcher
+from pyrogram.raw.core import Message
+from pyrogram.updates_state import UpdatesState
+
+
+class Storage:
+    def __init__(self):
+        self.rows = []
+
+    async def update_state(self, value=object):
+        self.rows = value
+
+
+class Client:
+    no_updates = False
+
+    def __init__(self):
+        self.storage = Storage()
+        self.dispatched = []
+        self.differences = 0
+        self.seq = 0
+
+    async def dispatch_update(self, update, users, chats, is_min=False):
+        self.dispatched.append(getattr(update, "pts", None))
+
+    async def invoke(self, query):
+        self.differences += 1
+        return raw.types.updates.DifferenceEmpty(date=0, seq=self.seq)
+
+
+def update(pts: int, pts_count: int = 1):
+    return raw.types.UpdateDeleteMessages(messages=[1], pts=pts, pts_count=pts_count)
+
+
+def updates_state(pts: int = 10):
+    s = UpdatesState(Client())
+    s.set_state(raw.types.updates.State(pts=pts, qts=0, date=0, seq=0, unread_count=0))
+
+    return s
+
+
+@pytest.mark.asyncio
+async def test_in_order():
+    s = updates_state()
+
+    await s.process(update(11))
+    await s.process(update(13, 2))
+
+    assert s.client.dispatched == [11, 13]
+    assert s.pts == 13
+
+
+@pytest.mark.asyncio
+async def test_duplicate():
+    s = updates_state()
+
+    await s.process(update(11))
+    await s.process(update(11))
+
+    assert s.client.dispatched == [11]
+
+
+@pytest.mark.asyncio
+async def test_gap_filled():
+    s = updates_state()
+
+    await s.process(update(12))
+    await s.process(update(13))
+    assert s.client.dispatched == []
+
+    await s.process(update(11))
+    assert s.client.dispatched == [11, 12, 13]
+    assert not s.pending and not s.gap_timers
+
+
+@pytest.mark.asyncio
+async def test_gap_not_filled():
+    s = updates_state()
+
+    await s.process(update(12))
+    await s.get_difference()
+
+    # The difference came back empty: the held update is applied anyway rather than fetching the difference again
+    assert s.client.differences == 1
+    assert s.client.dispatched == [12]
+    assert s.client.storage.rows == [(s.COMMON, 12, 0, 0, 0)]
+    assert not s.pending and not s.gap_timers
+
+    await s.stop()
+
+
+@pytest.mark.asyncio
+async def test_method_result_is_not_dispatched():
+    s = updates_state()
+
+    s.track(raw.types.UpdateShortSentMessage(id=1, pts=11, pts_count=1, date=0))
+    await s.process(update(12))
+
+    assert s.client.dispatched == [12]
+
+
+@pytest.mark.asyncio
+async def test_channel_boxes():
+    s = updates_state()
+
+    await s.process(raw.types.UpdateDeleteChannelMessages(channel_id=1, messages=[1], pts=100, pts_count=1))
+    await s.process(raw.types.UpdateDeleteChannelMessages(channel_id=1, messages=[1], pts=101, pts_count=1))
+    await s.process(update(11))
+
+    assert s.client.dispatched == [100, 101, 11]
+    assert s.channels == {1: 101}
+
+
+@pytest.mark.asyncio
+async def test_unhandled_update_with_pts_is_not_skipped():
+    client = Client()
+    client.workers = 1
+    client.shard_updates = False
+    client.skip_unhandled_updates = True
+
+    # No handlers registered: every update without a pts can be skipped
+    update_ids = Dispatcher(client).get_update_ids()
+
+    read_history = raw.types.UpdateReadHistoryInbox(
+        peer=raw.types.PeerUser(user_id=1), max_id=1, still_unread_count=0, pts=11, pts_count=1
+    )
+    messages = [
+        Message(raw.types.UpdateShort(update=u, date=0), 0, 0, len(raw.types.UpdateShort(update=u, date=0).write()))
+        for u in (read_history, raw.types.UpdateUserStatus(user_id=1, status=raw.types.UserStatusEmpty()))
+    ]
+    read = [Message.read(BytesIO(m.write()), update_ids) for m in messages]
+
+    assert read[0].body.update == read_history
+    assert read[1].body is None
+
+    s = UpdatesState(client)
+    s.set_state(raw.types.updates.State(pts=10, qts=0, date=0, seq=0, unread_count=0))
+
+    await s.process(read[0].body.update)
+    await s.process(update(12))
+
+    assert s.client.dispatched == [11, 12]
+    assert not s.pending and not s.gap_timers
+    assert s.client.differences == 0
+
+
+@pytest.mark.asyncio
+async def test_method_result_fills_gap():
+    s = updates_state()
+
+    await s.process(update(12))
+    assert s.client.dispatched == []
+
+    s.track(raw.types.UpdateShortSentMessage(id=1, pts=11, pts_count=1, date=0))
+    await asyncio.gather(*s.tasks)
+
+    assert s.client.dispatched == [12]
+    assert s.pts == 12
+    assert not s.pending and not s.gap_timers
+
+
+@pytest.mark.asyncio
+async def test_affected_results():
+    s = updates_state()
+    s.channels[1] = 100
+
+    s.track(
+        raw.types.messages.AffectedMessages(pts=11, pts_count=1),
+        raw.functions.messages.DeleteMessages(id=[1])
+    )
+    s.track(
+        raw.types.messages.AffectedHistory(pts=101, pts_count=1, offset=0),
+        raw.functions.InvokeWithoutUpdates(query=raw.functions.channels.DeleteParticipantHistory(
+            channel=raw.types.InputChannel(channel_id=1, access_hash=0),
+            participant=raw.types.InputPeerSelf()
+        ))
+    )
+
+    assert (s.pts, s.channels[1]) == (11, 101)
+
+    await s.process(update(12))
+    await s.process(raw.types.UpdateDeleteChannelMessages(channel_id=1, messages=[1], pts=102, pts_count=1))
+
+    assert s.client.dispatched == [12, 102]
+    assert not s.pending and not s.gap_timers
+
+
+def container(seq: int, *updates_):
+    return raw.types.Updates(updates=list(updates_), users=[], chats=[], date=0, seq=seq)
+
+
+@pytest.mark.asyncio
+async def test_seq_gap_filled():
+    s = updates_state()
+    s.seq = 5
+
+    late = container(7, raw.types.UpdateUserStatus(user_id=1, status=raw.types.UserStatusEmpty()))
+    await s.process_updates(s.check_seq(late, (late, {}, {}, False)))
+
+    assert s.seq == 5
+    assert s.pending_seq and s.SEQ in s.gap_timers
+
+    await s.process_updates(s.check_seq(container(6, update(11)), (container(6, update(11)), {}, {}, False)))
+
+    # The held container is processed right after the one filling the gap
+    assert s.client.dispatched == [11, None]
+    assert s.seq == 7
+    assert not s.pending_seq and not s.gap_timers
+
+    # Containers already applied are dropped
+    assert s.check_seq(late, (late, {}, {}, False)) == []
+
+
+@pytest.mark.asyncio
+async def test_seq_gap_not_filled():
+    s = updates_state()
+    s.seq = 5
+    s.client.seq = 7
+
+    late = container(7, raw.types.UpdateUserStatus(user_id=1, status=raw.types.UserStatusEmpty()))
+    await s.process_updates(s.check_seq(late, (late, {}, {}, False)))
+    await s.get_difference()
+
+    # The difference went past the held container, which is still processed
+    assert s.client.dispatched == [None]
+    assert s.seq == 7
+    assert not s.pending_seq and not s.gap_timers
+
+
+@pytest.mark.asyncio
+async def test_recover_fetches_only_common_box():
+    s = updates_state()
+    s.channels.update({i: 100 for i in range(1, 1001)})
+
+    await s.recover()
+
+    assert s.client.differences == 1